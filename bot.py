@@ -3,28 +3,76 @@ import os
 import discord
 from discord.ext import commands
 from dotenv import load_dotenv
-from pretty_help import PrettyHelp
+
+import config
+from cogs.utils import startup
+from cogs.utils.ipc import IPCClient
+from cogs.utils.memory import memory_report
+
+startup.mark("imports")
 
 load_dotenv()
 TOKEN = os.getenv('DISCORD_TOKEN')
 
-bot = commands.Bot(command_prefix=commands.when_mentioned_or("-"), intents=discord.Intents.all(), case_insensitive=True, help_command=PrettyHelp(color=0xff0000, active_time=60, show_index=False))
+options = dict(command_prefix=commands.when_mentioned_or("-"), intents=discord.Intents.all(), case_insensitive=True, help_command=None)
+
+if config.CACHE_PROFILE == "lean":
+    # Music only needs guilds, voice states and command messages. Members are only cached while they
+    # are in a voice channel, which is what on_voice_state_update looks at.
+    intents = discord.Intents.none()
+    intents.guilds = True
+    intents.voice_states = True
+    intents.guild_messages = True
+    intents.guild_reactions = True
+
+    member_cache_flags = discord.MemberCacheFlags.none()
+    member_cache_flags.voice = True
 
+    options.update(
+        intents=intents,
+        member_cache_flags=member_cache_flags,
+        max_messages=config.MESSAGE_CACHE_SIZE,
+        chunk_guilds_at_startup=False
+    )
 
-initial_extensions = ['cogs.music']
+if config.SHARDED or config.SHARD_COUNT:
+    bot = commands.AutoShardedBot(shard_count=config.SHARD_COUNT, shard_ids=config.SHARD_IDS, **options)
+else:
+    bot = commands.Bot(**options)
+
+bot.cluster_id = config.CLUSTER_ID
+bot.ipc = None
+if config.IPC_PORT:
+    bot.ipc = IPCClient(config.CLUSTER_ID, config.IPC_HOST, config.IPC_PORT, loop=bot.loop)
+    bot.ipc.start()
+
+
+initial_extensions = ['cogs.music', 'cogs.cluster', 'cogs.metrics']
 
 
 if __name__ == '__main__':
     for extension in initial_extensions:
         bot.load_extension(extension)
+    startup.mark("extensions")
 
 @bot.event
 async def on_ready():
+    startup.mark("ready")
+    if bot.help_command is None:
+        # Imported here so it doesn't hold up the login; nothing can ask for help before this anyway.
+        from pretty_help import PrettyHelp
+        bot.help_command = PrettyHelp(color=0xff0000, active_time=60, show_index=False)
+
     await bot.change_presence(activity=discord.Activity(type=discord.ActivityType.listening, name="-help"))
-    print("Bot is ready!")
+    memory = memory_report(bot)
+    print(
+        f"Bot is ready! ({config.CACHE_PROFILE} profile, {(memory['rss'] or 0) / 2**20:,.1f} MB for {memory['guilds']:,} guilds"
+        + (f", {memory['per_guild'] / 1024:,.1f} KB per guild)" if memory["per_guild"] else ")")
+    )
 
 @bot.event
 async def on_connect():
+    startup.mark("login")
     print(f"Connected to Discord (latency: {bot.latency*1000:,.0f} ms)")
 
 @bot.event
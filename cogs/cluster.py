@@ -0,0 +1,120 @@
+import time
+
+import discord
+from discord.ext import commands
+
+import config
+from .utils.memory import memory_report
+
+
+class Cluster(commands.Cog):
+    def __init__(self, bot):
+        self.bot = bot
+
+        if bot.ipc is not None:
+            bot.ipc.register("cluster_stats", self.cluster_stats)
+            bot.ipc.register("reload", self.reload_extension)
+
+    def cog_unload(self):
+        if self.bot.ipc is not None:
+            self.bot.ipc.unregister("cluster_stats")
+            self.bot.ipc.unregister("reload")
+
+    async def cluster_stats(self, data=None):
+        music = self.bot.get_cog("Music")
+        return {
+            "guilds": len(self.bot.guilds),
+            "shards": sorted(self.bot.shards) if isinstance(self.bot, commands.AutoShardedBot) else [self.bot.shard_id or 0],
+            "latency": self.bot.latency,
+            "players": len(music.players) if music is not None else 0,
+            "memory": memory_report(self.bot)["rss"],
+        }
+
+    async def reload_extension(self, data):
+        # The music cog hands its node connections and players to the new instance, so playback carries on.
+        music = self.bot.get_cog("Music") if data["extension"] == "cogs.music" else None
+        start = time.perf_counter()
+        try:
+            if music is not None:
+                self.bot.music_handoff = music.hand_off()
+            self.bot.reload_extension(data["extension"])
+        except commands.ExtensionError as exc:
+            return str(exc)
+        finally:
+            self.bot.music_handoff = None
+            if music is not None:
+                music.handing_off = False
+
+        elapsed = (time.perf_counter() - start) * 1000
+        if music is not None:
+            return f"ok, {len(self.bot.get_cog('Music').players):,} players handed over in {elapsed:,.1f} ms"
+        return f"ok in {elapsed:,.1f} ms"
+
+    async def gather(self, event, data=None):
+        if self.bot.ipc is None:
+            handler = {"cluster_stats": self.cluster_stats, "reload": self.reload_extension}[event]
+            return {str(self.bot.cluster_id): await handler(data)}
+
+        return await self.bot.ipc.request(event, data)
+
+    @commands.command(name="clusters", hidden=True)
+    @commands.is_owner()
+    async def clusters_command(self, ctx):
+        stats = await self.gather("cluster_stats")
+        embed = discord.Embed(
+            title=f"{len(stats)} clusters",
+            description=(
+                f"**Guilds:** {sum(s['guilds'] for s in stats.values() if s):,}\n"
+                f"**Players:** {sum(s['players'] for s in stats.values() if s):,}"
+            ),
+            color=0xff0000
+        )
+        for cluster_id, s in sorted(stats.items(), key=lambda item: int(item[0])):
+            if s is None:
+                embed.add_field(name=f"Cluster {cluster_id}", value="No response", inline=True)
+                continue
+
+            embed.add_field(
+                name=f"Cluster {cluster_id}",
+                value=(
+                    f"**Shards:** {s['shards'][0]}-{s['shards'][-1]}\n"
+                    f"**Guilds:** {s['guilds']:,}\n"
+                    f"**Players:** {s['players']:,}\n"
+                    f"**Latency:** {s['latency'] * 1000:,.0f} ms"
+                    + (f"\n**Memory:** {s['memory'] / 2**20:,.0f} MB" if s["memory"] else "")
+                ),
+                inline=True
+            )
+        await ctx.send(embed=embed)
+
+    @commands.command(name="memory", aliases=["mem"], hidden=True)
+    @commands.is_owner()
+    async def memory_command(self, ctx):
+        memory = memory_report(self.bot)
+        embed = discord.Embed(
+            title=f"Memory ({config.CACHE_PROFILE} profile)",
+            description=(
+                f"**RSS:** {(memory['rss'] or 0) / 2**20:,.1f} MB\n"
+                f"**Guilds:** {memory['guilds']:,}\n"
+                f"**Per guild:** {(memory['per_guild'] or 0) / 1024:,.1f} KB\n"
+                f"**Cached members:** {memory['members']:,}\n"
+                f"**Cached messages:** {memory['messages']:,}"
+            ),
+            color=0xff0000
+        )
+        await ctx.send(embed=embed)
+
+    @commands.command(name="creload", hidden=True)
+    @commands.is_owner()
+    async def creload_command(self, ctx, extension: str):
+        results = await self.gather("reload", {"extension": extension})
+        embed = discord.Embed(
+            title=f"Reloaded `{extension}`",
+            description="\n".join(f"**Cluster {cluster_id}:** {result}" for cluster_id, result in sorted(results.items())),
+            color=0xff0000
+        )
+        await ctx.send(embed=embed)
+
+
+def setup(bot):
+    bot.add_cog(Cluster(bot))
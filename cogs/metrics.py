@@ -0,0 +1,81 @@
+import logging
+import time
+
+from discord.ext import commands
+
+import config
+from .utils import metrics
+
+
+class RateLimitHandler(logging.Handler):
+    # discord.py retries 429s internally and only logs them, so count the log records.
+    def emit(self, record):
+        if record.msg.startswith("We are being rate limited"):
+            metrics.DISCORD_RATE_LIMITS.labels("all").inc()
+        elif record.msg.startswith("Global rate limit has been hit"):
+            metrics.DISCORD_RATE_LIMITS.labels("global").inc()
+
+
+class Metrics(commands.Cog):
+    def __init__(self, bot):
+        self.bot = bot
+        self.runner = None
+
+        self.rate_limit_handler = RateLimitHandler(logging.WARNING)
+        logging.getLogger("discord.http").addHandler(self.rate_limit_handler)
+
+        self._request = bot.http.request
+        bot.http.request = self.timed_request
+
+        if config.METRICS_PORT:
+            bot.loop.create_task(self.start_server())
+
+    def cog_unload(self):
+        logging.getLogger("discord.http").removeHandler(self.rate_limit_handler)
+        self.bot.http.request = self._request
+
+        if self.runner is not None:
+            self.bot.loop.create_task(self.runner.cleanup())
+
+    async def timed_request(self, route, **kwargs):
+        start = time.perf_counter()
+        try:
+            return await self._request(route, **kwargs)
+        finally:
+            metrics.DISCORD_LATENCY.labels(f"{route.method} {route.path}").observe(time.perf_counter() - start)
+
+    async def start_server(self):
+        # aiohttp.web is only needed when the endpoint is enabled, don't make every start pay for it.
+        from aiohttp import web
+
+        app = web.Application()
+        app.router.add_get("/metrics", self.metrics_handler)
+
+        self.runner = web.AppRunner(app, access_log=None)
+        await self.runner.setup()
+        await web.TCPSite(self.runner, config.METRICS_HOST, config.METRICS_PORT).start()
+
+    async def metrics_handler(self, request):
+        from aiohttp import web
+
+        return web.Response(text=metrics.REGISTRY.render(), content_type="text/plain", charset="utf-8")
+
+    @commands.Cog.listener()
+    async def on_command(self, ctx):
+        ctx.metrics_start = time.perf_counter()
+
+    @commands.Cog.listener()
+    async def on_command_completion(self, ctx):
+        self.observe(ctx, "ok")
+
+    @commands.Cog.listener()
+    async def on_command_error(self, ctx, exc):
+        self.observe(ctx, "error")
+
+    def observe(self, ctx, status):
+        if (start := getattr(ctx, "metrics_start", None)) is not None:
+            metrics.COMMAND_LATENCY.labels(ctx.command.qualified_name, status).observe(time.perf_counter() - start)
+
+
+def setup(bot):
+    bot.add_cog(Metrics(bot))
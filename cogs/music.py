@@ -1,10 +1,15 @@
 import asyncio
+import atexit
 import datetime as dt
 import enum
-import random
+import functools
+import logging
 import re
+import sys
+import time
 import typing as t
 from enum import Enum
+from urllib.parse import quote
 
 import aiohttp
 import discord
@@ -12,12 +17,52 @@ from discord import message
 from discord import channel
 from discord.ext.commands.bot import Bot
 import wavelink
-from discord.ext import commands
+from discord.ext import commands, tasks
+
+import config
+from .utils import metrics, startup
+from .utils.autoplay import Autoplay
+from .utils.cache import MISSING, LRUCache
+from .utils.history import PlayHistory
+from .utils.ingest import stream_tracks
+from .utils.mailbox import Mailbox, MailboxFull
+from .utils.nodes import best_node, load_nodes, node_health_penalty, node_load
+from .utils.memory import approx_size, sampled_size
+from .utils.outbox import Outbox
+from .utils.picker import HAS_COMPONENTS, ChoiceView, ReactionRouter, add_reactions
+from .utils.players import PlayerRegistry
+from .utils.scheduler import DeadlineScheduler
+from .utils.query import QueryKind, classify
+from .utils.search import SearchResolver
+from .utils.settings import GuildSettings
+from .utils.snapshot import dump_players, load_tracks, read_snapshot, write_snapshot
+from .utils.tracklist import TrackList, TrackListView
 
-URL_REGEX = r"(?i)\b((?:https?://|www\d{0,3}[.]|[a-z0-9.\-]+[.][a-z]{2,4}/)(?:[^\s()<>]+|\(([^\s()<>]+|(\([^\s()<>]+\)))*\))+(?:\(([^\s()<>]+|(\([^\s()<>]+\)))*\)|[^\s`!()\[\]{};:'\".,<>?«»“”‘’]))"
 LYRICS_URL = "https://some-random-api.ml/lyrics?title="
 HZ_BANDS = (20, 40, 63, 100, 150, 250, 400, 450, 630, 1000, 1600, 2500, 4000, 10000, 16000)
+EQ_PRESETS = {name: getattr(wavelink.eqs.Equalizer, name)() for name in ("flat", "boost", "metal", "piano")}
+EQ_DEBOUNCE = 0.5
+EQ_PRESET_LIMIT = 10
 TIME_REGEX = r"([0-9]{1,2})[:ms](([0-9]{1,2})s?)?"
+IMPORT_PROGRESS_INTERVAL = 3
+QUEUE_PAGE_SIZE = 10
+BATCH_LIMIT = 50
+BATCH_CONCURRENCY = 5
+PLAYER_SWEEP_INTERVAL = 60
+NODE_READY_TIMEOUT = 15
+NODE_RETRY_MAX = 300
+# What a reload hands from the old cog instance to the new one: node connections, players' state and caches.
+HANDOFF_STATE = (
+    "session", "wavelink", "search", "lyrics", "queue_pages", "start_latency", "eq_presets", "play_history",
+    "autoplay", "outbox", "reactions", "settings", "idle", "restore_task", "node_ready", "_lyrics_requests",
+    "ready_nodes", "lyrics_guilds",
+)
+# Autoplay skips tracks among the last this many of the queue.
+AUTOPLAY_EXCLUDE = 50
+PAGE_OPTIONS = {
+    "⬅️": -1,
+    "➡️": 1,
+}
 OPTIONS = {
     "1️⃣": 0,
     "2⃣": 1,
@@ -26,6 +71,8 @@ OPTIONS = {
     "5⃣": 4,
 }
 
+log = logging.getLogger(__name__)
+
 
 class AlreadyConnectedToChannel(commands.CommandError):
     pass
@@ -39,6 +86,10 @@ class QueueIsEmpty(commands.CommandError):
     pass
 
 
+class NoActivePlayer(commands.CommandError):
+    pass
+
+
 class NoTracksFound(commands.CommandError):
     pass
 
@@ -55,6 +106,10 @@ class NoMoreTracks(commands.CommandError):
     pass
 
 
+class CurrentTrackRemoval(commands.CommandError):
+    pass
+
+
 class NoPreviousTracks(commands.CommandError):
     pass
 
@@ -83,6 +138,10 @@ class NoLyricsFound(commands.CommandError):
     pass
 
 
+class LyricsUnavailable(commands.CommandError):
+    pass
+
+
 class InvalidEQPreset(commands.CommandError):
     pass
 
@@ -95,10 +154,79 @@ class EQGainOutOfBounds(commands.CommandError):
     pass
 
 
+class MissingEQGain(commands.CommandError):
+    pass
+
+
+class InvalidEQPresetName(commands.CommandError):
+    pass
+
+
+class TooManyEQPresets(commands.CommandError):
+    pass
+
+
 class InvalidTimeString(commands.CommandError):
     pass
 
 
+class InvalidIdleTimeout(commands.CommandError):
+    pass
+
+
+class InvalidAutoplayMode(commands.CommandError):
+    pass
+
+
+def split_queries(query):
+    # A batch is one entry per line, or several links pasted on one line.
+    if len(lines := [line.strip() for line in query.splitlines() if line.strip()]) > 1:
+        return lines
+
+    if len(words := query.split()) > 1 and all(classify(word).is_url for word in words):
+        return words
+
+    return [query]
+
+
+def is_text_query(query):
+    return classify(query).kind is QueryKind.TEXT
+
+
+def search_query(query):
+    return classify(query).identifier
+
+
+def serialized(func):
+    # Runs the command in the guild player's mailbox, in order with its track events. The command returns its
+    # replies (embeds and reactions) and they are sent afterwards, so Discord round trips don't hold up the player.
+    @functools.wraps(func)
+    async def command(self, ctx, *args, **kwargs):
+        replies = await self.get_player(ctx).mailbox.call(func, self, ctx, *args, **kwargs)
+        for reply in (replies,) if isinstance(replies, discord.Embed) else replies or ():
+            if isinstance(reply, discord.Embed):
+                await self.outbox.send(ctx, embed=reply)
+            else:
+                await self.outbox.react(ctx.message, reply)
+    return command
+
+
+def track_choices(tracks):
+    return "\n".join(
+        f"**{i+1}.** {t.title} ({t.length//60000}:{str(t.length%60).zfill(2)})"
+        for i, t in enumerate(tracks[:5])
+    )
+
+
+def queue_description(queue, page):
+    start = page * QUEUE_PAGE_SIZE
+    first = queue.position + 2 + start
+    return f"**Currently playing:** {getattr(queue.current_track, 'title', 'No tracks currently playing.')}\n" + "".join(
+        f"\n**{first + i}.** {track.title}"
+        for i, track in enumerate(queue.upcoming[start:start + QUEUE_PAGE_SIZE])
+    )
+
+
 class RepeatMode(Enum):
     NONE = 0
     SINGLE = 1
@@ -106,9 +234,10 @@ class RepeatMode(Enum):
 
 class Queue: 
     def __init__(self):
-        self._queue = []
+        self._queue = TrackList()
         self.position = 0
         self.repeat_mode = RepeatMode.NONE
+        self.version = 0
 
     @property
     def is_empty(self):
@@ -119,7 +248,7 @@ class Queue:
         if not self._queue:
             raise QueueIsEmpty
 
-        if self.position <= len(self._queue) - 1:
+        if 0 <= self.position <= len(self._queue) - 1:
             return self._queue[self.position]
 
     @property
@@ -127,14 +256,32 @@ class Queue:
         if not self._queue:
             raise QueueIsEmpty
 
-        return self._queue[self.position + 1:]
+        return TrackListView(self._queue, self.position + 1, len(self._queue))
 
     @property
     def history(self):
         if not self._queue:
             raise QueueIsEmpty
         
-        return self._queue[:self.position]
+        return TrackListView(self._queue, 0, self.position)
+
+    def recent(self, count):
+        # The current track and up to ``count`` before it.
+        return TrackListView(self._queue, self.position - count, self.position + 1)
+
+    @property
+    def upcoming_length(self):
+        if not self._queue:
+            raise QueueIsEmpty
+
+        return max(0, len(self._queue) - self.position - 1)
+
+    @property
+    def history_length(self):
+        if not self._queue:
+            raise QueueIsEmpty
+
+        return min(max(0, self.position), len(self._queue))
 
     @property
     def length(self):
@@ -142,6 +289,55 @@ class Queue:
 
     def add(self, *args):
         self._queue.extend(args)
+        self.version += 1
+
+    def insert(self, index, *args):
+        if self.position >= len(self._queue):
+            self.position = min(self.position, index)
+        elif index <= self.position:
+            self.position += len(args)
+        self._queue.insert_many(index, args)
+        self.version += 1
+
+    def remove(self, index):
+        if not self._queue:
+            raise QueueIsEmpty
+
+        if index == self.position:
+            raise CurrentTrackRemoval
+
+        track = self._queue.pop(index)
+        if index < self.position:
+            self.position -= 1
+        self.version += 1
+        return track
+
+    def remove_range(self, start, stop):
+        if not self._queue:
+            raise QueueIsEmpty
+
+        stop = min(stop, len(self._queue))
+        if start <= self.position < stop:
+            raise CurrentTrackRemoval
+
+        if stop <= self.position:
+            self.position -= stop - start
+        self.version += 1
+        return self._queue.remove_range(start, stop)
+
+    def move(self, src, dst):
+        if not self._queue:
+            raise QueueIsEmpty
+
+        self._queue.move(src, dst)
+        if src == self.position:
+            self.position = dst
+        else:
+            if src < self.position:
+                self.position -= 1
+            if dst <= self.position:
+                self.position += 1
+        self.version += 1
 
     def get_next_track(self):
         if not self._queue:
@@ -159,14 +355,19 @@ class Queue:
 
         return self._queue[self.position]
 
+    def peek_next(self):
+        if not self._queue or self.position + 1 < 0:
+            return None
+        if self.position + 1 < len(self._queue):
+            return self._queue[self.position + 1]
+        return self._queue[0] if self.repeat_mode == RepeatMode.ALL else None
+
     def shuffle(self):
         if not self._queue:
             raise QueueIsEmpty
 
-        upcoming = self.upcoming
-        random.shuffle(upcoming)
-        self._queue = self._queue[:self.position + 1]
-        self._queue.extend(upcoming)
+        self._queue.shuffle(self.position + 1)
+        self.version += 1
 
     def set_repeat_mode(self, mode):
         if mode == "none":
@@ -179,13 +380,64 @@ class Queue:
     def empty(self):
         self._queue.clear()
         self.position = 0
+        self.version += 1
 
 
 class Player(wavelink.Player):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
+        self.init_state()
+
+    def init_state(self):
         self.queue = Queue()
         self.eq_levels = [0.] * 15
+        self.pending_eq = None
+        self.eq_handle = None
+        self.eq_task = None
+        self.import_task = None
+        self.play_sent = None
+        self.track_ended = None
+        self.start_position = 0
+        self.clock = None
+        self.handover = None
+        self.handed_over = None
+        self.mailbox = Mailbox(loop=self.bot.loop)
+
+    @classmethod
+    def adopt(cls, player):
+        """Switch a player created by a previous version of this module over to this one, keeping its state."""
+        fresh = cls.__new__(cls)
+        fresh.bot = player.bot
+        fresh.init_state()
+
+        player.__class__ = cls
+        player.queue.__class__ = Queue
+        # Attributes this version added start at their defaults, and the enum has to be this module's.
+        for name, value in vars(fresh).items():
+            player.__dict__.setdefault(name, value)
+        for name, value in vars(fresh.queue).items():
+            player.queue.__dict__.setdefault(name, value)
+        player.queue.repeat_mode = RepeatMode(player.queue.repeat_mode.value)
+        return player
+
+    @property
+    def outbox(self):
+        return self.bot.get_cog("Music").outbox
+
+    @property
+    def memory_usage(self):
+        # The queue's tracks dominate; a sample of them stands in for the rest.
+        return (
+            sys.getsizeof(self) + sys.getsizeof(self.__dict__)
+            + sampled_size(self.queue._queue)
+            + approx_size(self.eq_levels)
+            + approx_size(self.pending_eq)
+            + sys.getsizeof(self.mailbox.items)
+        )
+
+    @property
+    def reactions(self):
+        return self.bot.get_cog("Music").reactions
 
     async def connect(self, ctx, channel=None):
         if self.is_connected:
@@ -197,7 +449,32 @@ class Player(wavelink.Player):
         await super().connect(channel.id)
         return channel
 
+    async def restore(self, channel, tracks, state):
+        self.queue.add(*tracks)
+        self.queue.position = state["position"]
+        self.queue.repeat_mode = RepeatMode(state["repeat"])
+        self.eq_levels = state["eq_levels"]
+
+        await super().connect(channel.id)
+
+        if state["volume"] != 100:
+            await self.set_volume(state["volume"])
+
+        name, levels = state["equalizer"]
+        if any(gain for _, gain in levels):
+            await self.set_eq(wavelink.eqs.Equalizer(levels=[tuple(level) for level in levels], name=name))
+
+        if (track := self.queue.current_track) is not None:
+            await self.play(track, start=state["time"])
+            if state["paused"]:
+                await self.set_pause(True)
+
     async def teardown(self):
+        self.cancel_import()
+        self.cancel_eq()
+        self.cancel_handover()
+        self.mailbox.close()
+        self.bot.get_cog("Music").autoplay.discard(self.guild_id)
         try:
             await self.destroy()
         except KeyError:
@@ -208,81 +485,246 @@ class Player(wavelink.Player):
             raise NoTracksFound
 
         if isinstance(tracks, wavelink.TrackPlaylist):
-            self.queue.add(*tracks.tracks)
+            await self.mailbox.call(self.enqueue, tracks.tracks)
         elif len(tracks) == 1:
-            self.queue.add(tracks[0])
+            await self.mailbox.call(self.enqueue, tracks[:1])
             
             embed = discord.Embed(
             description=f"Added **{tracks[0].title}** to the queue. [{ctx.message.author.mention}]",
             color=0xff0000
         )
-            await ctx.send(embed=embed)
+            await self.outbox.send(ctx, embed=embed)
         else:
             if (track := await self.choose_track(ctx, tracks)) is not None:
-                self.queue.add(track)
+                await self.mailbox.call(self.enqueue, [track])
                 embed = discord.Embed(
             description=f"Added **{track.title}** to the queue. [{ctx.message.author.mention}]",
             color=0xff0000
         )
-            await ctx.send(embed=embed)
+                await self.outbox.send(ctx, embed=embed)
+
+    async def enqueue(self, tracks, index=None):
+        if index is None:
+            self.queue.add(*tracks)
+        else:
+            self.queue.insert(index, *tracks)
 
         if not self.is_playing and not self.queue.is_empty:
             await self.start_playback()
 
-    async def choose_track(self, ctx, tracks):
-        def _check(r, u):
-            return (
-                r.emoji in OPTIONS.keys()
-                and u == ctx.author
-                and r.message.id == msg.id
-            )
+    async def import_playlist(self, ctx, batches):
+        self.cancel_import()
+
+        try:
+            first = await batches.__anext__()
+        except StopAsyncIteration:
+            raise NoTracksFound
+
+        await self.mailbox.call(self.enqueue, first)
+        self.import_task = self.bot.loop.create_task(self._import_rest(ctx, batches, len(first)))
+
+    async def _import_rest(self, ctx, batches, count):
+        embed = discord.Embed(
+            description=f"Importing playlist... **{count:,}** tracks added so far. [{ctx.message.author.mention}]",
+            color=0xff0000
+        )
+        msg = None
 
+        try:
+            msg = await ctx.send(embed=embed)
+            last_update = self.bot.loop.time()
+
+            async for batch in batches:
+                # Through enqueue, so a player whose queue ran dry while the batch loaded starts again.
+                await self.mailbox.call(self.enqueue, batch)
+                count += len(batch)
+
+                if self.bot.loop.time() - last_update >= IMPORT_PROGRESS_INTERVAL:
+                    embed.description = f"Importing playlist... **{count:,}** tracks added so far. [{ctx.message.author.mention}]"
+                    await msg.edit(embed=embed)
+                    last_update = self.bot.loop.time()
+        except asyncio.CancelledError:
+            if msg is not None:
+                embed.description = f"Playlist import cancelled after **{count:,}** tracks. [{ctx.message.author.mention}]"
+                await msg.edit(embed=embed)
+            raise
+        finally:
+            await batches.aclose()
+            if self.import_task is asyncio.current_task():
+                self.import_task = None
+
+        embed.description = f"Added **{count:,}** tracks to the queue. [{ctx.message.author.mention}]"
+        await msg.edit(embed=embed)
+
+    def cancel_import(self):
+        if self.import_task is not None:
+            self.import_task.cancel()
+            self.import_task = None
+
+    async def choose_track(self, ctx, tracks):
         embed = discord.Embed(
             title="Choose a song",
-            description=(
-                "\n".join(
-                    f"**{i+1}.** {t.title} ({t.length//60000}:{str(t.length%60).zfill(2)})"
-                    for i, t in enumerate(tracks[:5])
-                )
-            ),
+            description=track_choices(tracks),
             color=0xff0000,
             timestamp=dt.datetime.utcnow()
         )
         embed.set_footer(text=f"Invoked by {ctx.author.display_name}", icon_url=ctx.author.avatar_url)
 
-        msg = await ctx.send(embed=embed)
-        for emoji in list(OPTIONS.keys())[:min(len(tracks), len(OPTIONS))]:
-            await msg.add_reaction(emoji)
-        
-        try:
-            reaction, _ = await self.bot.wait_for("reaction_add", timeout=60.0, check=_check)
-        except asyncio.TimeoutError:
-            await msg.delete()
+        count = min(len(tracks), len(OPTIONS))
+
+        if HAS_COMPONENTS:
+            view = ChoiceView(ctx.author.id, count)
+            msg = await ctx.send(embed=embed, view=view)
+            await view.wait()
+            choice = view.choice
+        else:
+            msg = await ctx.send(embed=embed)
+            emojis = list(OPTIONS.keys())[:count]
+            adding = self.bot.loop.create_task(add_reactions(msg, emojis))
+            try:
+                choice = OPTIONS[await self.reactions.wait(msg.id, ctx.author.id, emojis)]
+            except asyncio.TimeoutError:
+                choice = None
+            finally:
+                adding.cancel()
+
+        await msg.delete()
+        if choice is None:
             await ctx.message.delete()
+            return None
+        return tracks[choice]
+
+    def queue_eq(self, equalizer):
+        # Changes within EQ_DEBOUNCE of the first one replace each other and reach the node as one update.
+        self.pending_eq = equalizer
+        self.eq_levels = [band["gain"] for band in equalizer.eq]
+        if self.eq_handle is None:
+            self.eq_handle = self.bot.loop.call_later(EQ_DEBOUNCE, self.start_eq_flush)
+
+    def start_eq_flush(self):
+        self.eq_handle = None
+        self.eq_task = self.bot.loop.create_task(self.flush_eq())
+
+    async def flush_eq(self):
+        equalizer, self.pending_eq = self.pending_eq, None
+
+        try:
+            if equalizer is not None and self.is_connected and equalizer.eq != self.equalizer.eq:
+                await self.set_eq(equalizer)
+        except Exception:
+            log.exception("Applying the equalizer of guild %s failed", self.guild_id)
+        finally:
+            if self.eq_task is asyncio.current_task():
+                self.eq_task = None
+
+    def cancel_eq(self):
+        if self.eq_handle is not None:
+            self.eq_handle.cancel()
+            self.eq_handle = None
+        if self.eq_task is not None:
+            self.eq_task.cancel()
+            self.eq_task = None
+        self.pending_eq = None
+
+    async def play(self, track, **kwargs):
+        self.cancel_handover()
+        self.clock, self.start_position = None, kwargs.get("start", 0)
+        self.play_sent = time.perf_counter()
+        await super().play(track, **kwargs)
+
+    async def stop(self):
+        self.cancel_handover()
+        await super().stop()
+
+    async def set_pause(self, pause):
+        if self.clock is not None:
+            self.sync_clock()
+        await super().set_pause(pause)
+        self.schedule_handover()
+
+    async def seek(self, position=0):
+        await super().seek(position)
+        if self.clock is not None:
+            self.sync_clock(position)
+        self.schedule_handover()
+
+    @property
+    def playback_position(self):
+        # Our own estimate in ms, wavelink's position is only right after a playerUpdate.
+        if self.clock is None:
+            return 0
+        at, position = self.clock
+        return position if self.paused else position + (self.bot.loop.time() - at) * 1000
+
+    def sync_clock(self, position=None):
+        self.clock = (self.bot.loop.time(), self.playback_position if position is None else position)
+
+    def schedule_handover(self):
+        """Send the next track shortly before the current one ends instead of waiting for its TrackEndEvent."""
+        self.cancel_handover()
+        if not config.GAPLESS_PLAYBACK or (track := self.current) is None or track.is_stream or self.paused or self.clock is None:
+            return
+
+        lead = self.bot.get_cog("Music").handover_lead(self.node)
+        delay = (track.length - self.playback_position) / 1000 - lead
+        self.handover = self.bot.loop.call_later(max(0., delay), lambda: self.mailbox.post(self.hand_over, track))
+
+    def cancel_handover(self):
+        if self.handover is not None:
+            self.handover.cancel()
+            self.handover = None
+
+    async def hand_over(self, track):
+        self.handover = None
+        if self.current is not track or self.paused or not self.is_connected:
+            return
+
+        if self.queue.repeat_mode == RepeatMode.SINGLE:
+            next_track = self.queue.current_track
+        elif self.queue.peek_next() is None and self.queue_autoplay() is None:
+            return
         else:
-            await msg.delete()
-            return tracks[OPTIONS[reaction.emoji]]
+            next_track = self.queue.get_next_track()
+
+        metrics.TRACK_HANDOVER_LEAD.observe(max(0., track.length - self.playback_position) / 1000)
+        # The end event of the old track, REPLACED or FINISHED if it ended first, must not advance the queue again.
+        self.handed_over = track.id
+        await self.play(next_track)
 
     async def start_playback(self):
         await self.play(self.queue.current_track)
 
     async def advance(self):
+        """Play the next track, or one from autoplay, and return it; ``None`` when there was nothing to play."""
         try:
-            if (track := self.queue.get_next_track()) is not None:
-                await self.play(track)
-            else:
-                time = 0
-                while True:
-                    await asyncio.sleep(1)
-                    time += 1
-                    if self.is_playing and not self.is_paused:
-                        time = 0
-                    if time == 750:
-                        await self.teardown()
-                    if not self.is_connected:
-                        break
+            track = self.queue.get_next_track()
         except QueueIsEmpty:
-            pass
+            return None
+
+        if track is None and self.queue.position >= self.queue.length:
+            track = self.queue_autoplay()
+        if track is not None:
+            await self.play(track)
+        return track
+
+    def recent_identifiers(self):
+        return {track.identifier for track in self.queue.recent(AUTOPLAY_EXCLUDE)}
+
+    @property
+    def can_autoplay(self):
+        cog = self.bot.get_cog("Music")
+        return self.queue.repeat_mode == RepeatMode.NONE and cog.autoplay_enabled(self.guild_id) and self.guild_id in cog.autoplay
+
+    def queue_autoplay(self):
+        """Append a prefetched related track to a queue that ran out, if the guild has autoplay on."""
+        if not self.can_autoplay:
+            return None
+        if (track := self.bot.get_cog("Music").autoplay.take(self.guild_id, self.recent_identifiers())) is None:
+            return None
+
+        self.queue.position = min(self.queue.position, self.queue.length)
+        self.queue.add(track)
+        return track
         
     async def repeat_track(self):
         await self.play(self.queue.current_track)
@@ -294,31 +736,176 @@ class Player(wavelink.Player):
 class Music(commands.Cog, wavelink.WavelinkMixin):
     def __init__(self, bot):
         self.bot = bot
-        self.wavelink = wavelink.Client(bot=bot)
+        self.handing_off = False
+        self.ready_nodes = set()
+        # Guilds that asked for lyrics at least once get them fetched ahead for every track.
+        self.lyrics_guilds = set()
+        self.degraded_nodes = set()
+        self.node_retries = {}
+
+        if (handoff := getattr(bot, "music_handoff", None)) is not None:
+            self.adopt(handoff)
+        else:
+            self.init_state()
+
+        self.snapshot_loop.change_interval(seconds=config.SNAPSHOT_INTERVAL)
+        if config.SNAPSHOT_PATH:
+            self.snapshot_loop.start()
+            atexit.register(self.save_snapshot)
+        self.node_monitor.change_interval(seconds=config.NODE_CHECK_INTERVAL)
+        self.node_monitor.start()
+        self.player_sweep.change_interval(seconds=max(1, min(PLAYER_SWEEP_INTERVAL, config.PLAYER_EVICT_AFTER)))
+        self.player_sweep.start()
+        metrics.PLAYERS.set_function(self.player_counts)
+        metrics.PLAYER_MEMORY.set_function(lambda: sum(self.players.memory().values()))
+        metrics.QUEUED_TRACKS.set_function(lambda: sum(player.queue.length for player in self.players))
+        metrics.SEARCH_CACHE.set_function(lambda: {(k,): v for k, v in self.search.stats.items()})
+        metrics.PLAY_HISTORY.set_function(lambda: {(k,): v for k, v in self.play_history.stats.items() if k in ("guilds", "entries", "bytes")})
+
+    def init_state(self):
+        self.session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(
+                limit=config.HTTP_POOL_LIMIT,
+                limit_per_host=config.HTTP_POOL_LIMIT_PER_HOST,
+                keepalive_timeout=60
+            )
+        )
+        self.wavelink = wavelink.Client(bot=self.bot, session=self.session)
+        self.players = PlayerRegistry(self.wavelink, Player, grace=config.PLAYER_EVICT_AFTER)
+        self.search = SearchResolver(
+            self.wavelink,
+            maxsize=config.SEARCH_CACHE_SIZE,
+            ttl=config.SEARCH_CACHE_TTL,
+            path=config.SEARCH_CACHE_PATH
+        )
+        self.lyrics = LRUCache(config.LYRICS_CACHE_SIZE, config.LYRICS_CACHE_TTL)
+        self.queue_pages = LRUCache(1024)
+        self.start_latency = {}
+        self.eq_presets = LRUCache(1024)
+        self.play_history = PlayHistory(size=config.PLAY_HISTORY_SIZE, max_bytes=int(config.PLAY_HISTORY_MEMORY * 1024 * 1024))
+        self.autoplay = Autoplay(self.search, self.play_history, size=config.AUTOPLAY_BUFFER_SIZE, rate=config.AUTOPLAY_SEARCH_RATE)
+        self.outbox = Outbox(loop=self.bot.loop)
+        self.reactions = ReactionRouter()
+        self.settings = GuildSettings(config.GUILD_SETTINGS_PATH, loop=self.bot.loop)
+        self.idle = DeadlineScheduler(self.on_idle_timeout, loop=self.bot.loop)
+        self.idle.start()
+        self.restore_task = None
+        self._lyrics_requests = {}
+        self.node_ready = asyncio.Event()
         self.bot.loop.create_task(self.start_nodes())
 
+    def adopt(self, handoff):
+        # A new wavelink.Client would unhook the old one's voice updates, so the nodes come along as they are.
+        self.__dict__.update(handoff["state"])
+        self.players = PlayerRegistry(self.wavelink, Player, grace=config.PLAYER_EVICT_AFTER)
+        self.players.adopt(handoff["players"])
+        self.idle.set_callback(self.on_idle_timeout)
+
+    def hand_off(self):
+        self.handing_off = True
+        return {"state": {name: getattr(self, name) for name in HANDOFF_STATE}, "players": self.players}
+
+    def cog_unload(self):
+        for gauge in (metrics.PLAYERS, metrics.PLAYER_MEMORY, metrics.QUEUED_TRACKS, metrics.SEARCH_CACHE, metrics.PLAY_HISTORY):
+            gauge.set_function(None)
+        self.snapshot_loop.cancel()
+        atexit.unregister(self.save_snapshot)
+        self.node_monitor.cancel()
+        self.player_sweep.cancel()
+        if self.handing_off:
+            # The reloaded instance carries on with everything below.
+            return
+
+        self.idle.stop()
+        self.autoplay.close()
+        self.settings.save()
+        self.search.close()
+        self.outbox.close()
+        self.bot.loop.create_task(self.session.close())
+
     @commands.Cog.listener()
     async def on_voice_state_update(self, member, before, after):
         if not member.bot and after.channel is None:
-            if not [m for m in before.channel.members if not m.bot]:
-                await self.get_player(member.guild).teardown()
+            if not [m for m in before.channel.members if not m.bot] and (player := self.players.get(member.guild.id)) is not None:
+                await player.teardown()
+
+    @commands.Cog.listener()
+    async def on_raw_reaction_add(self, payload):
+        self.reactions.dispatch(payload)
 
     @wavelink.WavelinkMixin.listener()
     async def on_node_ready(self, node):
         print(f"Wavelink node `{node.identifier}` is ready")
+        self.ready_nodes.add(node.identifier)
+        self.node_retries.pop(node.identifier, None)
+        startup.mark("first_node")
+        self.node_ready.set()
+
+        if self.restore_task is None:
+            self.restore_task = self.bot.loop.create_task(self.restore_snapshot())
 
     @wavelink.WavelinkMixin.listener("on_track_stuck")
     @wavelink.WavelinkMixin.listener("on_track_end")
     @wavelink.WavelinkMixin.listener("on_track_exception")
     async def on_player_stop(self, node, payload):
-        if payload.player.queue.repeat_mode == RepeatMode.SINGLE:
-            await payload.player.repeat_track()
+        payload.player.track_ended = time.perf_counter()
+        payload.player.mailbox.post(self.handle_track_stop, payload)
+
+    async def handle_track_stop(self, payload):
+        player = payload.player
+
+        # A replaced track ends because something else already started playing.
+        if (reason := getattr(payload, "reason", None)) == "REPLACED":
+            return
+        if reason is not None and payload.track == player.handed_over:
+            player.handed_over = None
+            return
+        # A command already moved on from this track, advancing again would skip one.
+        if player.current is not None and payload.track != player.current.id:
+            return
+
+        player.cancel_handover()
+
+        if player.queue.repeat_mode == RepeatMode.SINGLE:
+            await player.repeat_track()
         else:
-            await payload.player.advance()
+            await player.advance()
+
+        if player.current is None:
+            # The queue ran out; whatever starts next is not a track transition.
+            player.track_ended = None
+        self.update_idle(player)
 
-    # @wavelink.WavelinkMixin.listener
-    # async def on_track_start(self, node, payload):
-    #     await payload.player.now_playing()
+    @wavelink.WavelinkMixin.listener()
+    async def on_track_start(self, node, payload):
+        player, now = payload.player, time.perf_counter()
+        if player.play_sent is not None:
+            metrics.LAVALINK_WS_RTT.observe(rtt := now - player.play_sent)
+            previous = self.start_latency.get(node.identifier, rtt)
+            self.start_latency[node.identifier] = previous * 0.8 + rtt * 0.2
+            player.play_sent = None
+        if player.track_ended is not None:
+            metrics.TRACK_START_GAP.observe(now - player.track_ended)
+            player.track_ended = None
+
+        if player.clock is None:
+            player.sync_clock(player.start_position)
+        else:
+            # The same track started again, on another node after a failover.
+            player.sync_clock()
+        player.mailbox.post(self.handle_track_start, payload)
+
+    async def handle_track_start(self, payload):
+        player = payload.player
+        player.handed_over = None
+        player.schedule_handover()
+
+        self.idle.cancel(player.guild_id)
+        if (track := player.current) is not None:
+            self.play_history.add(player.guild_id, track)
+            if player.guild_id in self.lyrics_guilds:
+                self.prefetch_lyrics(track)
+            self.prefetch_related(player)
 
     async def cog_check(self, ctx):
         if isinstance(ctx.channel, discord.DMChannel):
@@ -326,39 +913,267 @@ class Music(commands.Cog, wavelink.WavelinkMixin):
             description="Music commands are not available in DMs.",
             color=0xff0000
         )
-            await ctx.send(embed=embed)
+            await self.outbox.send(ctx, embed=embed)
             return False
 
         return True
 
+    async def cog_command_error(self, ctx, exc):
+        if isinstance(exc, NoActivePlayer):
+            embed = discord.Embed(
+            description="Nothing is playing in this server!",
+            color=0xff0000
+        )
+            await self.outbox.send(ctx, embed=embed)
+        elif isinstance(exc, MailboxFull):
+            embed = discord.Embed(
+            description="Too many commands at once, try again in a moment!",
+            color=0xff0000
+        )
+            await self.outbox.send(ctx, embed=embed)
+
     async def start_nodes(self):
+        # wavelink holds every handshake until the bot is ready, so start them all at once then.
         await self.bot.wait_until_ready()
 
-        nodes = {
-            "MAIN": {
-                "host": "127.0.0.1",
-                "port": 2333,
-                "rest_uri": "http://127.0.0.1:2333",
-                "password": "youshallnotpass",
-                "identifier": "MAIN",
-                "region": "europe",
-            }
-        }
-
-        for node in nodes.values():
-            await self.wavelink.initiate_node(**node)
-
-    def get_player(self, obj):
+        nodes = load_nodes(config.LAVALINK_NODES)
+        results = await asyncio.gather(*(self.wavelink.initiate_node(**node) for node in nodes), return_exceptions=True)
+        for node, result in zip(nodes, results):
+            if isinstance(result, Exception):
+                print(f"Wavelink node `{node.get('identifier')}` failed to start: {result!r}")
+
+        startup.mark("all_nodes")
+        print(f"Startup: {startup.report()}")
+
+    async def wait_for_node(self):
+        # Commands that arrive while the nodes are still connecting wait for the first one instead of failing.
+        if not self.node_ready.is_set():
+            try:
+                await asyncio.wait_for(self.node_ready.wait(), NODE_READY_TIMEOUT)
+            except asyncio.TimeoutError:
+                pass
+
+    @tasks.loop(seconds=5)
+    async def node_monitor(self):
+        for node in list(self.wavelink.nodes.values()):
+            # wavelink only reconnects nodes that connected once, retry the ones that never did.
+            if node.identifier not in self.ready_nodes and not node.is_available:
+                await self.retry_node(node)
+
+            degraded = node_health_penalty(node) > config.NODE_PENALTY_LIMIT
+            if degraded and node.identifier not in self.degraded_nodes:
+                print(f"Wavelink node `{node.identifier}` is degraded")
+                self.degraded_nodes.add(node.identifier)
+                node.close()
+            elif not degraded and node.identifier in self.degraded_nodes:
+                print(f"Wavelink node `{node.identifier}` recovered")
+                self.degraded_nodes.discard(node.identifier)
+                node.open()
+
+            if node.players and not node.is_available:
+                await self.move_players(node)
+
+    async def retry_node(self, node):
+        delay, retry_at = self.node_retries.get(node.identifier, (config.NODE_CHECK_INTERVAL, 0))
+        if time.monotonic() < retry_at:
+            return
+
+        # Probe the REST port first, wavelink prints a full traceback for every failed websocket connect.
+        try:
+            async with self.session.get(node.rest_uri, timeout=aiohttp.ClientTimeout(total=5)):
+                pass
+        except (aiohttp.ClientError, asyncio.TimeoutError) as exc:
+            print(f"Wavelink node `{node.identifier}` is unreachable ({exc.__class__.__name__}), retrying in {delay:.0f}s")
+            self.node_retries[node.identifier] = (min(delay * 2, NODE_RETRY_MAX), time.monotonic() + delay)
+            return
+
+        self.node_retries[node.identifier] = (min(delay * 2, NODE_RETRY_MAX), time.monotonic() + delay)
+        await node.connect(self.bot)
+
+    @node_monitor.before_loop
+    async def before_node_monitor(self):
+        await self.bot.wait_until_ready()
+
+    @tasks.loop(seconds=PLAYER_SWEEP_INTERVAL)
+    async def player_sweep(self):
+        await self.players.sweep()
+
+    async def move_players(self, node):
+        exclude = {node.identifier, *self.degraded_nodes}
+        try:
+            for player in list(node.players.values()):
+                if (target := best_node(self.wavelink.nodes.values(), exclude=exclude)) is None:
+                    return
+
+                try:
+                    await player.change_node(target.identifier)
+                except wavelink.WavelinkException:
+                    continue
+
+                if any(band["gain"] for band in player.equalizer.eq):
+                    await player.set_eq(player.equalizer)
+        finally:
+            # change_node reopens the node it moves a player off, which would undo closing a degraded node.
+            if node.identifier in self.degraded_nodes:
+                node.close()
+
+        print(f"Moved players off wavelink node `{node.identifier}`")
+
+    def player_counts(self):
+        counts = {("connected",): 0, ("playing",): 0, ("paused",): 0}
+        for player in self.players:
+            counts[("connected",)] += player.is_connected
+            counts[("playing",)] += player.is_playing and not player.is_paused
+            counts[("paused",)] += player.is_paused
+        return counts
+
+    @property
+    def can_snapshot(self):
+        # Until the last snapshot is restored, writing a new one would overwrite it with nothing.
+        return self.restore_task is not None and self.restore_task.done()
+
+    def save_snapshot(self):
+        if config.SNAPSHOT_PATH and self.can_snapshot:
+            write_snapshot(config.SNAPSHOT_PATH, dump_players(self.players))
+
+    @tasks.loop(seconds=60)
+    async def snapshot_loop(self):
+        if self.can_snapshot:
+            data = dump_players(self.players)
+            await self.bot.loop.run_in_executor(None, write_snapshot, config.SNAPSHOT_PATH, data)
+
+    @snapshot_loop.before_loop
+    async def before_snapshot_loop(self):
+        await self.bot.wait_until_ready()
+
+    async def restore_snapshot(self):
+        if (data := await self.bot.loop.run_in_executor(None, read_snapshot, config.SNAPSHOT_PATH)) is None:
+            return
+
+        start = self.bot.loop.time()
+        tracks = load_tracks(data["tracks"])
+        semaphore = asyncio.Semaphore(config.RESTORE_CONCURRENCY)
+
+        async def restore(state):
+            if (guild := self.bot.get_guild(state["guild"])) is None:
+                return False
+            if (channel := guild.get_channel(state["channel"])) is None or self.players.get(guild.id) is not None:
+                return False
+
+            async with semaphore:
+                player = self.get_player(guild, create=True)
+                await player.restore(channel, [tracks[i] for i in state["tracks"]], state)
+                self.update_idle(player)
+                return True
+
+        results = await asyncio.gather(*(restore(state) for state in data["players"]), return_exceptions=True)
+        restored = sum(result is True for result in results)
+        print(f"Restored {restored}/{len(results)} players from snapshot in {self.bot.loop.time() - start:.2f}s")
+
+    def update_idle(self, player):
+        if player.is_connected and (not player.is_playing or player.is_paused):
+            self.idle.arm(player.guild_id, self.settings.get(player.guild_id, "idle_timeout", config.IDLE_TIMEOUT))
+        else:
+            self.idle.cancel(player.guild_id)
+
+    def autoplay_enabled(self, guild_id):
+        return self.settings.get(guild_id, "autoplay", False)
+
+    def prefetch_related(self, player):
+        # Only queues about to run out need candidates, longer ones would search for nothing.
+        if (track := player.current) is None or not self.autoplay_enabled(player.guild_id):
+            return
+        if player.queue.repeat_mode == RepeatMode.NONE and player.queue.upcoming_length <= 1:
+            self.autoplay.prefetch(player.guild_id, track, player.recent_identifiers())
+
+    async def on_idle_timeout(self, guild_id):
+        if (player := self.players.get(guild_id)) is not None and (not player.is_playing or player.is_paused):
+            await player.teardown()
+
+    def stream_tracks(self, query):
+        if (node := best_node(self.wavelink.nodes.values(), exclude=self.degraded_nodes)) is None:
+            raise wavelink.ZeroConnectedNodes
+
+        return stream_tracks(self.session, node, query)
+
+    def history_track(self, guild_id, query):
+        # Links and explicit search prefixes always go to Lavalink.
+        if is_text_query(query):
+            return self.play_history.find(guild_id, query.strip("<>"))
+
+    def eq_preset(self, guild_id, name):
+        if (equalizer := EQ_PRESETS.get(name := name.lower())) is not None:
+            return equalizer
+
+        if (equalizer := self.eq_presets.get((guild_id, name))) is None:
+            if (levels := self.settings.get(guild_id, "eq_presets", {}).get(name)) is None:
+                return None
+            equalizer = wavelink.eqs.Equalizer(levels=list(enumerate(levels)), name=name)
+            self.eq_presets.put((guild_id, name), equalizer)
+        return equalizer
+
+    def handover_lead(self, node):
+        # Sending the next track as long before the end as a track takes to start makes it start about on time.
+        return min(config.GAPLESS_MAX_LEAD, self.start_latency.get(getattr(node, "identifier", None), 0.))
+
+    def lyrics_key(self, track):
+        return f"track:{track.identifier or track.title}"
+
+    def prefetch_lyrics(self, track):
+        if self.lyrics.get(key := self.lyrics_key(track), MISSING, count=False) is MISSING:
+            self.request_lyrics(track.title, key)
+
+    def request_lyrics(self, name, key):
+        if (task := self._lyrics_requests.get(key)) is None:
+            task = self._lyrics_requests[key] = asyncio.ensure_future(self.fetch_lyrics(name, key))
+            task.add_done_callback(lambda f: self._lyrics_request_done(key, f))
+        return task
+
+    def _lyrics_request_done(self, key, fut):
+        self._lyrics_requests.pop(key, None)
+        if not fut.cancelled():
+            fut.exception()
+
+    async def fetch_lyrics(self, name, key):
+        try:
+            async with self.session.get(LYRICS_URL + quote(name), timeout=aiohttp.ClientTimeout(total=15)) as r:
+                if r.status == 404:
+                    self.lyrics.put(key, None, ttl=300)
+                    return None
+
+                if not 200 <= r.status <= 299:
+                    return None
+
+                data = await r.json()
+        except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as exc:
+            raise LyricsUnavailable from exc
+
+        self.lyrics.put(key, data)
+        return data
+
+    def get_player(self, obj, *, create=False):
         if isinstance(obj, commands.Context):
-            return self.wavelink.get_player(obj.guild.id, cls=Player, context=obj)
+            guild, kwargs = obj.guild, {"context": obj}
         elif isinstance(obj, discord.Guild):
-            return self.wavelink.get_player(obj.id, cls=Player)
+            guild, kwargs = obj, {}
+        else:
+            return
+
+        if (player := self.players.get(guild.id)) is not None:
+            return player
+        # Only commands that start playback get a new player, the rest have nothing to act on.
+        if not create:
+            raise NoActivePlayer
+
+        return self.players.create(guild.id, best_node(self.wavelink.nodes.values(), exclude=self.degraded_nodes), **kwargs)
 
     @commands.command(name="connect", aliases=["join", "j"], help="Connects the bot to your voice channel or channel given by your query")
     async def connect_command(self, ctx, *, channel: t.Optional[discord.VoiceChannel]):
-        player = self.get_player(ctx)
+        await self.wait_for_node()
+        player = self.get_player(ctx, create=True)
         channel = await player.connect(ctx, channel)
-        await ctx.message.add_reaction("👌")
+        self.update_idle(player)
+        await self.outbox.react(ctx.message, "👌")
 
     @connect_command.error
     async def connect_command_error(self, ctx, exc):
@@ -367,23 +1182,25 @@ class Music(commands.Cog, wavelink.WavelinkMixin):
             description="Already connected to a voice channel!",
             color=0xff0000
         )
-            await ctx.send(embed=embed)
+            await self.outbox.send(ctx, embed=embed)
         elif isinstance(exc, NoVoiceChannel):
             embed = discord.Embed(
             description="You must type voice channel name or be connected to a voice channel to use this command!",
             color=0xff0000
         )
-            await ctx.send(embed=embed)
+            await self.outbox.send(ctx, embed=embed)
 
     @commands.command(name="disconnect", aliases=["leave", "l", "dc"], help="Disconnects the bot from your voice channel and clears the queue")
     async def disconnect_command(self, ctx):
         player = self.get_player(ctx)
         await player.teardown()
-        await ctx.message.add_reaction("👌")
+        self.idle.cancel(ctx.guild.id)
+        await self.outbox.react(ctx.message, "👌")
 
-    @commands.command(name="play", aliases=["p"], help="Loads your input and adds it to the queue; If there is no playing track, then it will start playing")
+    @commands.command(name="play", aliases=["p"], help="Loads your input and adds it to the queue; If there is no playing track, then it will start playing | Several links or one query per line are added at once")
     async def play_command(self, ctx, *, query: t.Optional[str]):
-        player = self.get_player(ctx)
+        await self.wait_for_node()
+        player = self.get_player(ctx, create=query is not None)
 
         if not player.is_connected:
             await player.connect(ctx)
@@ -393,18 +1210,83 @@ class Music(commands.Cog, wavelink.WavelinkMixin):
                 raise QueueIsEmpty
 
             await player.set_pause(False)
+            self.update_idle(player)
             embed = discord.Embed(
             description=f"Playback resumed! [{ctx.message.author.mention}]",
             color=0xff0000
         )
-            await ctx.send(embed=embed)
+            await self.outbox.send(ctx, embed=embed)
         
+        elif len(queries := split_queries(query)) > 1:
+            await self.play_batch(ctx, player, queries)
+
+        elif (track := self.history_track(ctx.guild.id, query)) is not None:
+            start = time.perf_counter()
+            await player.add_tracks(ctx, [track])
+            metrics.PLAY_STAGE_LATENCY.labels("history").observe(time.perf_counter() - start)
+
         else:
-            query = query.strip("<>")
-            if not re.match(URL_REGEX, query):
-                query = f"ytsearch:{query}"
+            parsed = classify(query)
+            query = parsed.identifier
+            start = time.perf_counter()
+
+            if config.STREAM_PLAYLISTS and parsed.is_playlist and not self.search.is_cached(query):
+                await player.import_playlist(ctx, self.stream_tracks(query))
+                metrics.PLAY_STAGE_LATENCY.labels("import").observe(time.perf_counter() - start)
+            else:
+                tracks = await self.search.get_tracks(query)
+                resolved = time.perf_counter()
+                metrics.PLAY_STAGE_LATENCY.labels("resolve").observe(resolved - start)
+                await player.add_tracks(ctx, tracks)
+                metrics.PLAY_STAGE_LATENCY.labels("add_tracks").observe(time.perf_counter() - resolved)
+
+    async def play_batch(self, ctx, player, queries):
+        queries, ignored = queries[:BATCH_LIMIT], len(queries) - BATCH_LIMIT
+        semaphore = asyncio.Semaphore(BATCH_CONCURRENCY)
+
+        async def resolve(query):
+            if (track := self.history_track(ctx.guild.id, query)) is not None:
+                return [track]
 
-            await player.add_tracks(ctx, await self.wavelink.get_tracks(query))
+            async with semaphore:
+                try:
+                    return await self.search.get_tracks(search_query(query))
+                except Exception:
+                    return None
+
+        lookups = [asyncio.ensure_future(resolve(query)) for query in queries]
+        added, missing = 0, []
+
+        try:
+            # Entries are queued in the order they were given as soon as everything before them resolved.
+            for query, lookup in zip(queries, lookups):
+                if not (result := await lookup):
+                    missing.append(query)
+                    continue
+
+                tracks = result.tracks if isinstance(result, wavelink.TrackPlaylist) else result[:1]
+                await player.mailbox.call(player.enqueue, tracks)
+                added += len(tracks)
+        finally:
+            for lookup in lookups:
+                lookup.cancel()
+
+        if not added:
+            raise NoTracksFound
+
+        description = f"Added **{added:,}** tracks from **{len(queries) - len(missing)}** of **{len(queries)}** entries to the queue. [{ctx.message.author.mention}]"
+        if missing:
+            description += "\nNothing found for: " + ", ".join(f"`{query[:50]}`" for query in missing[:5])
+            if len(missing) > 5:
+                description += f" and {len(missing) - 5} more"
+        if ignored > 0:
+            description += f"\nIgnored **{ignored}** more entries, a batch takes at most **{BATCH_LIMIT}**."
+
+        embed = discord.Embed(
+            description=description,
+            color=0xff0000
+        )
+        await self.outbox.send(ctx, embed=embed)
 
     @play_command.error
     async def play_command_error(self, ctx, exc):
@@ -413,15 +1295,136 @@ class Music(commands.Cog, wavelink.WavelinkMixin):
             description="The queue is empty!",
             color=0xff0000
         )
-            await ctx.send(embed=embed)
+            await self.outbox.send(ctx, embed=embed)
         elif isinstance(exc, NoVoiceChannel):
             embed = discord.Embed(
             description="You must be in a voice channel to use this command!",
             color=0xff0000
         )
-            await ctx.send(embed=embed)
+            await self.outbox.send(ctx, embed=embed)
+        elif isinstance(exc, NoTracksFound):
+            embed = discord.Embed(
+            description="No tracks were found for your query!",
+            color=0xff0000
+        )
+            await self.outbox.send(ctx, embed=embed)
+
+    @commands.command(name="history", aliases=["recent", "played"], help="Shows the tracks recently played in this server; -play finds them again without searching")
+    async def history_command(self, ctx):
+        if not (entries := self.play_history.recent(ctx.guild.id, QUEUE_PAGE_SIZE)):
+            raise NoTracksFound
+
+        embed = discord.Embed(
+            title="Recently played",
+            description="\n".join(
+                f"**{i+1}.** {entry.title} - {entry.author}" + (f" ({entry.plays}x)" if entry.plays > 1 else "")
+                for i, entry in enumerate(entries)
+            ),
+            color=0xff0000,
+            timestamp=dt.datetime.utcnow()
+        )
+        embed.set_footer(text=f"Invoked by {ctx.author.display_name}", icon_url=ctx.author.avatar_url)
+        await self.outbox.send(ctx, embed=embed)
+
+    @history_command.error
+    async def history_command_error(self, ctx, exc):
+        if isinstance(exc, NoTracksFound):
+            embed = discord.Embed(
+            description="Nothing has been played in this server yet!",
+            color=0xff0000
+        )
+            await self.outbox.send(ctx, embed=embed)
+
+    @commands.command(name="cachestats", hidden=True)
+    @commands.is_owner()
+    async def cachestats_command(self, ctx):
+        embed = discord.Embed(
+            title="Search cache",
+            description="\n".join(f"**{k}:** {v:,}" for k, v in self.search.stats.items()),
+            color=0xff0000
+        )
+        embed.add_field(name="Play history", value="\n".join(f"**{k}:** {v:,}" for k, v in self.play_history.stats.items()))
+        await self.outbox.send(ctx, embed=embed)
+
+    @commands.command(name="nodes", hidden=True)
+    @commands.is_owner()
+    async def nodes_command(self, ctx):
+        embed = discord.Embed(
+            title="Lavalink nodes",
+            color=0xff0000
+        )
+        for node in self.wavelink.nodes.values():
+            embed.add_field(
+                name=node.identifier,
+                value=(
+                    f"**Available:** {node.is_available}\n"
+                    f"**Players:** {len(node.players)}\n"
+                    f"**Load:** {node_load(node):,.1f}\n"
+                    f"**Health penalty:** {node_health_penalty(node):,.1f}"
+                ),
+                inline=True
+            )
+        await self.outbox.send(ctx, embed=embed)
+
+    @commands.command(name="players", hidden=True)
+    @commands.is_owner()
+    async def players_command(self, ctx):
+        memory = self.players.memory()
+        embed = discord.Embed(
+            title="Players",
+            description="\n".join(f"**{k.capitalize()}:** {v:,}" for k, v in self.players.stats.items())
+                + f"\n**Memory:** {sum(memory.values()) / 1024:,.1f} KB",
+            color=0xff0000
+        )
+        largest = sorted(memory.items(), key=lambda item: item[1], reverse=True)[:10]
+        embed.add_field(
+            name="Largest",
+            value="\n".join(f"`{guild_id}` {size / 1024:,.1f} KB" for guild_id, size in largest) or "No players"
+        )
+        await self.outbox.send(ctx, embed=embed)
+
+    @commands.command(name="mailboxes", hidden=True)
+    @commands.is_owner()
+    async def mailboxes_command(self, ctx):
+        players = sorted(self.players, key=lambda player: player.mailbox.busy, reverse=True)
+        embed = discord.Embed(
+            title="Player mailboxes",
+            description="\n".join(
+                f"`{player.guild_id}` **{player.mailbox.busy:,.2f}s** busy, {player.mailbox.processed:,} processed, "
+                f"{len(player.mailbox)} queued, {player.mailbox.dropped:,} dropped"
+                for player in players[:15]
+            ) or "No players",
+            color=0xff0000
+        )
+        await self.outbox.send(ctx, embed=embed)
+
+    @commands.command(name="idle", aliases=["timeout"], help="Sets how many seconds the bot stays in an idle voice channel before leaving | e.g. idle 300")
+    @commands.has_permissions(manage_guild=True)
+    async def idle_command(self, ctx, seconds: int):
+        if not 10 <= seconds <= 86400:
+            raise InvalidIdleTimeout
+
+        self.settings.set(ctx.guild.id, "idle_timeout", seconds)
+        if (player := self.players.get(ctx.guild.id)) is not None:
+            self.update_idle(player)
+
+        embed = discord.Embed(
+            description=f"Idle timeout set to **{seconds:,}** seconds [{ctx.message.author.mention}]",
+            color=0xff0000
+        )
+        await self.outbox.send(ctx, embed=embed)
+
+    @idle_command.error
+    async def idle_command_error(self, ctx, exc):
+        if isinstance(exc, InvalidIdleTimeout):
+            embed = discord.Embed(
+            description="The idle timeout must be between **10** and **86,400** seconds!",
+            color=0xff0000
+        )
+            await self.outbox.send(ctx, embed=embed)
 
     @commands.command(name="pause", aliases=["break"], help="Pauses playback")
+    @serialized
     async def pause_command(self, ctx):
         player = self.get_player(ctx)
         
@@ -429,11 +1432,12 @@ class Music(commands.Cog, wavelink.WavelinkMixin):
             raise PlayerIsAlreadyPaused
         
         await player.set_pause(True)
+        self.update_idle(player)
         embed = discord.Embed(
             description=f"Playback paused! [{ctx.message.author.mention}]",
             color=0xff0000
         )
-        await ctx.send(embed=embed)
+        return embed
 
     @pause_command.error
     async def pause_command_error(self, ctx, exc):
@@ -442,33 +1446,41 @@ class Music(commands.Cog, wavelink.WavelinkMixin):
             description="Playback is already paused!",
             color=0xff0000
         )
-            await ctx.send(embed=embed)
+            await self.outbox.send(ctx, embed=embed)
 
     @commands.command(name="clear", aliases=["stop", "c", "empty"], help="Removes all tracks from the queue")
+    @serialized
     async def clear_command(self, ctx):
         player = self.get_player(ctx)
+        player.cancel_import()
         player.queue.empty()
         await player.stop()
+        self.update_idle(player)
         embed = discord.Embed(
             description=f"Queue cleared! [{ctx.message.author.mention}]",
             color=0xff0000
         )
-        await ctx.send(embed=embed)
+        return embed
 
     @commands.command(name="skip", aliases=["next", "s"], help="Skips to the next song")
+    @serialized
     async def skip_command(self, ctx):
         player = self.get_player(ctx)
 
-        if not player.queue.upcoming:
+        if not player.queue.upcoming_length and not player.can_autoplay:
+            raise NoMoreTracks
+
+        track, position = player.queue.current_track, player.queue.position
+        if await player.advance() is None:
+            # Every buffered autoplay track was one the guild just heard, keep playing the current one.
+            player.queue.position = position
             raise NoMoreTracks
 
-        await player.stop()
         embed = discord.Embed(
-            description=f"Skipped **{player.queue.current_track}** [{ctx.message.author.mention}]",
+            description=f"Skipped **{track}** [{ctx.message.author.mention}]",
             color=0xff0000
         )
-        await ctx.send(embed=embed)
-        await ctx.message.add_reaction("👌")
+        return embed, "👌"
 
     @skip_command.error
     async def skip_command_error(self, ctx, exc):
@@ -477,24 +1489,25 @@ class Music(commands.Cog, wavelink.WavelinkMixin):
                 description="The queue is empty!",
                 color=0xff0000
             )
-            await ctx.send(embed=embed)
+            await self.outbox.send(ctx, embed=embed)
         elif isinstance(exc, NoMoreTracks):
             embed = discord.Embed(
                 description="There are no more tracks in the queue!",
                 color=0xff0000
             )
-            await ctx.send(embed=embed)
+            await self.outbox.send(ctx, embed=embed)
 
     @commands.command(name="back", aliases=["previous", "b"], help="Skips to the previous song")
+    @serialized
     async def back_command(self, ctx):
         player = self.get_player(ctx)
 
-        if not player.queue.history:
+        if not player.queue.history_length:
             raise NoPreviousTracks
 
-        player.queue.position -= 2
-        await player.stop()
-        await ctx.message.add_reaction("👌")
+        player.queue.position -= 1
+        await player.start_playback()
+        return ("👌",)
 
     @back_command.error
     async def back_command_error(self, ctx, exc):
@@ -503,24 +1516,24 @@ class Music(commands.Cog, wavelink.WavelinkMixin):
                 description="The queue is empty!",
                 color=0xff0000
             )
-            await ctx.send(embed=embed)
+            await self.outbox.send(ctx, embed=embed)
         elif isinstance(exc, NoPreviousTracks):
             embed = discord.Embed(
                 description="There are no previous tracks in the queue!",
                 color=0xff0000
             )
-            await ctx.send(embed=embed)
+            await self.outbox.send(ctx, embed=embed)
 
     @commands.command(name="shuffle", aliases=["sh"], help="Randomizes the current order of tracks in the queue")
+    @serialized
     async def shuffle_command(self, ctx):
         player = self.get_player(ctx)
         player.queue.shuffle()
-        await ctx.message.add_reaction("👌")
         embed = discord.Embed(
             description=f"Queue shuffled [{ctx.message.author.mention}]",
             color=0xff0000
         )
-        await ctx.send(embed=embed)
+        return "👌", embed
     
     @shuffle_command.error
     async def shuffle_command_error(self, ctx, exc):
@@ -529,9 +1542,10 @@ class Music(commands.Cog, wavelink.WavelinkMixin):
                 description="The queue is empty!",
                 color=0xff0000
             )
-            await ctx.send(embed=embed)
+            await self.outbox.send(ctx, embed=embed)
 
     @commands.command(name="loop", aliases=["repeat"], help="Starts looping single track or all queue | modes: none, single, all")
+    @serialized
     async def loop_command(self, ctx, mode: str):
         if mode not in ("none", "single", "all"):
             raise InvalidRepeatMode
@@ -542,7 +1556,7 @@ class Music(commands.Cog, wavelink.WavelinkMixin):
             description=f"Repeat mode has been set to **{mode}** [{ctx.message.author.mention}]",
             color=0xff0000
         )
-        await ctx.send(embed=embed)
+        return embed
 
     @loop_command.error
     async def loop_command_error(self, ctx, exc):
@@ -551,47 +1565,97 @@ class Music(commands.Cog, wavelink.WavelinkMixin):
                 description="Invalid loop mode! (Modes: none, single, all)",
                 color=0xff0000
             )
-            await ctx.send(embed=embed)
+            await self.outbox.send(ctx, embed=embed)
+
+    @commands.command(name="autoplay", aliases=["ap"], help="Keeps playing related tracks once the queue runs out | modes: on, off")
+    async def autoplay_command(self, ctx, mode: t.Optional[str]):
+        if mode is None:
+            enabled = not self.autoplay_enabled(ctx.guild.id)
+        elif mode in ("on", "off"):
+            enabled = mode == "on"
+        else:
+            raise InvalidAutoplayMode
 
-    @commands.command(name="queue", aliases=["q", "list"], help="Displays the queue")
-    async def queue_command(self, ctx):
-        player = self.get_player(ctx)
-        
-        if player.queue.is_empty:
-            raise QueueIsEmpty
+        if enabled:
+            self.settings.set(ctx.guild.id, "autoplay", True)
+            if (player := self.players.get(ctx.guild.id)) is not None:
+                self.prefetch_related(player)
+        else:
+            self.settings.delete(ctx.guild.id, "autoplay")
+            self.autoplay.discard(ctx.guild.id)
+
+        embed = discord.Embed(
+            description=f"Autoplay has been turned **{'on' if enabled else 'off'}** [{ctx.message.author.mention}]",
+            color=0xff0000
+        )
+        await self.outbox.send(ctx, embed=embed)
+
+    @autoplay_command.error
+    async def autoplay_command_error(self, ctx, exc):
+        if isinstance(exc, InvalidAutoplayMode):
+            embed = discord.Embed(
+                description="Invalid autoplay mode! (Modes: on, off)",
+                color=0xff0000
+            )
+            await self.outbox.send(ctx, embed=embed)
+
+    def queue_page(self, player, page):
+        queue = player.queue
+        key = (player.guild_id, queue.version, queue.position, page)
+
+        if (description := self.queue_pages.get(key)) is None:
+            description = queue_description(queue, page)
+            self.queue_pages.put(key, description)
+
+        return description
 
-        # embed = discord.Embed(
-        #     color=0xff0000,
-        #     timestamp=dt.datetime.utcnow()
-        # )
-        # embed.set_footer(text=f"Requested by {ctx.author.display_name}", icon_url=ctx.author.avatar_url)
-        # embed.add_field(
-        #     name="Currently playing",
-        #     value=getattr(player.queue.current_track, "title", "No tracks currently playing."),
-        #     inline=False
-        # )
-        # if upcoming := player.queue.upcoming:
-        #     embed.add_field(
-        #         name="Next up",
-        #         value=f"\n".join(t.title for t in upcoming),
-        #         inline=False
-        #     )
-
-        # await ctx.send(embed=embed)
+    def queue_embed(self, ctx, player, page, pages):
         embed = discord.Embed(
             color=0xff0000,
             timestamp=dt.datetime.utcnow(),
-            description = f"**Currently playing:** {player.queue.current_track.title}\n"
+            description=self.queue_page(player, page)
         )
-        embed.set_footer(text=f"Requested by {ctx.author.display_name}", icon_url=ctx.author.avatar_url)
-
-        i = 2
+        embed.set_footer(text=f"Requested by {ctx.author.display_name} | Page {page + 1}/{pages}", icon_url=ctx.author.avatar_url)
+        return embed
 
-        for song in player.queue.upcoming:
-            embed.description += f"\n**{i}.** {song.title}"
-            i += 1
+    @commands.command(name="queue", aliases=["q", "list"], help="Displays the queue | e.g. queue or queue 3 to open the third page")
+    async def queue_command(self, ctx, page: t.Optional[int] = 1):
+        player = self.get_player(ctx)
         
-        await ctx.send(embed=embed)
+        if player.queue.is_empty:
+            raise QueueIsEmpty
+
+        pages = max(1, -(-player.queue.upcoming_length // QUEUE_PAGE_SIZE))
+        page = min(max(page, 1), pages) - 1
+        msg = await ctx.send(embed=self.queue_embed(ctx, player, page, pages))
+
+        if pages == 1:
+            return
+
+        adding = self.bot.loop.create_task(add_reactions(msg, PAGE_OPTIONS.keys()))
+        while True:
+            try:
+                emoji = await self.reactions.wait(msg.id, ctx.author.id, PAGE_OPTIONS.keys())
+            except asyncio.TimeoutError:
+                break
+
+            if player.queue.is_empty:
+                break
+
+            pages = max(1, -(-player.queue.upcoming_length // QUEUE_PAGE_SIZE))
+            page = (page + PAGE_OPTIONS[emoji]) % pages
+            await msg.edit(embed=self.queue_embed(ctx, player, page, pages))
+
+            try:
+                await msg.remove_reaction(emoji, ctx.author)
+            except discord.Forbidden:
+                pass
+
+        adding.cancel()
+        try:
+            await msg.clear_reactions()
+        except discord.HTTPException:
+            pass
 
     @queue_command.error
     async def queue_command_error(self, ctx, exc):
@@ -600,7 +1664,7 @@ class Music(commands.Cog, wavelink.WavelinkMixin):
             description="The queue is empty!",
             color=0xff0000
         )
-            await ctx.send(embed=embed)
+            await self.outbox.send(ctx, embed=embed)
 
     @commands.group(name="volume", invoke_without_command=True, aliases=["vol", "v"], help="Sets the player's volume | DONT USE")
     async def volume_group(self, ctx, volume: int):
@@ -617,7 +1681,7 @@ class Music(commands.Cog, wavelink.WavelinkMixin):
             description=f"Volume set to **{volume:,}%** [{ctx.message.author.mention}]",
             color=0xff0000
         )
-        await ctx.send(embed=embed)
+        await self.outbox.send(ctx, embed=embed)
 
     @volume_group.error
     async def volume_group_error(self, ctx, exc):
@@ -626,13 +1690,13 @@ class Music(commands.Cog, wavelink.WavelinkMixin):
             description="The volume must be **0%** or above!",
             color=0xff0000
         )
-            await ctx.send(embed=embed)
+            await self.outbox.send(ctx, embed=embed)
         elif isinstance(exc, VolumeTooHigh):
             embed = discord.Embed(
-            description=f"The volume must be **1000%** or below!",
+            description="The volume must be **1000%** or below!",
             color=0xff0000
         )
-            await ctx.send(embed=embed)
+            await self.outbox.send(ctx, embed=embed)
 
     @volume_group.command(name="up")
     async def volume_up_command(self, ctx):
@@ -646,7 +1710,7 @@ class Music(commands.Cog, wavelink.WavelinkMixin):
             description=f"Volume set to **{value:,}% [{ctx.message.author.mention}]",
             color=0xff0000
         )
-        await ctx.send(embed=embed)
+        await self.outbox.send(ctx, embed=embed)
 
     @volume_up_command.error
     async def volume_up_command_error(self, ctx, exc):
@@ -655,7 +1719,7 @@ class Music(commands.Cog, wavelink.WavelinkMixin):
             description="The player is already at max volume!",
             color=0xff0000
         )
-            await ctx.send(embed=embed)
+            await self.outbox.send(ctx, embed=embed)
 
     @volume_group.command(name="down")
     async def volume_down_command(self, ctx):
@@ -669,7 +1733,7 @@ class Music(commands.Cog, wavelink.WavelinkMixin):
             description=f"Volume set to **{value:,}% [{ctx.message.author.mention}]",
             color=0xff0000
         )
-        await ctx.send(embed=embed)
+        await self.outbox.send(ctx, embed=embed)
 
     @volume_down_command.error
     async def volume_down_command_error(self, ctx, exc):
@@ -678,32 +1742,37 @@ class Music(commands.Cog, wavelink.WavelinkMixin):
             description="The player is already at min volume!",
             color=0xff0000
         )
-            await ctx.send(embed=embed)
+            await self.outbox.send(ctx, embed=embed)
 
     @commands.command(name="lyrics", aliases=["lyric", "ly"], help="Displays lyrics for the currently playing track or searches for lyrics based on your query")
     async def lyrics_command(self, ctx, *, name: t.Optional[str]):
-        player = self.get_player(ctx)
-        name = name or player.queue.current_track.title
+        self.lyrics_guilds.add(ctx.guild.id)
+        if name is None:
+            if (track := self.get_player(ctx).queue.current_track) is None:
+                raise NoActivePlayer
+            name, key = track.title, self.lyrics_key(track)
+        else:
+            key = " ".join(name.lower().split())
 
-        async with ctx.typing():
-            async with aiohttp.request("GET", LYRICS_URL + name.replace(' ', '%20'), headers={}) as r:
-                if not 200 <= r.status <= 299:
-                    raise NoLyricsFound
+        if (data := self.lyrics.get(key, MISSING)) is MISSING:
+            async with ctx.typing():
+                data = await asyncio.shield(self.request_lyrics(name, key))
 
-                data = await r.json()
+        if data is None:
+            raise NoLyricsFound
 
-                if len(data["lyrics"]) > 2000:
-                    return await ctx.send(f"<{data['links']['genius']}>")
+        if len(data["lyrics"]) > 2000:
+            return await ctx.send(f"<{data['links']['genius']}>")
 
-                embed = discord.Embed(
-                    title=data["title"],
-                    description=data["lyrics"],
-                    colour=0xff0000,
-                    timestamp=dt.datetime.utcnow(),
-                )
-                embed.set_thumbnail(url=data["thumbnail"]["genius"])
-                embed.set_author(name=data["author"])
-                await ctx.send(embed=embed)
+        embed = discord.Embed(
+            title=data["title"],
+            description=data["lyrics"],
+            colour=0xff0000,
+            timestamp=dt.datetime.utcnow(),
+        )
+        embed.set_thumbnail(url=data["thumbnail"]["genius"])
+        embed.set_author(name=data["author"])
+        await self.outbox.send(ctx, embed=embed)
 
     @lyrics_command.error
     async def lyrics_command_error(self, ctx, exc):
@@ -712,53 +1781,132 @@ class Music(commands.Cog, wavelink.WavelinkMixin):
             description="No lyrics could be found!",
             color=0xff0000
         )
-            await ctx.send(embed=embed)
+            await self.outbox.send(ctx, embed=embed)
+        elif isinstance(exc, LyricsUnavailable):
+            embed = discord.Embed(
+            description="The lyrics service isn't responding, try again later!",
+            color=0xff0000
+        )
+            await self.outbox.send(ctx, embed=embed)
 
-    @commands.command(name="eq", help="Changes the preset of the equalizer to one of the given in query ('flat', 'boost', 'metal' or 'piano') | DONT USE")
-    async def eq_command(self, ctx, preset: str):
+    @commands.group(name="eq", invoke_without_command=True, help="Changes the preset of the equalizer to 'flat', 'boost', 'metal', 'piano' or one saved with -eq save")
+    async def eq_group(self, ctx, preset: str):
         player = self.get_player(ctx)
 
-        eq = getattr(wavelink.eqs.Equalizer, preset, None)
-        if not eq:
+        if (equalizer := self.eq_preset(ctx.guild.id, preset)) is None:
             raise InvalidEQPreset
 
-        await player.set_eq(eq())
+        player.queue_eq(equalizer)
+        embed = discord.Embed(
+            description=f"Equalizer adjusted to the **{equalizer.name}** preset! [{ctx.message.author.mention}]",
+            color=0xff0000
+        )
+        await self.outbox.send(ctx, embed=embed)
+
+    @eq_group.error
+    async def eq_group_error(self, ctx, exc):
+        if isinstance(exc, InvalidEQPreset):
+            embed = discord.Embed(
+            description="The EQ preset must be either **'flat'**, **'boost'**, **'metal'**, **'piano'** or one of the presets saved in this server (see `-eq list`)",
+            color=0xff0000
+        )
+            await self.outbox.send(ctx, embed=embed)
+
+    @eq_group.command(name="save", help="Saves the current equalizer bands as a preset for this server")
+    async def eq_save_command(self, ctx, name: str):
+        player = self.get_player(ctx)
+
+        name = name.lower()
+        if name in EQ_PRESETS or name in ("save", "delete", "list") or len(name) > 20 or not name.isalnum():
+            raise InvalidEQPresetName
+
+        presets = dict(self.settings.get(ctx.guild.id, "eq_presets", {}))
+        if name not in presets and len(presets) >= EQ_PRESET_LIMIT:
+            raise TooManyEQPresets
+
+        presets[name] = list(player.eq_levels)
+        self.settings.set(ctx.guild.id, "eq_presets", presets)
+        self.eq_presets.pop((ctx.guild.id, name))
         embed = discord.Embed(
-            description=f"Equalizer adjsuted to the **{preset}** preset! [{ctx.message.author.mention}]",
+            description=f"Equalizer saved as the **{name}** preset! [{ctx.message.author.mention}]",
             color=0xff0000
         )
-        await ctx.send(embed=embed)
+        await self.outbox.send(ctx, embed=embed)
 
-    @eq_command.error
-    async def eq_command_error(self, ctx, exc):
+    @eq_save_command.error
+    async def eq_save_command_error(self, ctx, exc):
+        if isinstance(exc, InvalidEQPresetName):
+            embed = discord.Embed(
+            description="Preset names must be up to 20 letters or digits and can't be a built-in preset!",
+            color=0xff0000
+        )
+            await self.outbox.send(ctx, embed=embed)
+        elif isinstance(exc, TooManyEQPresets):
+            embed = discord.Embed(
+            description=f"This server already has **{EQ_PRESET_LIMIT}** saved presets, delete one first!",
+            color=0xff0000
+        )
+            await self.outbox.send(ctx, embed=embed)
+
+    @eq_group.command(name="delete", aliases=["remove", "rm"], help="Deletes a preset saved for this server")
+    async def eq_delete_command(self, ctx, name: str):
+        presets = dict(self.settings.get(ctx.guild.id, "eq_presets", {}))
+        if presets.pop(name := name.lower(), None) is None:
+            raise InvalidEQPreset
+
+        if presets:
+            self.settings.set(ctx.guild.id, "eq_presets", presets)
+        else:
+            self.settings.delete(ctx.guild.id, "eq_presets")
+        self.eq_presets.pop((ctx.guild.id, name))
+        await self.outbox.react(ctx.message, "👌")
+
+    @eq_delete_command.error
+    async def eq_delete_command_error(self, ctx, exc):
         if isinstance(exc, InvalidEQPreset):
             embed = discord.Embed(
-            description="The EQ preset must be either **'flat'**, **'boost'**, **'metal'** or **'piano'**",
+            description="There is no preset with that name saved in this server!",
+            color=0xff0000
+        )
+            await self.outbox.send(ctx, embed=embed)
+
+    @eq_group.command(name="list", help="Lists the equalizer presets")
+    async def eq_list_command(self, ctx):
+        saved = self.settings.get(ctx.guild.id, "eq_presets", {})
+        embed = discord.Embed(
+            title="Equalizer presets",
             color=0xff0000
         )
-            await ctx.send(embed=embed)
+        embed.add_field(name="Built-in", value=", ".join(EQ_PRESETS), inline=False)
+        embed.add_field(name="Saved in this server", value=", ".join(sorted(saved)) or "None yet, use `-eq save <name>`", inline=False)
+        await self.outbox.send(ctx, embed=embed)
 
-    @commands.command(name="adveq", aliases=["aeq"], help="Advanced equalizer - changes dB on one of the 15 given bounds. | DONT USE")
-    async def adveq_command(self, ctx, band: int, gain: float):
+    @commands.command(name="adveq", aliases=["aeq"], help="Advanced equalizer - sets the dB of one or more of the 15 bands, given as band and gain pairs (-adveq 1 5 250 -3)")
+    async def adveq_command(self, ctx, *changes: float):
         player = self.get_player(ctx)
 
-        if not 1 <= band <= 15 and band not in HZ_BANDS:
-            raise NonExistentEQBand
+        if not changes or len(changes) % 2:
+            raise MissingEQGain
+
+        levels = list(player.eq_levels)
+        for band, gain in zip(changes[::2], changes[1::2]):
+            if not band.is_integer() or (not 1 <= band <= 15 and band not in HZ_BANDS):
+                raise NonExistentEQBand
 
-        if band > 15:
-            band = HZ_BANDS.index(band) + 1
+            if (band := int(band)) > 15:
+                band = HZ_BANDS.index(band) + 1
 
-        if abs(gain) > 10:
-            raise EQGainOutOfBounds
+            if abs(gain) > 10:
+                raise EQGainOutOfBounds
 
-        player.eq_levels[band - 1] = gain / 10
-        eq = wavelink.eqs.Equalizer(levels=[(i, gain) for i, gain in enumerate(player.eq_levels)])
-        await player.set_eq(eq)
+            levels[band - 1] = gain / 10
+
+        player.queue_eq(wavelink.eqs.Equalizer(levels=list(enumerate(levels))))
         embed = discord.Embed(
-            description=f"Equalizer adjsuted [{ctx.message.author.mention}]",
+            description=f"Equalizer adjusted [{ctx.message.author.mention}]",
             color=0xff0000
         )
-        await ctx.send(embed=embed)
+        await self.outbox.send(ctx, embed=embed)
 
     @adveq_command.error
     async def adveq_command_error(self, ctx, exc):
@@ -768,20 +1916,26 @@ class Music(commands.Cog, wavelink.WavelinkMixin):
                 "frequencies: " + ", ".join(str(b) for b in HZ_BANDS),
             color=0xff0000
         )
-            await ctx.send(embed=embed)
+            await self.outbox.send(ctx, embed=embed)
         elif isinstance(exc, EQGainOutOfBounds):
             embed = discord.Embed(
             description="The EQ gain for any band should be between 10 dB and -10 dB!",
             color=0xff0000
         )
-            await ctx.send(embed=embed)
+            await self.outbox.send(ctx, embed=embed)
+        elif isinstance(exc, MissingEQGain):
+            embed = discord.Embed(
+            description="Give every band a gain, for example `-adveq 1 5 250 -3`!",
+            color=0xff0000
+        )
+            await self.outbox.send(ctx, embed=embed)
 
     @commands.command(name="playing", aliases=["np", "nowplaying", "now", "song", "songinfo", "si"], help="Displays info about the currently playing track")
     async def playing_command(self, ctx):
         player = self.get_player(ctx)
 
-        if not player.is_playing:
-            PlayerIsAlreadyPaused
+        if not player.is_playing or player.queue.current_track is None:
+            raise PlayerIsAlreadyPaused
 
         embed=discord.Embed(
             color=0xff0000,
@@ -799,7 +1953,7 @@ class Music(commands.Cog, wavelink.WavelinkMixin):
             inline=False
         )
 
-        await ctx.send(embed=embed)
+        await self.outbox.send(ctx, embed=embed)
 
     @playing_command.error
     async def playing_command_error(self, ctx, exc):
@@ -808,31 +1962,32 @@ class Music(commands.Cog, wavelink.WavelinkMixin):
             description="There is no track currently playing!",
             color=0xff0000
         )
-            await ctx.send(embed=embed)
+            await self.outbox.send(ctx, embed=embed)
         if isinstance(exc, QueueIsEmpty):
             embed = discord.Embed(
             description="The queue is empty!",
             color=0xff0000
         )
-            await ctx.send(embed=embed)
+            await self.outbox.send(ctx, embed=embed)
 
     @commands.command(name="jump", aliases=["skipto"], help="Skips to the specified track")
+    @serialized
     async def jump_command(self, ctx, index: int):
         player = self.get_player(ctx)
 
         if player.queue.is_empty:
             raise QueueIsEmpty
 
-        if not 0 <= index <= player.queue.length:
+        if not 1 <= index <= player.queue.length:
             raise NoMoreTracks
 
-        player.queue.position = index - 2
-        await player.stop()
+        player.queue.position = index - 1
+        await player.start_playback()
         embed = discord.Embed(
             description=f"Playing track in postion **{index}!** [{ctx.message.author.mention}]",
             color=0xff0000
         )
-        await ctx.send(embed=embed)
+        return embed
 
     @jump_command.error
     async def jump_command_error(self, ctx, exc):
@@ -841,15 +1996,142 @@ class Music(commands.Cog, wavelink.WavelinkMixin):
             description="There are no tracks in the queue!",
             color=0xff0000
         )
-            await ctx.send(embed=embed)
+            await self.outbox.send(ctx, embed=embed)
         elif isinstance(exc, NoMoreTracks):
             embed = discord.Embed(
-            description=f"That index is out of the bounds of the queue!",
+            description="That index is out of the bounds of the queue!",
             color=0xff0000
         )
-            await ctx.send(embed=embed)
+            await self.outbox.send(ctx, embed=embed)
+
+    @commands.command(name="move", aliases=["mv"], help="Moves a track to another position in the queue | e.g. move 5 2")
+    @serialized
+    async def move_command(self, ctx, index: int, to: int):
+        player = self.get_player(ctx)
+
+        if player.queue.is_empty:
+            raise QueueIsEmpty
+
+        if not (1 <= index <= player.queue.length and 1 <= to <= player.queue.length):
+            raise NoMoreTracks
+
+        player.queue.move(index - 1, to - 1)
+        embed = discord.Embed(
+            description=f"Moved track in position **{index}** to position **{to}!** [{ctx.message.author.mention}]",
+            color=0xff0000
+        )
+        return embed
+
+    @move_command.error
+    async def move_command_error(self, ctx, exc):
+        if isinstance(exc, QueueIsEmpty):
+            embed = discord.Embed(
+            description="There are no tracks in the queue!",
+            color=0xff0000
+        )
+            await self.outbox.send(ctx, embed=embed)
+        elif isinstance(exc, NoMoreTracks):
+            embed = discord.Embed(
+            description="That index is out of the bounds of the queue!",
+            color=0xff0000
+        )
+            await self.outbox.send(ctx, embed=embed)
+
+    @commands.command(name="remove", aliases=["rm", "delete"], help="Removes a track or a range of tracks from the queue | e.g. remove 5 or remove 5 10")
+    @serialized
+    async def remove_command(self, ctx, index: int, to: t.Optional[int]):
+        player = self.get_player(ctx)
+
+        if player.queue.is_empty:
+            raise QueueIsEmpty
+
+        to = to or index
+        if not 1 <= index <= to <= player.queue.length:
+            raise NoMoreTracks
+
+        if index == to:
+            track = player.queue.remove(index - 1)
+            description = f"Removed **{track.title}** from the queue. [{ctx.message.author.mention}]"
+        else:
+            count = player.queue.remove_range(index - 1, to)
+            description = f"Removed **{count}** tracks from the queue. [{ctx.message.author.mention}]"
+
+        embed = discord.Embed(
+            description=description,
+            color=0xff0000
+        )
+        return embed
+
+    @remove_command.error
+    async def remove_command_error(self, ctx, exc):
+        if isinstance(exc, QueueIsEmpty):
+            embed = discord.Embed(
+            description="There are no tracks in the queue!",
+            color=0xff0000
+        )
+            await self.outbox.send(ctx, embed=embed)
+        elif isinstance(exc, NoMoreTracks):
+            embed = discord.Embed(
+            description="That index is out of the bounds of the queue!",
+            color=0xff0000
+        )
+            await self.outbox.send(ctx, embed=embed)
+        elif isinstance(exc, CurrentTrackRemoval):
+            embed = discord.Embed(
+            description="You can't remove the track that is currently playing, skip it instead!",
+            color=0xff0000
+        )
+            await self.outbox.send(ctx, embed=embed)
+
+    @commands.command(name="insert", aliases=["ins"], help="Loads your input and inserts it at the given position in the queue | e.g. insert 2 never gonna give you up")
+    async def insert_command(self, ctx, index: int, *, query: str):
+        await self.wait_for_node()
+        player = self.get_player(ctx, create=True)
+
+        if not 1 <= index <= player.queue.length + 1:
+            raise NoMoreTracks
+
+        if not player.is_connected:
+            await player.connect(ctx)
+
+        if not (tracks := await self.search.get_tracks(search_query(query))):
+            raise NoTracksFound
+
+        tracks = tracks.tracks if isinstance(tracks, wavelink.TrackPlaylist) else tracks[:1]
+        await player.mailbox.call(player.enqueue, tracks, index - 1)
+        embed = discord.Embed(
+            description=(
+                f"Inserted **{tracks[0].title}** at position **{index}**. [{ctx.message.author.mention}]"
+                if len(tracks) == 1 else
+                f"Inserted **{len(tracks)}** tracks at position **{index}**. [{ctx.message.author.mention}]"
+            ),
+            color=0xff0000
+        )
+        await self.outbox.send(ctx, embed=embed)
+
+    @insert_command.error
+    async def insert_command_error(self, ctx, exc):
+        if isinstance(exc, NoMoreTracks):
+            embed = discord.Embed(
+            description="That index is out of the bounds of the queue!",
+            color=0xff0000
+        )
+            await self.outbox.send(ctx, embed=embed)
+        elif isinstance(exc, NoTracksFound):
+            embed = discord.Embed(
+            description="No tracks were found for your query!",
+            color=0xff0000
+        )
+            await self.outbox.send(ctx, embed=embed)
+        elif isinstance(exc, NoVoiceChannel):
+            embed = discord.Embed(
+            description="You must be in a voice channel to use this command!",
+            color=0xff0000
+        )
+            await self.outbox.send(ctx, embed=embed)
 
     @commands.command(name="restart", aliases=["replay", "rp"], help="Plays the current song from start")
+    @serialized
     async def restart_command(self, ctx):
         player = self.get_player(ctx)
 
@@ -861,18 +2143,19 @@ class Music(commands.Cog, wavelink.WavelinkMixin):
             description=f"Track restarted! [{ctx.message.author.mention}]",
             color=0xff0000
         )
-        await ctx.send(embed=embed)
+        return embed
 
     @restart_command.error
     async def restart_command_error(self, ctx, exc):
         if isinstance(exc, QueueIsEmpty):
             embed = discord.Embed(
-            description=f"The queue is empty!",
+            description="The queue is empty!",
             color=0xff0000
         )
-            await ctx.send(embed=embed)
+            await self.outbox.send(ctx, embed=embed)
 
     @commands.command(name="seek", help="Skips to the specified timestamp in the currently playing track | e.g. 1m30s or 30s or 1m0s")
+    @serialized
     async def seek_command(self, ctx, position: str):
         player = self.get_player(ctx)
 
@@ -892,7 +2175,7 @@ class Music(commands.Cog, wavelink.WavelinkMixin):
             description=f"Seeked! [{ctx.message.author.mention}]",
             color=0xff0000
         )
-        await ctx.send(embed=embed)
+        return embed
 
 def setup(bot):
     bot.add_cog(Music(bot))
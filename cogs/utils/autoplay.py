@@ -0,0 +1,113 @@
+"""Related tracks kept ready for autoplay.
+
+While a guild with autoplay on plays the last tracks of its queue, a
+background task collects candidates related to the current track: the
+YouTube mix for it (or a search for its author when it is not a YouTube
+track) and what the guild itself played by the same author. When the queue
+runs out the next track is taken from that buffer, so it starts without
+waiting on a search.
+
+Every guild keeps at most ``size`` candidates and has a token bucket of
+``rate`` Lavalink searches per ``per`` seconds; queries the search cache
+already holds don't use a token. A guild out of budget keeps the candidates
+it already has.
+"""
+import asyncio
+import collections
+import logging
+
+import wavelink
+
+from .metrics import Counter
+from .outbox import TokenBucket
+
+PREFETCHES = Counter("boggy_autoplay_prefetches_total", "Related track prefetches by outcome", ["result"])
+PICKS = Counter("boggy_autoplay_picks_total", "Tracks autoplay started when a queue ran out, or failed to", ["result"])
+
+log = logging.getLogger(__name__)
+
+
+def related_query(track):
+    if track.info.get("sourceName") == "youtube" or "youtube.com/" in (track.uri or ""):
+        return f"https://www.youtube.com/watch?v={track.identifier}&list=RD{track.identifier}"
+    return f"ytsearch:{track.author}"
+
+
+class RelatedTracks:
+    __slots__ = ("seed", "tracks", "bucket", "task")
+
+    def __init__(self, rate, per):
+        self.seed = None
+        self.tracks = collections.deque()
+        self.bucket = TokenBucket(rate, per)
+        self.task = None
+
+
+class Autoplay:
+    def __init__(self, search, history, *, size=5, rate=4, per=60.0):
+        self.search = search
+        self.history = history
+        self.size = size
+        self.rate = rate
+        self.per = per
+        self.guilds = {}
+
+    def __contains__(self, guild_id):
+        return bool((related := self.guilds.get(guild_id)) is not None and related.tracks)
+
+    def prefetch(self, guild_id, track, exclude):
+        """Start collecting tracks related to ``track`` unless that is already done or underway."""
+        if (related := self.guilds.get(guild_id)) is None:
+            related = self.guilds[guild_id] = RelatedTracks(self.rate, self.per)
+        if related.seed == track.identifier or related.task is not None:
+            return
+
+        related.seed = track.identifier
+        related.task = asyncio.ensure_future(self._fill(guild_id, related, track, exclude))
+
+    def take(self, guild_id, exclude):
+        if (related := self.guilds.get(guild_id)) is not None:
+            while related.tracks:
+                if (track := related.tracks.popleft()).identifier not in exclude:
+                    PICKS.labels("buffered").inc()
+                    return track
+
+        PICKS.labels("empty").inc()
+        return None
+
+    def discard(self, guild_id):
+        if (related := self.guilds.pop(guild_id, None)) is not None and related.task is not None:
+            related.task.cancel()
+
+    def close(self):
+        for guild_id in list(self.guilds):
+            self.discard(guild_id)
+
+    async def _fill(self, guild_id, related, track, exclude):
+        try:
+            candidates = []
+            query = related_query(track)
+            if self.search.is_cached(query) or related.bucket.take():
+                try:
+                    result = await self.search.get_tracks(query)
+                except Exception:
+                    PREFETCHES.labels("failed").inc()
+                    log.debug("Autoplay search %r failed", query, exc_info=True)
+                else:
+                    candidates.extend(result.tracks if isinstance(result, wavelink.TrackPlaylist) else result or ())
+                    PREFETCHES.labels("searched").inc()
+            else:
+                PREFETCHES.labels("rate_limited").inc()
+
+            candidates.extend(self.history.related(guild_id, track))
+
+            # Fresh candidates go first, the ones left from the previous track fill up the rest.
+            seen = set(exclude)
+            tracks = []
+            for candidate in (*candidates, *related.tracks):
+                if candidate.identifier not in seen:
+                    seen.add(candidate.identifier)
+                    tracks.append(candidate)
+            related.tracks = collections.deque(tracks[:self.size])
+        finally:
+            related.task = None
@@ -0,0 +1,221 @@
+"""Per-guild index of the tracks a guild actually played.
+
+A plain text ``-play`` query is matched against the guild's history before it
+goes to Lavalink as a ``ytsearch:``. Every query word has to be a prefix of a
+word in the title or author, or one typo away from one, and the query has to
+cover at least half of the title's words (ignoring bracketed parts such as
+"(Official Video)") so a single common word doesn't pick an unrelated song.
+Only whole words count toward that, typed out or with one typo, so "love"
+doesn't pick "Lovely" and "hell" doesn't pick "Hello".
+
+Each guild keeps its ``size`` most recently played tracks and all guilds share
+a ``max_bytes`` budget; when it is exceeded the guild that played least
+recently is dropped as a whole.
+"""
+import bisect
+import re
+import sys
+from collections import OrderedDict
+
+import wavelink
+
+from .metrics import Counter
+
+MIN_COVERAGE = 0.5
+MIN_QUERY_LENGTH = 3
+# Rough size of an entry besides its strings: the entry, the info dict and the index postings.
+ENTRY_OVERHEAD = 600
+
+LOOKUPS = Counter("boggy_play_history_lookups_total", "Play queries answered from the guild's play history", ["result"])
+
+_WORDS = re.compile(r"\w+")
+_BRACKETS = re.compile(r"[(\[][^)\]]*[)\]]")
+
+
+def tokenize(text):
+    return _WORDS.findall(text.casefold())
+
+
+def one_edit(a, b):
+    """Whether ``a`` and ``b`` differ by at most one inserted, removed or replaced character."""
+    if abs(len(a) - len(b)) > 1:
+        return False
+    if len(a) > len(b):
+        a, b = b, a
+
+    for i, (x, y) in enumerate(zip(a, b)):
+        if x != y:
+            return a[i + (len(a) == len(b)):] == b[i + 1:]
+    return True
+
+
+def covers(words, word):
+    """Whether one of the query ``words`` is ``word`` itself, or ``word`` with a typo rather than cut short."""
+    return any(w == word or len(w) >= 4 and not word.startswith(w) and one_edit(w, word) for w in words)
+
+
+class HistoryEntry:
+    __slots__ = ("id", "info", "title", "author", "words", "core", "plays", "size")
+
+    def __init__(self, track):
+        self.id = track.id
+        self.info = track.info
+        self.title = track.title
+        self.author = track.author or ""
+        self.words = frozenset(tokenize(f"{self.title} {self.author}"))
+        self.core = frozenset(tokenize(_BRACKETS.sub(" ", self.title))) or self.words
+        self.plays = 1
+        self.size = ENTRY_OVERHEAD + sum(sys.getsizeof(s) for s in (self.id, self.title, self.author, *self.words))
+
+    @property
+    def identifier(self):
+        return self.info.get("identifier") or self.title
+
+    def track(self):
+        return wavelink.Track(id_=self.id, info=self.info)
+
+
+class GuildHistory:
+    def __init__(self, size):
+        self.size = size
+        self.entries = OrderedDict()
+        self.postings = {}
+        self.vocabulary = []
+        self.bytes = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def add(self, track):
+        """Record a play and return the change in bytes."""
+        entry = HistoryEntry(track)
+        if (old := self.entries.get(entry.identifier)) is not None:
+            old.plays += 1
+            self.entries.move_to_end(entry.identifier)
+            return 0
+
+        before = self.bytes
+        self.entries[entry.identifier] = entry
+        self.bytes += entry.size
+        for word in entry.words:
+            if (keys := self.postings.get(word)) is None:
+                keys = self.postings[word] = set()
+                bisect.insort(self.vocabulary, word)
+            keys.add(entry.identifier)
+
+        while len(self.entries) > self.size:
+            self._remove(next(iter(self.entries)))
+        return self.bytes - before
+
+    def _remove(self, key):
+        entry = self.entries.pop(key)
+        self.bytes -= entry.size
+        for word in entry.words:
+            keys = self.postings[word]
+            keys.discard(key)
+            if not keys:
+                del self.postings[word]
+                del self.vocabulary[bisect.bisect_left(self.vocabulary, word)]
+
+    def _expand(self, word):
+        # Prefix matches are a contiguous run of the sorted vocabulary; typos need a scan.
+        start = bisect.bisect_left(self.vocabulary, word)
+        end = bisect.bisect_left(self.vocabulary, word + "\U0010ffff", start)
+        if matches := self.vocabulary[start:end]:
+            return matches
+        if len(word) >= 4:
+            return [w for w in self.vocabulary if one_edit(word, w)]
+        return []
+
+    def find(self, query):
+        if len(query) < MIN_QUERY_LENGTH or not (words := tokenize(query)):
+            return None
+
+        candidates = None
+        for word in words:
+            if not (expanded := self._expand(word)):
+                return None
+            keys = set().union(*(self.postings[w] for w in expanded))
+            if not (candidates := keys if candidates is None else candidates & keys):
+                return None
+
+        best, best_score = None, None
+        for position, key in enumerate(self.entries):
+            if key not in candidates:
+                continue
+            entry = self.entries[key]
+            coverage = sum(covers(words, word) for word in entry.core) / len(entry.core)
+            if coverage < MIN_COVERAGE:
+                continue
+            # Ties go to the track played more often, then to the more recent one.
+            score = (coverage, entry.plays, position)
+            if best_score is None or score > best_score:
+                best, best_score = entry, score
+        return best
+
+    def recent(self, count):
+        return list(reversed(self.entries.values()))[:count]
+
+    def related(self, track, count):
+        """Other tracks by the author of ``track``, the most played first."""
+        if not (author := (track.author or "").casefold()):
+            return []
+        entries = [
+            entry for key, entry in self.entries.items()
+            if entry.author.casefold() == author and key != (track.identifier or track.title)
+        ]
+        entries.sort(key=lambda entry: entry.plays, reverse=True)
+        return entries[:count]
+
+
+class PlayHistory:
+    def __init__(self, *, size=200, max_bytes=32 * 1024 * 1024):
+        self.size = size
+        self.max_bytes = max_bytes
+        self.guilds = OrderedDict()
+        self.bytes = 0
+        self.evictions = 0
+
+    def add(self, guild_id, track):
+        if (history := self.guilds.get(guild_id)) is None:
+            history = self.guilds[guild_id] = GuildHistory(self.size)
+        self.guilds.move_to_end(guild_id)
+        self.bytes += history.add(track)
+
+        while self.bytes > self.max_bytes and len(self.guilds) > 1:
+            _, evicted = self.guilds.popitem(last=False)
+            self.bytes -= evicted.bytes
+            self.evictions += 1
+
+    def find(self, guild_id, query):
+        if (history := self.guilds.get(guild_id)) is None or (entry := history.find(query)) is None:
+            LOOKUPS.labels("miss").inc()
+            return None
+
+        LOOKUPS.labels("hit").inc()
+        return entry.track()
+
+    def recent(self, guild_id, count=10):
+        if (history := self.guilds.get(guild_id)) is None:
+            return []
+        return history.recent(count)
+
+    def related(self, guild_id, track, count=5):
+        if (history := self.guilds.get(guild_id)) is None:
+            return []
+        return [entry.track() for entry in history.related(track, count)]
+
+    def clear(self, guild_id):
+        if (history := self.guilds.pop(guild_id, None)) is not None:
+            self.bytes -= history.bytes
+
+    @property
+    def stats(self):
+        return {
+            "guilds": len(self.guilds),
+            "entries": sum(len(history) for history in self.guilds.values()),
+            "bytes": self.bytes,
+            "evictions": self.evictions,
+            "hits": LOOKUPS.labels("hit").value,
+            "misses": LOOKUPS.labels("miss").value,
+        }
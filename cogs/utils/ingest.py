@@ -0,0 +1,123 @@
+import codecs
+import json
+import re
+import time
+
+import wavelink
+
+from .metrics import LAVALINK_REST_LATENCY
+
+WHITESPACE = re.compile(r"[\s,]*")
+
+
+class LoadTracksParser:
+    """Incremental parser for a Lavalink ``/loadtracks`` response.
+
+    Entries of the ``tracks`` array are returned as soon as they are complete,
+    every other top-level field ends up in ``info``.
+    """
+
+    def __init__(self):
+        self.info = {}
+        self._decoder = json.JSONDecoder()
+        self._text = codecs.getincrementaldecoder("utf-8")()
+        self._buffer = ""
+        self._pos = 0
+        self._state = "start"
+        self._key = None
+
+    @property
+    def done(self):
+        return self._state == "done"
+
+    def _decode(self):
+        try:
+            value, end = self._decoder.raw_decode(self._buffer, self._pos)
+        except json.JSONDecodeError:
+            return None, False
+
+        # A value touching the end of the buffer may be cut short (numbers), wait for more.
+        if end >= len(self._buffer):
+            return None, False
+
+        self._pos = end
+        return value, True
+
+    def feed(self, data):
+        self._buffer = self._buffer[self._pos:] + self._text.decode(data)
+        self._pos = 0
+        tracks = []
+
+        while self._state != "done":
+            self._pos = WHITESPACE.match(self._buffer, self._pos).end()
+            if self._pos >= len(self._buffer):
+                break
+
+            char = self._buffer[self._pos]
+
+            if self._state == "start":
+                if char != "{":
+                    raise ValueError("Unexpected loadtracks response")
+                self._pos += 1
+                self._state = "key"
+            elif self._state == "key":
+                if char == "}":
+                    self._pos += 1
+                    self._state = "done"
+                    continue
+                key, ok = self._decode()
+                if not ok:
+                    break
+                self._key = key
+                self._state = "colon"
+            elif self._state == "colon":
+                if char != ":":
+                    raise ValueError("Unexpected loadtracks response")
+                self._pos += 1
+                self._state = "value"
+            elif self._state == "value":
+                if self._key == "tracks" and char == "[":
+                    self._pos += 1
+                    self._state = "tracks"
+                    continue
+                value, ok = self._decode()
+                if not ok:
+                    break
+                self.info[self._key] = value
+                self._state = "key"
+            elif self._state == "tracks":
+                if char == "]":
+                    self._pos += 1
+                    self._state = "key"
+                    continue
+                track, ok = self._decode()
+                if not ok:
+                    break
+                tracks.append(track)
+
+        return tracks
+
+
+async def stream_tracks(session, node, query, *, batch_size=100):
+    start = time.perf_counter()
+    async with session.get(
+        f"{node.rest_uri}/loadtracks",
+        params={"identifier": query},
+        headers={"Authorization": node.password}
+    ) as resp:
+        LAVALINK_REST_LATENCY.labels("loadtracks_stream").observe(time.perf_counter() - start)
+        if resp.status != 200:
+            return
+
+        parser = LoadTracksParser()
+        # The first track is handed over on its own so playback can start right away.
+        batch, size = [], 1
+        async for data in resp.content.iter_any():
+            for track in parser.feed(data):
+                batch.append(wavelink.Track(id_=track["track"], info=track["info"]))
+                if len(batch) >= size:
+                    yield batch
+                    batch, size = [], batch_size
+
+        if batch:
+            yield batch
@@ -0,0 +1,151 @@
+"""Newline delimited JSON messaging between the cluster launcher and its workers.
+
+A worker sends ``request`` messages to the hub, the hub forwards them to every
+connected cluster and answers with one ``response`` holding each cluster's
+reply keyed by cluster id.
+"""
+import asyncio
+import itertools
+import json
+import traceback
+
+
+async def _send(writer, **message):
+    writer.write(json.dumps(message, separators=(",", ":")).encode() + b"\n")
+    await writer.drain()
+
+
+class IPCServer:
+    def __init__(self, host="127.0.0.1", port=4000, *, timeout=5.0):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.clusters = {}
+        self._pending = {}
+        self._server = None
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._handle, self.host, self.port, limit=2 ** 22)
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+
+    async def _handle(self, reader, writer):
+        cluster_id = None
+        try:
+            while line := await reader.readline():
+                message = json.loads(line)
+                op = message["op"]
+
+                if op == "hello":
+                    cluster_id = message["cluster"]
+                    self.clusters[cluster_id] = writer
+                elif op == "request":
+                    asyncio.ensure_future(self._broadcast(writer, message))
+                elif op == "response":
+                    if (replies := self._pending.get(message["id"])) is not None:
+                        replies[str(message["cluster"])] = message["data"]
+                        if len(replies) >= len(self.clusters):
+                            replies.done.set()
+        except (ConnectionError, asyncio.IncompleteReadError, json.JSONDecodeError):
+            pass
+        finally:
+            if cluster_id is not None and self.clusters.get(cluster_id) is writer:
+                del self.clusters[cluster_id]
+            writer.close()
+
+    async def _broadcast(self, origin, message):
+        replies = self._pending[message["id"]] = _Replies()
+        for writer in list(self.clusters.values()):
+            try:
+                await _send(writer, op="request", id=message["id"], event=message["event"], data=message["data"])
+            except ConnectionError:
+                pass
+
+        try:
+            await asyncio.wait_for(replies.done.wait(), self.timeout)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            del self._pending[message["id"]]
+
+        try:
+            await _send(origin, op="response", id=message["id"], data=dict(replies))
+        except ConnectionError:
+            pass
+
+
+class _Replies(dict):
+    def __init__(self):
+        super().__init__()
+        self.done = asyncio.Event()
+
+
+class IPCClient:
+    def __init__(self, cluster_id, host="127.0.0.1", port=4000, *, loop=None):
+        self.cluster_id = cluster_id
+        self.host = host
+        self.port = port
+        self.handlers = {}
+        self._loop = loop or asyncio.get_event_loop()
+        self._ids = itertools.count()
+        self._futures = {}
+        self._writer = None
+        self._connected = asyncio.Event()
+
+    def register(self, event, handler):
+        self.handlers[event] = handler
+
+    def unregister(self, event):
+        self.handlers.pop(event, None)
+
+    def start(self):
+        return self._loop.create_task(self._run())
+
+    async def request(self, event, data=None, *, timeout=10.0):
+        await asyncio.wait_for(self._connected.wait(), timeout)
+
+        request_id = f"{self.cluster_id}:{next(self._ids)}"
+        future = self._futures[request_id] = self._loop.create_future()
+        try:
+            await _send(self._writer, op="request", id=request_id, event=event, data=data)
+            return await asyncio.wait_for(future, timeout)
+        finally:
+            self._futures.pop(request_id, None)
+
+    async def _run(self):
+        while True:
+            try:
+                reader, self._writer = await asyncio.open_connection(self.host, self.port, limit=2 ** 22)
+                await _send(self._writer, op="hello", cluster=self.cluster_id)
+                self._connected.set()
+
+                while line := await reader.readline():
+                    message = json.loads(line)
+                    if message["op"] == "request":
+                        self._loop.create_task(self._reply(message))
+                    elif message["op"] == "response":
+                        if (future := self._futures.get(message["id"])) is not None and not future.done():
+                            future.set_result(message["data"])
+            except (ConnectionError, OSError, json.JSONDecodeError):
+                pass
+
+            self._connected.clear()
+            await asyncio.sleep(5)
+
+    async def _reply(self, message):
+        if (handler := self.handlers.get(message["event"])) is None:
+            data = None
+        else:
+            try:
+                data = await handler(message["data"])
+            except Exception:
+                traceback.print_exc()
+                data = None
+
+        try:
+            await _send(self._writer, op="response", id=message["id"], cluster=self.cluster_id, data=data)
+        except ConnectionError:
+            pass
@@ -0,0 +1,126 @@
+"""A per-player mailbox that runs track events and commands one at a time.
+
+Everything that reads the queue, awaits and then acts on what it read (track
+end handling, skip, jump, ...) goes through the player's mailbox, so one guild's
+events and commands apply in the order they arrived while other guilds run
+concurrently. The worker task only exists while there is something to do.
+
+Events are coalesced by kind: a new event replaces a queued one of the same
+kind, since the later event for the same player supersedes it, so at most one
+track end, track start and handover wait at a time and they are never dropped.
+Commands are never dropped either, a command that finds ``maxsize`` items
+queued fails with ``MailboxFull`` instead.
+"""
+import asyncio
+import collections
+import logging
+import time
+
+from discord.ext import commands
+
+from .metrics import Counter, Histogram
+
+MAILBOX_SIZE = 32
+DEPTH_BUCKETS = (0, 1, 2, 4, 8, 16, 32)
+
+WAIT = Histogram("boggy_mailbox_wait_seconds", "Time a player event or command waited in the player's mailbox", ["kind"])
+RUN = Histogram("boggy_mailbox_run_seconds", "Time a player event or command took once it ran", ["kind"])
+DEPTH = Histogram("boggy_mailbox_depth", "Items already queued when a player event or command was posted", buckets=DEPTH_BUCKETS)
+DROPPED = Counter("boggy_mailbox_dropped_total", "Player events dropped because a later event of the same kind superseded them", ["kind"])
+
+log = logging.getLogger(__name__)
+
+
+class MailboxFull(commands.CommandError):
+    pass
+
+
+class Mailbox:
+    def __init__(self, *, maxsize=MAILBOX_SIZE, loop=None):
+        self.maxsize = maxsize
+        self.loop = loop or asyncio.get_event_loop()
+        self.items = collections.deque()
+        self.worker = None
+        self.running = None
+        self.processed = 0
+        self.busy = 0.
+        self.dropped = 0
+
+    def __len__(self):
+        return len(self.items)
+
+    def post(self, func, *args):
+        """Queue ``func(*args)`` without waiting for it, replacing a queued event of the same kind."""
+        for index, (queued, _, future, _) in enumerate(self.items):
+            if future is None and queued == func:
+                del self.items[index]
+                self._dropped(func.__name__)
+                break
+        self._put(func, args, None)
+
+    async def call(self, func, *args):
+        """Run ``func(*args)`` in turn and return its result."""
+        if asyncio.current_task() is self.worker:
+            return await func(*args)
+
+        if len(self.items) >= self.maxsize:
+            raise MailboxFull
+
+        future = self.loop.create_future()
+        self._put(func, args, future)
+        return await future
+
+    def close(self):
+        if self.worker is not None and self.worker is not asyncio.current_task():
+            self.worker.cancel()
+            self.worker = None
+            # Cancelling the worker interrupts the item it was running, so nothing else would resolve its future.
+            if self.running is not None:
+                self.running.cancel()
+                self.running = None
+
+        for _, _, future, _ in self.items:
+            if future is not None:
+                future.cancel()
+        self.items.clear()
+
+    def _put(self, func, args, future):
+        DEPTH.observe(len(self.items))
+        self.items.append((func, args, future, time.perf_counter()))
+        if self.worker is None:
+            self.worker = self.loop.create_task(self._run())
+
+    def _dropped(self, kind):
+        self.dropped += 1
+        DROPPED.labels(kind).inc()
+
+    async def _run(self):
+        try:
+            while self.items:
+                func, args, future, queued = self.items.popleft()
+                if future is not None and future.done():
+                    continue
+
+                start = time.perf_counter()
+                WAIT.labels(func.__name__).observe(start - queued)
+                self.running = future
+                try:
+                    result = await func(*args)
+                except Exception as exc:
+                    if future is None:
+                        log.exception("Error in player event %s", func.__name__)
+                    elif not future.done():
+                        future.set_exception(exc)
+                else:
+                    if future is not None and not future.done():
+                        future.set_result(result)
+                finally:
+                    if self.running is future:
+                        self.running = None
+                    elapsed = time.perf_counter() - start
+                    RUN.labels(func.__name__).observe(elapsed)
+                    self.busy += elapsed
+                    self.processed += 1
+        finally:
+            if self.worker is asyncio.current_task():
+                self.worker = None
@@ -0,0 +1,66 @@
+import os
+import sys
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+
+def rss():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        pass
+
+    if resource is not None:
+        # ru_maxrss is the peak, and in KB on Linux but bytes on macOS.
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def approx_size(obj, depth=3, seen=None):
+    """``sys.getsizeof`` of ``obj`` and of the containers, strings and numbers it holds, ``depth`` levels down.
+
+    Objects reachable twice, like a track's title that is also in its info dict, are counted once.
+    """
+    if seen is None:
+        seen = set()
+    if id(obj) in seen or obj is None:
+        return 0
+    seen.add(id(obj))
+
+    size = sys.getsizeof(obj)
+    if depth <= 0 or isinstance(obj, (str, bytes, int, float, type)):
+        return size
+
+    if isinstance(obj, dict):
+        return size + sum(approx_size(k, depth - 1, seen) + approx_size(v, depth - 1, seen) for k, v in obj.items())
+    if isinstance(obj, (list, tuple, set, frozenset)):
+        return size + sum(approx_size(item, depth - 1, seen) for item in obj)
+    if hasattr(obj, "__dict__"):
+        size += approx_size(vars(obj), depth - 1, seen)
+    for name in getattr(type(obj), "__slots__", ()):
+        size += approx_size(getattr(obj, name, None), depth - 1, seen)
+    return size
+
+
+def sampled_size(items, sample=16):
+    """Approximate size of a sequence from at most ``sample`` of its items, spread evenly."""
+    if not (count := len(items)):
+        return 0
+    step = max(1, count // sample)
+    measured = [approx_size(items[i]) for i in range(0, count, step)][:sample]
+    return int(sum(measured) / len(measured) * count)
+
+
+def memory_report(bot):
+    guilds = len(bot.guilds)
+    used = rss()
+    return {
+        "rss": used,
+        "guilds": guilds,
+        "per_guild": used / guilds if used and guilds else None,
+        "members": sum(len(guild.members) for guild in bot.guilds),
+        "messages": len(bot.cached_messages),
+    }
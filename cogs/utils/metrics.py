@@ -0,0 +1,180 @@
+"""A tiny Prometheus style metrics registry.
+
+Metrics live at module level so they survive cog reloads. Recording a value
+is a dict lookup plus an increment; label children are created on first use
+and gauges backed by a function are only evaluated when scraped.
+"""
+import math
+from bisect import bisect_left
+
+LATENCY_BUCKETS = (.005, .01, .025, .05, .1, .25, .5, 1, 2.5, 5, 10)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names, values):
+    if not names:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values)) + "}"
+
+
+def _value(value):
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    type = None
+
+    def __init__(self, name, documentation, labels=()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(labels)
+        self._children = {}
+        REGISTRY.register(self)
+
+    def labels(self, *values):
+        try:
+            return self._children[values]
+        except KeyError:
+            child = self._children[values] = self._child()
+            return child
+
+    def _child(self):
+        raise NotImplementedError
+
+    def samples(self):
+        raise NotImplementedError
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type}"]
+        lines.extend(f"{name}{labels} {_value(value)}" for name, labels, value in self.samples())
+        return "\n".join(lines)
+
+
+class _Value:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0
+
+    def inc(self, amount=1):
+        self.value += amount
+
+    def dec(self, amount=1):
+        self.value -= amount
+
+    def set(self, value):
+        self.value = value
+
+
+class Counter(Metric):
+    type = "counter"
+
+    def _child(self):
+        return _Value()
+
+    def inc(self, amount=1):
+        self.labels().inc(amount)
+
+    def samples(self):
+        for values, child in list(self._children.items()):
+            yield self.name, _labels(self.label_names, values), child.value
+
+
+class Gauge(Metric):
+    type = "gauge"
+
+    def __init__(self, name, documentation, labels=(), function=None):
+        super().__init__(name, documentation, labels)
+        self.function = function
+
+    def _child(self):
+        return _Value()
+
+    def set(self, value):
+        self.labels().set(value)
+
+    def set_function(self, function):
+        self.function = function
+
+    def samples(self):
+        if self.function is not None:
+            # A function returns either one value or a dict of label tuples to values.
+            result = self.function()
+            items = result.items() if isinstance(result, dict) else [((), result)]
+        else:
+            items = [(values, child.value) for values, child in list(self._children.items())]
+
+        for values, value in items:
+            yield self.name, _labels(self.label_names, values if isinstance(values, tuple) else (values,)), value
+
+
+class _HistogramValue:
+    __slots__ = ("bounds", "counts", "sum")
+
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.
+
+    def observe(self, value):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+
+
+class Histogram(Metric):
+    type = "histogram"
+
+    def __init__(self, name, documentation, labels=(), buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labels)
+
+    def _child(self):
+        return _HistogramValue(self.buckets)
+
+    def observe(self, value):
+        self.labels().observe(value)
+
+    def samples(self):
+        for values, child in list(self._children.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), child.counts):
+                cumulative += count
+                yield f"{self.name}_bucket", _labels(self.label_names + ("le",), values + (_value(bound),)), cumulative
+            yield f"{self.name}_sum", _labels(self.label_names, values), child.sum
+            yield f"{self.name}_count", _labels(self.label_names, values), cumulative
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = {}
+
+    def register(self, metric):
+        self.metrics[metric.name] = metric
+
+    def get(self, name):
+        return self.metrics.get(name)
+
+    def render(self):
+        return "\n".join(metric.render() for metric in self.metrics.values()) + "\n"
+
+
+REGISTRY = Registry()
+
+COMMAND_LATENCY = Histogram("boggy_command_seconds", "Time from command invocation to completion", ["command", "status"])
+PLAY_STAGE_LATENCY = Histogram("boggy_play_stage_seconds", "Time spent in each stage of the play command", ["stage"])
+DISCORD_LATENCY = Histogram("boggy_discord_request_seconds", "Discord REST request latency including rate limit waits", ["route"])
+DISCORD_RATE_LIMITS = Counter("boggy_discord_rate_limits_total", "Discord 429 responses", ["scope"])
+LAVALINK_REST_LATENCY = Histogram("boggy_lavalink_rest_seconds", "Lavalink REST request latency", ["endpoint"])
+LAVALINK_WS_RTT = Histogram("boggy_lavalink_ws_rtt_seconds", "Time from sending a play op to receiving its TrackStartEvent")
+TRACK_START_GAP = Histogram("boggy_track_start_gap_seconds", "Time from a TrackEndEvent to the next TrackStartEvent of a player")
+TRACK_HANDOVER_LEAD = Histogram("boggy_track_handover_lead_seconds", "How much of a track was left when the next one was sent early")
+PLAYERS = Gauge("boggy_players", "Players by state", ["state"])
+PLAYER_MEMORY = Gauge("boggy_player_memory_bytes", "Approximate memory held by all players and their queues")
+QUEUED_TRACKS = Gauge("boggy_queued_tracks", "Tracks in all queues")
+SEARCH_CACHE = Gauge("boggy_search_cache", "Search cache counters", ["stat"])
+PLAY_HISTORY = Gauge("boggy_play_history", "Size of the per-guild play history index", ["stat"])
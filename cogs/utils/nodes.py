@@ -0,0 +1,54 @@
+import json
+import os
+
+DEFAULT_NODES = [
+    {
+        "host": "127.0.0.1",
+        "port": 2333,
+        "rest_uri": "http://127.0.0.1:2333",
+        "password": "youshallnotpass",
+        "identifier": "MAIN",
+        "region": "europe",
+    }
+]
+
+
+def load_nodes(path):
+    if not path or not os.path.exists(path):
+        return DEFAULT_NODES
+
+    with open(path) as f:
+        nodes = json.load(f)
+
+    if isinstance(nodes, dict):
+        nodes = [dict(node, identifier=node.get("identifier", name)) for name, node in nodes.items()]
+
+    for node in nodes:
+        node.setdefault("rest_uri", f"http://{node['host']}:{node['port']}")
+        node.setdefault("region", "europe")
+
+    return nodes
+
+
+def node_load(node):
+    if node.stats is None:
+        return len(node.players)
+
+    # Stats only arrive once a minute, so count players placed since the last frame too.
+    return node.stats.penalty.total + max(0, len(node.players) - node.stats.players)
+
+
+def node_health_penalty(node):
+    if node.stats is None:
+        return 0
+
+    penalty = node.stats.penalty
+    return penalty.cpu_penalty + penalty.null_frame_penalty + penalty.deficit_frame_penalty
+
+
+def best_node(nodes, exclude=()):
+    nodes = [n for n in nodes if n.identifier not in exclude and n.is_available]
+    if not nodes:
+        return None
+
+    return min(nodes, key=node_load)
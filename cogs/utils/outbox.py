@@ -0,0 +1,176 @@
+"""Rate limit aware sending of command replies.
+
+Discord allows about five messages per five seconds and four reactions per
+second in a channel. Every channel gets a token bucket for both; a reply that
+finds the bucket empty is queued instead of hitting a 429, and a plain notice
+(an embed with only a description) queued behind another one is merged into
+it. Acknowledgement reactions are dropped when the channel is out of budget,
+the reply that follows says the same thing.
+"""
+import asyncio
+import collections
+import logging
+import time
+
+import discord
+
+from .cache import LRUCache
+from .metrics import Counter
+
+MESSAGE_RATE = (5, 5.0)
+REACTION_RATE = (4, 1.0)
+MAX_PENDING = 10
+MAX_DESCRIPTION = 2048
+
+MERGED = Counter("boggy_outbox_merged_total", "Queued notices merged into an earlier message")
+DROPPED = Counter("boggy_outbox_dropped_total", "Outbound messages and reactions dropped for lack of rate limit budget", ["kind"])
+QUEUED = Counter("boggy_outbox_queued_total", "Messages that waited for rate limit budget")
+
+log = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    __slots__ = ("rate", "per", "tokens", "updated")
+
+    def __init__(self, rate, per):
+        self.rate = rate
+        self.per = per
+        self.tokens = rate
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.rate, self.tokens + (now - self.updated) * self.rate / self.per)
+        self.updated = now
+
+    def take(self):
+        self._refill()
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+    def delay(self):
+        self._refill()
+        return max(0., (1 - self.tokens) * self.per / self.rate)
+
+    def exhaust(self, retry_after):
+        self._refill()
+        self.tokens = min(self.tokens, 1 - retry_after * self.rate / self.per)
+
+
+class _Pending(collections.deque):
+    task = None
+
+
+def is_notice(embed):
+    return embed.description and set(embed.to_dict()) <= {"description", "color", "type"}
+
+
+class _RateLimitListener(logging.Handler):
+    # A 429 means our picture of the bucket was wrong; empty it until Discord's retry_after is over.
+    def __init__(self, outbox):
+        super().__init__(logging.WARNING)
+        self.outbox = outbox
+
+    def emit(self, record):
+        if record.msg.startswith("We are being rate limited") and len(record.args) == 2:
+            retry_after, bucket = record.args
+            channel_id, _, path = str(bucket).partition(":")
+            if channel_id.isdigit():
+                kind = "reaction" if "/reactions/" in path else "message"
+                self.outbox.bucket(int(channel_id), kind).exhaust(float(retry_after))
+
+
+class Outbox:
+    def __init__(self, *, loop=None):
+        self.loop = loop or asyncio.get_event_loop()
+        self.buckets = LRUCache(8192)
+        self.pending = {}
+        self._listener = _RateLimitListener(self)
+        logging.getLogger("discord.http").addHandler(self._listener)
+
+    def close(self):
+        logging.getLogger("discord.http").removeHandler(self._listener)
+        for queue in self.pending.values():
+            queue.task.cancel()
+        self.pending.clear()
+
+    def bucket(self, channel_id, kind="message"):
+        if (bucket := self.buckets.get((channel_id, kind), count=False)) is None:
+            bucket = TokenBucket(*(MESSAGE_RATE if kind == "message" else REACTION_RATE))
+            self.buckets.put((channel_id, kind), bucket)
+        return bucket
+
+    async def send(self, destination, content=None, *, embed=None):
+        """Send a reply now if the channel has budget, otherwise queue it.
+
+        Returns the message when it was sent right away and ``None`` when it
+        was queued, merged or dropped.
+        """
+        channel = getattr(destination, "channel", destination)
+
+        if channel.id not in self.pending and self.bucket(channel.id).take():
+            return await destination.send(content, embed=embed)
+
+        if (queue := self.pending.get(channel.id)) is None:
+            queue = self.pending[channel.id] = _Pending()
+            queue.task = self.loop.create_task(self._flush(channel.id, destination))
+
+        QUEUED.inc()
+        if queue and self._merge(queue, content, embed):
+            MERGED.inc()
+        elif len(queue) >= MAX_PENDING:
+            DROPPED.labels("message").inc()
+        else:
+            queue.append((content, embed))
+        return None
+
+    async def react(self, message, emoji):
+        if message.channel.id in self.pending or not self.bucket(message.channel.id, "reaction").take():
+            DROPPED.labels("reaction").inc()
+            return
+
+        await message.add_reaction(emoji)
+
+    async def _flush(self, channel_id, destination):
+        queue = self.pending[channel_id]
+        bucket = self.bucket(channel_id)
+
+        try:
+            while queue:
+                while not bucket.take():
+                    await asyncio.sleep(bucket.delay())
+
+                content, embed = queue.popleft()
+                try:
+                    await destination.send(content, embed=embed)
+                except discord.HTTPException as exc:
+                    log.warning("Dropping a queued message for channel %s: %s", channel_id, exc)
+                    DROPPED.labels("message").inc()
+        finally:
+            if self.pending.get(channel_id) is queue:
+                del self.pending[channel_id]
+
+    @staticmethod
+    def _merge(queue, content, embed):
+        last_content, last = queue[-1]
+        if content is not None or last_content is not None or embed is None or last is None:
+            return False
+        if not is_notice(embed) or not is_notice(last):
+            return False
+        if len(last.description) + len(embed.description) + 1 > MAX_DESCRIPTION:
+            return False
+
+        queue[-1] = (None, discord.Embed(description=f"{last.description}\n{embed.description}", color=last.color))
+        return True
+
+    @property
+    def stats(self):
+        return {
+            "queued": QUEUED.labels().value,
+            "merged": MERGED.labels().value,
+            "dropped_messages": DROPPED.labels("message").value,
+            "dropped_reactions": DROPPED.labels("reaction").value,
+            "pending_channels": len(self.pending),
+        }
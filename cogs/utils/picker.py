@@ -0,0 +1,74 @@
+"""Reaction and button based choices without per-message event listeners.
+
+Every message that waits for a choice registers itself in a ``ReactionRouter``
+keyed by message id and the cog feeds it all ``raw_reaction_add`` events, so an
+event costs one dict lookup instead of running every pending ``wait_for`` check.
+With a discord.py that has message components (``discord.ui``) the track picker
+uses buttons instead, which need no reactions at all.
+"""
+import asyncio
+
+import discord
+
+HAS_COMPONENTS = hasattr(discord, "ui")
+
+
+class ReactionRouter:
+    def __init__(self):
+        self.waiters = {}
+
+    async def wait(self, message_id, user_id, emojis, *, timeout=60.0):
+        """Wait until ``user_id`` reacts to the message with one of ``emojis`` and return that emoji."""
+        future = asyncio.get_event_loop().create_future()
+        self.waiters[message_id] = (user_id, emojis, future)
+        try:
+            return await asyncio.wait_for(future, timeout)
+        finally:
+            if self.waiters.get(message_id, (None, None, None))[2] is future:
+                del self.waiters[message_id]
+
+    def dispatch(self, payload):
+        if (waiter := self.waiters.get(payload.message_id)) is None:
+            return
+
+        user_id, emojis, future = waiter
+        if payload.user_id == user_id and (emoji := str(payload.emoji)) in emojis and not future.done():
+            future.set_result(emoji)
+
+    def __len__(self):
+        return len(self.waiters)
+
+
+async def add_reactions(message, emojis):
+    # Requests to one reaction bucket are serialised by discord.py anyway, so add them in
+    # order in the background while the caller already waits for a choice.
+    for emoji in emojis:
+        try:
+            await message.add_reaction(emoji)
+        except discord.HTTPException:
+            return
+
+
+if HAS_COMPONENTS:
+    class ChoiceView(discord.ui.View):
+        def __init__(self, user_id, count, *, timeout=60.0):
+            super().__init__(timeout=timeout)
+            self.user_id = user_id
+            self.choice = None
+
+            for index in range(count):
+                button = discord.ui.Button(label=str(index + 1), style=discord.ButtonStyle.secondary)
+                button.callback = self._choose(index)
+                self.add_item(button)
+
+        def _choose(self, index):
+            async def callback(interaction):
+                self.choice = index
+                await interaction.response.defer()
+                self.stop()
+            return callback
+
+        async def interaction_check(self, interaction):
+            return interaction.user.id == self.user_id
+else:
+    ChoiceView = None
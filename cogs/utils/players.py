@@ -0,0 +1,89 @@
+"""Creation, lookup and eviction of the bot's wavelink players.
+
+``wavelink.Client.get_player`` creates a player for any guild it is asked
+about and keeps it in the node's ``players`` until it is destroyed. The
+registry only creates one when a command wants to play something and looks
+up existing ones otherwise. ``sweep`` tears down players that stayed
+disconnected for ``grace`` seconds, which releases their queue, equalizer
+state and mailbox along with them. When the cog is reloaded ``adopt`` moves
+the live players over to the new player class.
+"""
+import logging
+import time
+
+log = logging.getLogger(__name__)
+
+
+class PlayerRegistry:
+    def __init__(self, client, cls, *, grace=300.0):
+        self.client = client
+        self.cls = cls
+        self.grace = grace
+        self.disconnected = {}
+        self.created = 0
+        self.evicted = 0
+
+    def __iter__(self):
+        for node in list(self.client.nodes.values()):
+            yield from list(node.players.values())
+
+    def __len__(self):
+        return sum(len(node.players) for node in self.client.nodes.values())
+
+    def adopt(self, registry):
+        """Take over the players and counters of the registry of a previous version of the cog."""
+        self.disconnected = registry.disconnected
+        self.created = registry.created
+        self.evicted = registry.evicted
+        for player in self:
+            self.cls.adopt(player)
+
+    def get(self, guild_id):
+        for node in self.client.nodes.values():
+            if (player := node.players.get(guild_id)) is not None:
+                return player
+
+    def create(self, guild_id, node=None, **kwargs):
+        if (player := self.get(guild_id)) is not None:
+            return player
+
+        self.created += 1
+        return self.client.get_player(guild_id, cls=self.cls, node_id=getattr(node, "identifier", None), **kwargs)
+
+    def stale(self):
+        """Players that have been disconnected for at least the grace period."""
+        now = time.monotonic()
+        disconnected, stale = {}, []
+        for player in self:
+            if player.is_connected:
+                continue
+            disconnected[player.guild_id] = since = self.disconnected.get(player.guild_id, now)
+            if now - since >= self.grace:
+                stale.append(player)
+
+        # Players that reconnected or were destroyed since start over.
+        self.disconnected = disconnected
+        return stale
+
+    async def sweep(self):
+        for player in self.stale():
+            self.disconnected.pop(player.guild_id, None)
+            self.evicted += 1
+            try:
+                await player.teardown()
+            except Exception:
+                # The guild or the node may be gone; dropping the reference is what matters.
+                log.debug("Tearing down the player of guild %s failed", player.guild_id, exc_info=True)
+                player.node.players.pop(player.guild_id, None)
+
+    def memory(self):
+        return {player.guild_id: player.memory_usage for player in self}
+
+    @property
+    def stats(self):
+        return {
+            "players": len(self),
+            "disconnected": len(self.disconnected),
+            "created": self.created,
+            "evicted": self.evicted,
+        }
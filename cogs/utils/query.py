@@ -0,0 +1,95 @@
+"""Classify play queries into links and search terms without backtracking regexes.
+
+A query is a link when it is a single word that starts with a scheme, or with
+``www.`` or ``host.tld/`` and a host made of letters, digits, dots and dashes.
+Links are passed to Lavalink unchanged (its source managers pick them up),
+bare words get the ``ytsearch:`` prefix and an explicit search prefix is kept.
+Every check is a constant number of passes over the string, so the cost is
+linear in the query length whatever the input.
+"""
+import enum
+import string
+import typing as t
+from urllib.parse import urlsplit
+
+SEARCH_PREFIXES = ("ytsearch:", "ytmsearch:", "scsearch:")
+DEFAULT_PREFIX = "ytsearch:"
+SCHEMES = ("http://", "https://")
+HOST_CHARS = frozenset(string.ascii_lowercase + string.digits + ".-")
+
+YOUTUBE_HOSTS = frozenset(("youtube.com", "www.youtube.com", "m.youtube.com", "music.youtube.com", "youtu.be"))
+SOUNDCLOUD_HOSTS = frozenset(("soundcloud.com", "www.soundcloud.com", "m.soundcloud.com", "on.soundcloud.com"))
+
+
+class QueryKind(enum.Enum):
+    TEXT = 0
+    SEARCH = 1
+    URL = 2
+    YOUTUBE = 3
+    YOUTUBE_PLAYLIST = 4
+    SOUNDCLOUD = 5
+    SOUNDCLOUD_PLAYLIST = 6
+
+
+class Query(t.NamedTuple):
+    kind: QueryKind
+    identifier: str
+
+    @property
+    def is_url(self):
+        return self.kind not in (QueryKind.TEXT, QueryKind.SEARCH)
+
+    @property
+    def is_playlist(self):
+        return self.kind in (QueryKind.YOUTUBE_PLAYLIST, QueryKind.SOUNDCLOUD_PLAYLIST) or (
+            self.kind is QueryKind.URL and "/playlist" in self.identifier
+        )
+
+
+def _valid_host(host):
+    name, dot, tld = host.rpartition(".")
+    return bool(name) and dot and len(tld) >= 2 and tld.isalpha() and HOST_CHARS.issuperset(host) and ".." not in host
+
+
+def _split_url(text):
+    """Return the lower-cased host and the ``urlsplit`` result if ``text`` looks like a link."""
+    lowered = text[:8].lower()
+    if lowered.startswith(SCHEMES):
+        url = text
+    elif lowered.startswith("www") or "/" in text:
+        url = "http://" + text
+    else:
+        return None, None
+
+    try:
+        parts = urlsplit(url)
+        host = (parts.hostname or "").rstrip(".")
+    except ValueError:
+        return None, None
+
+    if url is text:
+        # With a scheme anything with a host counts, addresses and localhost included.
+        return (host, parts) if host else (None, None)
+    if not _valid_host(host) or (not host.startswith("www") and not parts.path.startswith("/")):
+        return None, None
+    return host, parts
+
+
+def classify(query):
+    text = query.strip().strip("<>")
+
+    if text.lower().startswith(SEARCH_PREFIXES):
+        return Query(QueryKind.SEARCH, text)
+    if not text or any(c.isspace() for c in text):
+        return Query(QueryKind.TEXT, DEFAULT_PREFIX + text)
+
+    host, parts = _split_url(text)
+    if host is None:
+        return Query(QueryKind.TEXT, DEFAULT_PREFIX + text)
+
+    if host in YOUTUBE_HOSTS:
+        playlist = "&list=" in f"&{parts.query}" or parts.path.startswith("/playlist")
+        return Query(QueryKind.YOUTUBE_PLAYLIST if playlist else QueryKind.YOUTUBE, text)
+    if host in SOUNDCLOUD_HOSTS:
+        return Query(QueryKind.SOUNDCLOUD_PLAYLIST if "/sets/" in parts.path else QueryKind.SOUNDCLOUD, text)
+    return Query(QueryKind.URL, text)
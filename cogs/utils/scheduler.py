@@ -0,0 +1,73 @@
+import asyncio
+import heapq
+import time
+
+
+class DeadlineScheduler:
+    """Runs ``callback(key)`` once a key's deadline passes.
+
+    All deadlines share one heap and one sleeping task, so thousands of armed
+    keys cost nothing until the earliest of them is due. Re-arming or
+    cancelling a key leaves its old heap entry behind and it is skipped when
+    popped.
+    """
+
+    def __init__(self, callback, *, loop=None):
+        self._callback = callback
+        self._loop = loop or asyncio.get_event_loop()
+        self._heap = []
+        self._deadlines = {}
+        self._wakeup = asyncio.Event()
+        self._task = None
+
+    def __len__(self):
+        return len(self._deadlines)
+
+    def __contains__(self, key):
+        return key in self._deadlines
+
+    def start(self):
+        if self._task is None:
+            self._task = self._loop.create_task(self._run())
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def arm(self, key, delay):
+        deadline = time.monotonic() + delay
+        self._deadlines[key] = deadline
+        heapq.heappush(self._heap, (deadline, key))
+
+        if len(self._heap) > 2 * len(self._deadlines) + 64:
+            self._heap = [(d, k) for k, d in self._deadlines.items()]
+            heapq.heapify(self._heap)
+
+        if self._heap[0][0] == deadline:
+            self._wakeup.set()
+
+    def set_callback(self, callback):
+        self._callback = callback
+
+    def cancel(self, key):
+        self._deadlines.pop(key, None)
+
+    def remaining(self, key):
+        if (deadline := self._deadlines.get(key)) is not None:
+            return max(0., deadline - time.monotonic())
+
+    async def _run(self):
+        while True:
+            now = time.monotonic()
+            while self._heap and self._heap[0][0] <= now:
+                deadline, key = heapq.heappop(self._heap)
+                if self._deadlines.get(key) == deadline:
+                    del self._deadlines[key]
+                    self._loop.create_task(self._callback(key))
+
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self._heap[0][0] - now if self._heap else None)
+            except asyncio.TimeoutError:
+                pass
@@ -0,0 +1,103 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import wavelink
+
+from .cache import MISSING, DiskCache, LRUCache
+from .metrics import LAVALINK_REST_LATENCY
+from .query import SEARCH_PREFIXES
+
+
+def normalize_query(query):
+    query = " ".join(query.strip().strip("<>").split())
+    # Search terms are case insensitive, but URLs and track ids are not (YouTube ids for one).
+    lowered = query.lower()
+    for prefix in SEARCH_PREFIXES:
+        if lowered.startswith(prefix):
+            return prefix + lowered[len(prefix):].strip()
+    return query
+
+
+def dump_tracks(result):
+    if isinstance(result, wavelink.TrackPlaylist):
+        return result.data
+    return {"playlistInfo": {}, "tracks": [{"track": t.id, "info": t.info} for t in result]}
+
+
+def load_tracks(data):
+    if data["playlistInfo"]:
+        return wavelink.TrackPlaylist(data=data)
+    return [wavelink.Track(id_=t["track"], info=t["info"]) for t in data["tracks"]]
+
+
+class SearchResolver:
+    def __init__(self, client, *, maxsize=2048, ttl=3600, path=None):
+        self.client = client
+        self.cache = LRUCache(maxsize, ttl)
+        self.disk = DiskCache(path, ttl) if path else None
+        self.requests = 0
+        self.merged = 0
+        self._inflight = {}
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="search-cache") if path else None
+
+    def is_cached(self, query):
+        return normalize_query(query) in self.cache
+
+    async def get_tracks(self, query):
+        key = normalize_query(query)
+
+        if (result := self.cache.get(key, MISSING)) is not MISSING:
+            return self._copy(result)
+
+        if (task := self._inflight.get(key)) is not None:
+            self.merged += 1
+        else:
+            task = asyncio.ensure_future(self._load(key))
+            self._inflight[key] = task
+            task.add_done_callback(lambda f: self._done(key, f))
+
+        return self._copy(await asyncio.shield(task))
+
+    async def _load(self, key):
+        loop = asyncio.get_running_loop()
+
+        if self.disk is not None:
+            if (data := await loop.run_in_executor(self._executor, self.disk.get, key)) is not None:
+                result = load_tracks(data)
+                self.cache.put(key, result)
+                return result
+
+        self.requests += 1
+        start = time.perf_counter()
+        result = await self.client.get_tracks(key)
+        LAVALINK_REST_LATENCY.labels("loadtracks").observe(time.perf_counter() - start)
+
+        if result:
+            self.cache.put(key, result)
+            if self.disk is not None:
+                loop.run_in_executor(self._executor, self.disk.put, key, dump_tracks(result))
+
+        return result
+
+    def _done(self, key, fut):
+        self._inflight.pop(key, None)
+        if not fut.cancelled():
+            fut.exception()
+
+    @staticmethod
+    def _copy(result):
+        return list(result) if isinstance(result, list) else result
+
+    def close(self):
+        if self.disk is not None:
+            self._executor.submit(self.disk.close)
+            self._executor.shutdown(wait=False)
+
+    @property
+    def stats(self):
+        stats = self.cache.stats
+        stats.update(requests=self.requests, merged=self.merged, inflight=len(self._inflight))
+        if self.disk is not None:
+            stats.update({f"disk_{k}": v for k, v in self.disk.stats.items()})
+        return stats
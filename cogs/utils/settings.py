@@ -0,0 +1,88 @@
+import copy
+import json
+import logging
+import os
+
+try:
+    import fcntl
+except ImportError:
+    # No advisory locks on Windows, where the launcher isn't used anyway.
+    fcntl = None
+
+log = logging.getLogger(__name__)
+
+
+class GuildSettings:
+    def __init__(self, path, *, loop, delay=5.0):
+        self.path = path
+        self.delay = delay
+        self._loop = loop
+        self._save_handle = None
+        self._data = {}
+        self._dirty = set()
+
+        if path and os.path.exists(path):
+            with open(path) as f:
+                self._data = json.load(f)
+
+    def get(self, guild_id, key, default=None):
+        return self._data.get(str(guild_id), {}).get(key, default)
+
+    def set(self, guild_id, key, value):
+        self._data.setdefault(str(guild_id), {})[key] = value
+        self._dirty.add(str(guild_id))
+        self._schedule_save()
+
+    def delete(self, guild_id, key):
+        if self._data.get(str(guild_id), {}).pop(key, None) is not None:
+            self._dirty.add(str(guild_id))
+            self._schedule_save()
+
+    def _schedule_save(self):
+        if self.path and self._save_handle is None:
+            self._save_handle = self._loop.call_later(self.delay, self._save_in_background)
+
+    def _take_changes(self):
+        if self._save_handle is not None:
+            self._save_handle.cancel()
+            self._save_handle = None
+
+        changes = {guild_id: copy.deepcopy(self._data.get(guild_id, {})) for guild_id in self._dirty}
+        self._dirty.clear()
+        return changes
+
+    def _save_in_background(self):
+        self._save_handle = None
+        if changes := self._take_changes():
+            future = self._loop.run_in_executor(None, self._write, changes)
+            future.add_done_callback(lambda fut: self._written(fut, changes))
+
+    def _written(self, future, changes):
+        if future.cancelled() or future.exception() is None:
+            return
+
+        log.error("Saving guild settings to %s failed", self.path, exc_info=future.exception())
+        # The guilds are written again with the next save, from their current settings.
+        self._dirty.update(changes)
+        self._schedule_save()
+
+    def save(self):
+        if self.path and (changes := self._take_changes()):
+            self._write(changes)
+
+    def _write(self, changes):
+        # Other clusters write the same file: merge under a lock and only overwrite the guilds changed here.
+        with open(f"{self.path}.lock", "w") as lock:
+            if fcntl is not None:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+
+            data = {}
+            if os.path.exists(self.path):
+                with open(self.path) as f:
+                    data = json.load(f)
+            data.update(changes)
+
+            tmp = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp, "w") as f:
+                json.dump(data, f)
+            os.replace(tmp, self.path)
@@ -0,0 +1,87 @@
+import gzip
+import json
+import os
+import tempfile
+import time
+
+import wavelink
+
+SNAPSHOT_VERSION = 1
+
+
+def dump_players(players):
+    """Build a snapshot of the given players.
+
+    Tracks are stored once in a shared table (Lavalink track id plus the info
+    wavelink needs) and queues refer to them by index, so the same hit queued
+    in a hundred guilds is only written once.
+    """
+    table, index, saved = [], {}, []
+
+    for player in players:
+        if not player.is_connected or player.queue.is_empty:
+            continue
+
+        refs = []
+        for track in player.queue._queue:
+            if (ref := index.get(track.id)) is None:
+                ref = index[track.id] = len(table)
+                table.append([track.id, track.title, track.author, track.length, track.identifier, track.uri, track.is_stream])
+            refs.append(ref)
+
+        saved.append({
+            "guild": player.guild_id,
+            "channel": player.channel_id,
+            "node": player.node.identifier,
+            "tracks": refs,
+            "position": player.queue.position,
+            "repeat": player.queue.repeat_mode.value,
+            "time": int(player.position),
+            "paused": player.is_paused,
+            "volume": player.volume,
+            "eq_levels": player.eq_levels,
+            "equalizer": [player.equalizer.name, player.equalizer.raw],
+        })
+
+    return {"version": SNAPSHOT_VERSION, "saved": time.time(), "tracks": table, "players": saved}
+
+
+def load_tracks(table):
+    return [
+        wavelink.Track(id_=id_, info={
+            "title": title,
+            "author": author,
+            "length": length,
+            "identifier": identifier,
+            "uri": uri,
+            "isStream": is_stream,
+            "isSeekable": not is_stream,
+        })
+        for id_, title, author, length, identifier, uri, is_stream in table
+    ]
+
+
+def write_snapshot(path, data):
+    # The periodic write runs in an executor and may overlap the one at exit, so each gets its own temporary file.
+    directory, name = os.path.split(os.path.abspath(path))
+    with tempfile.NamedTemporaryFile(dir=directory, prefix=f"{name}.", suffix=".tmp", delete=False) as raw:
+        try:
+            with gzip.open(raw, "wt", compresslevel=5) as f:
+                json.dump(data, f, separators=(",", ":"))
+        except BaseException:
+            raw.close()
+            os.unlink(raw.name)
+            raise
+    os.replace(raw.name, path)
+
+
+def read_snapshot(path):
+    if not path or not os.path.exists(path):
+        return None
+
+    with gzip.open(path, "rt") as f:
+        data = json.load(f)
+
+    if data.get("version") != SNAPSHOT_VERSION:
+        return None
+    return data
@@ -0,0 +1,55 @@
+"""How long each step of a cold start took, up to the first playable moment.
+
+``mark(phase)`` records the seconds since the process started (including the
+interpreter's own startup where ``/proc`` tells us when that was) the first
+time a phase completes, so reconnects don't overwrite it. The phases are
+exported as ``boggy_startup_seconds`` and ``report()`` formats them in order:
+
+- ``imports`` - bot.py finished importing its dependencies
+- ``extensions`` - the cogs were loaded
+- ``login`` - the gateway connection was opened
+- ``ready`` - discord.py fired ``on_ready``
+- ``first_node`` - the first Lavalink node was ready, ``-play`` works from here
+- ``all_nodes`` - every configured node finished its handshake, or failed it
+"""
+import os
+import time
+
+from .metrics import Gauge
+
+PHASES = ("imports", "extensions", "login", "ready", "first_node", "all_nodes")
+
+STARTUP = Gauge("boggy_startup_seconds", "Seconds from process start to the end of each startup phase", ["phase"])
+
+_imported = time.perf_counter()
+_marks = {}
+
+
+def _process_age():
+    try:
+        with open("/proc/self/stat") as f:
+            # The command name may contain spaces, the fields after it don't.
+            start_ticks = int(f.read().rsplit(")", 1)[1].split()[19])
+        with open("/proc/uptime") as f:
+            uptime = float(f.read().split()[0])
+        return max(0., uptime - start_ticks / os.sysconf("SC_CLK_TCK"))
+    except (OSError, ValueError, IndexError, AttributeError):
+        return 0.
+
+
+# Startup time spent before this module was imported, 0 where /proc isn't available.
+_offset = _process_age()
+
+
+def elapsed():
+    return _offset + time.perf_counter() - _imported
+
+
+def mark(phase):
+    if phase not in _marks:
+        _marks[phase] = elapsed()
+        STARTUP.labels(phase).set(_marks[phase])
+
+
+def report():
+    return ", ".join(f"{phase.replace('_', ' ')} {_marks[phase]:.2f}s" for phase in PHASES if phase in _marks)
@@ -0,0 +1,241 @@
+import random
+from itertools import islice
+
+
+class TrackList:
+    """A list split into chunks with a Fenwick tree over the chunk sizes.
+
+    Indexing, insertion and removal at any position cost O(log n + chunk size)
+    instead of the O(n) shifting a plain list does at the front.
+    """
+
+    def __init__(self, iterable=(), load=256):
+        self._load = load
+        self._chunks = []
+        self._tree = []
+        self._len = 0
+        self.extend(iterable)
+
+    def __len__(self):
+        return self._len
+
+    def __bool__(self):
+        return self._len > 0
+
+    def __iter__(self):
+        for chunk in self._chunks:
+            yield from chunk
+
+    def __repr__(self):
+        return f"<TrackList len={self._len} chunks={len(self._chunks)}>"
+
+    def _build(self):
+        tree = [0] * (len(self._chunks) + 1)
+        for i, chunk in enumerate(self._chunks, 1):
+            tree[i] += len(chunk)
+            if (parent := i + (i & -i)) < len(tree):
+                tree[parent] += tree[i]
+        self._tree = tree
+
+    def _update(self, ci, delta):
+        i = ci + 1
+        while i < len(self._tree):
+            self._tree[i] += delta
+            i += i & -i
+
+    def _index(self, index):
+        if index < 0:
+            index += self._len
+        if not 0 <= index < self._len:
+            raise IndexError("TrackList index out of range")
+        return index
+
+    def _locate(self, index):
+        pos, step = 0, 1 << (len(self._tree).bit_length() - 1)
+        while step:
+            if (nxt := pos + step) < len(self._tree) and self._tree[nxt] <= index:
+                pos = nxt
+                index -= self._tree[nxt]
+            step >>= 1
+        return pos, index
+
+    def __getitem__(self, index):
+        ci, offset = self._locate(self._index(index))
+        return self._chunks[ci][offset]
+
+    def __setitem__(self, index, value):
+        ci, offset = self._locate(self._index(index))
+        self._chunks[ci][offset] = value
+
+    def __delitem__(self, index):
+        self.pop(index)
+
+    def iter_from(self, start=0, stop=None):
+        stop = self._len if stop is None else min(stop, self._len)
+        if start >= stop:
+            return
+        ci, offset = self._locate(start)
+        yield from islice(self._iter_chunks(ci, offset), stop - start)
+
+    def _iter_chunks(self, ci, offset):
+        yield from islice(self._chunks[ci], offset, None)
+        for chunk in islice(self._chunks, ci + 1, None):
+            yield from chunk
+
+    def append(self, value):
+        if not self._chunks or len(self._chunks[-1]) >= self._load:
+            self._chunks.append([value])
+            self._build()
+        else:
+            self._chunks[-1].append(value)
+            self._update(len(self._chunks) - 1, 1)
+        self._len += 1
+
+    def extend(self, iterable):
+        values = list(iterable)
+        if not values:
+            return
+
+        self._len += len(values)
+        if self._chunks and (room := self._load - len(self._chunks[-1])) > 0:
+            self._chunks[-1].extend(values[:room])
+            self._update(len(self._chunks) - 1, min(room, len(values)))
+            values = values[room:]
+
+        if values:
+            for i in range(0, len(values), self._load):
+                self._chunks.append(values[i:i + self._load])
+            self._build()
+
+    def insert(self, index, value):
+        if index < 0:
+            index = max(0, index + self._len)
+        if index >= self._len:
+            return self.append(value)
+
+        ci, offset = self._locate(index)
+        chunk = self._chunks[ci]
+        chunk.insert(offset, value)
+        self._len += 1
+
+        if len(chunk) > self._load * 2:
+            self._chunks[ci:ci + 1] = [chunk[:self._load], chunk[self._load:]]
+            self._build()
+        else:
+            self._update(ci, 1)
+
+    def insert_many(self, index, values):
+        values = list(values)
+        if index < 0:
+            index = max(0, index + self._len)
+        if index >= self._len:
+            return self.extend(values)
+        if not values:
+            return
+
+        ci, offset = self._locate(index)
+        chunk = self._chunks[ci]
+        merged = chunk[:offset] + values + chunk[offset:]
+        self._chunks[ci:ci + 1] = [merged[i:i + self._load] for i in range(0, len(merged), self._load)]
+        self._len += len(values)
+        self._build()
+
+    def pop(self, index=-1):
+        ci, offset = self._locate(self._index(index))
+        chunk = self._chunks[ci]
+        value = chunk.pop(offset)
+        self._len -= 1
+
+        if not chunk:
+            del self._chunks[ci]
+            self._build()
+        elif len(chunk) < self._load // 4 and len(self._chunks) > 1:
+            self._merge(ci)
+        else:
+            self._update(ci, -1)
+
+        return value
+
+    def _merge(self, ci):
+        other = ci + 1 if ci + 1 < len(self._chunks) else ci - 1
+        lo, hi = min(ci, other), max(ci, other)
+        merged = self._chunks[lo] + self._chunks[hi]
+
+        if len(merged) > self._load * 2:
+            half = len(merged) // 2
+            self._chunks[lo:hi + 1] = [merged[:half], merged[half:]]
+        else:
+            self._chunks[lo:hi + 1] = [merged]
+        self._build()
+
+    def remove_range(self, start, stop):
+        start, stop = max(0, start), min(stop, self._len)
+        if start >= stop:
+            return 0
+
+        ci, offset = self._locate(start)
+        first, remaining = ci, stop - start
+        while remaining:
+            chunk = self._chunks[ci]
+            take = min(remaining, len(chunk) - offset)
+            del chunk[offset:offset + take]
+            remaining -= take
+            if chunk:
+                ci += 1
+            else:
+                del self._chunks[ci]
+            offset = 0
+
+        self._len -= stop - start
+        self._build()
+        # Like pop, fold a chunk left short on either side of the gap into its neighbour.
+        for ci in (first + 1, first):
+            if ci < len(self._chunks) and len(self._chunks[ci]) < self._load // 4 and len(self._chunks) > 1:
+                self._merge(ci)
+        return stop - start
+
+    def move(self, src, dst):
+        self.insert(dst, self.pop(src))
+
+    def shuffle(self, start=0):
+        if start >= self._len:
+            return
+
+        tail = list(self.iter_from(start))
+        random.shuffle(tail)
+        self.remove_range(start, self._len)
+        self.extend(tail)
+
+    def clear(self):
+        self._chunks.clear()
+        self._tree = []
+        self._len = 0
+
+
+class TrackListView:
+    def __init__(self, tracks, start, stop):
+        self._tracks = tracks
+        self.start = max(0, start)
+        self.stop = max(self.start, min(stop, len(tracks)))
+
+    def __len__(self):
+        return self.stop - self.start
+
+    def __bool__(self):
+        return self.stop > self.start
+
+    def __iter__(self):
+        return self._tracks.iter_from(self.start, self.stop)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self))
+            if step != 1:
+                return list(self)[index]
+            return list(self._tracks.iter_from(self.start + start, self.start + stop))
+
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("TrackListView index out of range")
+        return self._tracks[self.start + index]
@@ -0,0 +1,49 @@
+import os
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+SEARCH_CACHE_SIZE = int(os.getenv("SEARCH_CACHE_SIZE", 2048))
+SEARCH_CACHE_TTL = float(os.getenv("SEARCH_CACHE_TTL", 3600))
+SEARCH_CACHE_PATH = os.getenv("SEARCH_CACHE_PATH") or None
+
+HTTP_POOL_LIMIT = int(os.getenv("HTTP_POOL_LIMIT", 100))
+HTTP_POOL_LIMIT_PER_HOST = int(os.getenv("HTTP_POOL_LIMIT_PER_HOST", 20))
+LYRICS_CACHE_SIZE = int(os.getenv("LYRICS_CACHE_SIZE", 512))
+LYRICS_CACHE_TTL = float(os.getenv("LYRICS_CACHE_TTL", 86400))
+
+LAVALINK_NODES = os.getenv("LAVALINK_NODES", "nodes.json")
+NODE_CHECK_INTERVAL = float(os.getenv("NODE_CHECK_INTERVAL", 5))
+NODE_PENALTY_LIMIT = float(os.getenv("NODE_PENALTY_LIMIT", 500))
+
+PLAY_HISTORY_SIZE = int(os.getenv("PLAY_HISTORY_SIZE", 200))
+PLAY_HISTORY_MEMORY = float(os.getenv("PLAY_HISTORY_MEMORY", 32))
+
+GUILD_SETTINGS_PATH = os.getenv("GUILD_SETTINGS_PATH", "guild_settings.json")
+IDLE_TIMEOUT = float(os.getenv("IDLE_TIMEOUT", 750))
+PLAYER_EVICT_AFTER = float(os.getenv("PLAYER_EVICT_AFTER", 300))
+
+STREAM_PLAYLISTS = os.getenv("STREAM_PLAYLISTS", "1").lower() not in ("0", "false", "no")
+GAPLESS_PLAYBACK = os.getenv("GAPLESS_PLAYBACK", "1").lower() not in ("0", "false", "no")
+GAPLESS_MAX_LEAD = float(os.getenv("GAPLESS_MAX_LEAD", 0.5))
+AUTOPLAY_BUFFER_SIZE = int(os.getenv("AUTOPLAY_BUFFER_SIZE", 5))
+AUTOPLAY_SEARCH_RATE = int(os.getenv("AUTOPLAY_SEARCH_RATE", 4))
+
+SNAPSHOT_PATH = os.getenv("SNAPSHOT_PATH", "snapshot.json.gz")
+SNAPSHOT_INTERVAL = float(os.getenv("SNAPSHOT_INTERVAL", 60))
+RESTORE_CONCURRENCY = int(os.getenv("RESTORE_CONCURRENCY", 25))
+
+SHARDED = os.getenv("SHARDED", "0").lower() in ("1", "true", "yes")
+SHARD_COUNT = int(os.getenv("SHARD_COUNT") or 0) or None
+SHARD_IDS = [int(i) for i in os.getenv("SHARD_IDS").split(",")] if os.getenv("SHARD_IDS") else None
+SHARDS_PER_CLUSTER = int(os.getenv("SHARDS_PER_CLUSTER", 4))
+CLUSTER_ID = int(os.getenv("CLUSTER_ID") or 0)
+IPC_HOST = os.getenv("IPC_HOST", "127.0.0.1")
+IPC_PORT = int(os.getenv("IPC_PORT") or 0)
+
+CACHE_PROFILE = os.getenv("CACHE_PROFILE", "full").lower()
+MESSAGE_CACHE_SIZE = int(os.getenv("MESSAGE_CACHE_SIZE", 250))
+
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+METRICS_PORT = int(os.getenv("METRICS_PORT") or 0)
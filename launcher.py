@@ -0,0 +1,104 @@
+import asyncio
+import os
+import signal
+import sys
+import time
+from pathlib import Path
+
+import aiohttp
+
+import config
+from cogs.utils.ipc import IPCServer
+
+GATEWAY_URL = "https://discord.com/api/v9/gateway/bot"
+IPC_PORT = config.IPC_PORT or 4000
+BOT_SCRIPT = Path(__file__).resolve().parent / "bot.py"
+
+
+async def recommended_shards(token):
+    async with aiohttp.ClientSession() as session:
+        async with session.get(GATEWAY_URL, headers={"Authorization": f"Bot {token}"}) as r:
+            r.raise_for_status()
+            return (await r.json())["shards"]
+
+
+def cluster_path(path, cluster_id):
+    head, name = os.path.split(path)
+    root, sep, ext = name.partition(".")
+    return os.path.join(head, f"{root}.cluster{cluster_id}{sep}{ext}")
+
+
+class Cluster:
+    def __init__(self, cluster_id, shard_ids, shard_count):
+        self.cluster_id = cluster_id
+        self.shard_ids = shard_ids
+        self.shard_count = shard_count
+        self.process = None
+        self.stopping = False
+
+    @property
+    def env(self):
+        return dict(
+            os.environ,
+            CLUSTER_ID=str(self.cluster_id),
+            SHARD_IDS=",".join(map(str, self.shard_ids)),
+            SHARD_COUNT=str(self.shard_count),
+            IPC_HOST=config.IPC_HOST,
+            IPC_PORT=str(IPC_PORT),
+            SNAPSHOT_PATH=cluster_path(config.SNAPSHOT_PATH, self.cluster_id) if config.SNAPSHOT_PATH else "",
+            METRICS_PORT=str(config.METRICS_PORT + self.cluster_id) if config.METRICS_PORT else "",
+        )
+
+    async def run(self):
+        backoff = 1
+
+        while not self.stopping:
+            started = time.monotonic()
+            self.process = await asyncio.create_subprocess_exec(sys.executable, str(BOT_SCRIPT), env=self.env)
+            print(f"Cluster {self.cluster_id} started (pid {self.process.pid}, shards {self.shard_ids[0]}-{self.shard_ids[-1]})")
+            code = await self.process.wait()
+
+            if self.stopping or code == 0:
+                break
+
+            if time.monotonic() - started > 60:
+                backoff = 1
+            print(f"Cluster {self.cluster_id} exited with code {code}, restarting in {backoff}s")
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, 60)
+
+        print(f"Cluster {self.cluster_id} stopped")
+
+    def stop(self):
+        self.stopping = True
+        if self.process is not None and self.process.returncode is None:
+            self.process.terminate()
+
+
+async def main():
+    shard_count = config.SHARD_COUNT or await recommended_shards(os.getenv("DISCORD_TOKEN"))
+    shards = list(range(shard_count))
+    clusters = [
+        Cluster(i, shards[start:start + config.SHARDS_PER_CLUSTER], shard_count)
+        for i, start in enumerate(range(0, shard_count, config.SHARDS_PER_CLUSTER))
+    ]
+    print(f"Launching {shard_count} shards in {len(clusters)} clusters")
+
+    ipc = IPCServer(config.IPC_HOST, IPC_PORT)
+    await ipc.start()
+
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, lambda: [cluster.stop() for cluster in clusters])
+        except NotImplementedError:
+            pass
+
+    try:
+        await asyncio.gather(*(cluster.run() for cluster in clusters))
+    finally:
+        await ipc.stop()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
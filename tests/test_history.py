@@ -0,0 +1,42 @@
+import wavelink
+
+from cogs.utils.history import GuildHistory
+
+
+def make_history(*titles):
+    history = GuildHistory(size=100)
+    for i, title in enumerate(titles):
+        history.add(wavelink.Track(id_=f"id{i}", info={"identifier": f"yt{i}", "title": title, "author": "Someone"}))
+    return history
+
+
+def found(history, query):
+    return entry.title if (entry := history.find(query)) is not None else None
+
+
+def test_whole_words():
+    history = make_history("Never Gonna Give You Up (Official Video)", "Hello")
+    assert found(history, "never gonna give") == "Never Gonna Give You Up (Official Video)"
+    assert found(history, "hello") == "Hello"
+
+
+def test_typo():
+    history = make_history("Hello", "Bohemian Rhapsody")
+    assert found(history, "helo") == "Hello"
+    assert found(history, "bohemian rapsody") == "Bohemian Rhapsody"
+
+
+def test_prefix_doesnt_cover_title():
+    history = make_history("Lovely", "Hello")
+    assert found(history, "love") is None
+    assert found(history, "hell") is None
+
+
+def test_prefix_narrows_covered_title():
+    history = make_history("Never Gonna Give You Up", "Never Enough")
+    assert found(history, "never gonna give yo") == "Never Gonna Give You Up"
+
+
+def test_single_common_word():
+    history = make_history("Love The Way You Lie")
+    assert found(history, "love") is None
@@ -0,0 +1,77 @@
+import json
+
+import pytest
+
+from cogs.utils.ingest import LoadTracksParser
+
+TRACKS = [
+    {"track": "QAAAjQIAJVJpY2sgQXN0bGV5", "info": {"title": "Never Gonna Give You Up", "length": 212000}},
+    {"track": "QAAAfwIAF0JvaGVtaWFu", "info": {"title": "Say \"hi\" \\ back\nslash", "length": 1}},
+    {"track": "QAAAlgIAGeaXpeacrA==", "info": {"title": "日本語 ąéß 🎵  ", "length": -1.5e3}},
+    {"track": "QAAAhQIAG0Z1bGw=", "info": {"title": "{[,:]}", "length": 0, "isStream": True, "uri": None}},
+]
+RESPONSE = {
+    "loadType": "PLAYLIST_LOADED",
+    "playlistInfo": {"name": "Mix \"1\"", "selectedTrack": -1},
+    "tracks": TRACKS,
+    "exception": None,
+}
+
+
+def encode(ensure_ascii):
+    return json.dumps(RESPONSE, ensure_ascii=ensure_ascii, indent=1).encode()
+
+
+def parse(chunks):
+    parser = LoadTracksParser()
+    tracks = []
+    for chunk in chunks:
+        tracks.extend(parser.feed(chunk))
+    return parser, tracks
+
+
+def check(parser, tracks):
+    assert parser.done
+    assert tracks == TRACKS
+    assert parser.info == {key: value for key, value in RESPONSE.items() if key != "tracks"}
+
+
+@pytest.mark.parametrize("ensure_ascii", [True, False])
+def test_whole_response(ensure_ascii):
+    check(*parse([encode(ensure_ascii)]))
+
+
+@pytest.mark.parametrize("ensure_ascii", [True, False])
+def test_split_at_every_byte(ensure_ascii):
+    # Every split point, so some land inside strings, escapes and multi-byte characters.
+    data = encode(ensure_ascii)
+    for i in range(1, len(data)):
+        check(*parse([data[:i], data[i:]]))
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 7])
+def test_small_chunks(size):
+    data = encode(False)
+    check(*parse([data[i:i + size] for i in range(0, len(data), size)]))
+
+
+def test_tracks_come_out_as_soon_as_they_are_complete():
+    data = encode(False)
+    parser = LoadTracksParser()
+    end_of_first = data.index(b'"track": "QAAAfwIA')
+    assert parser.feed(data[:end_of_first]) == TRACKS[:1]
+    assert parser.feed(data[end_of_first:]) == TRACKS[1:]
+
+
+def test_number_at_the_end_of_a_chunk_waits_for_the_rest():
+    parser = LoadTracksParser()
+    assert parser.feed(b'{"loadType": "SEARCH_RESULT", "tracks": [], "count": 12') == []
+    assert "count" not in parser.info
+    parser.feed(b'34}')
+    assert parser.info["count"] == 1234
+    assert parser.done
+
+
+def test_rejects_other_responses():
+    with pytest.raises(ValueError):
+        LoadTracksParser().feed(b'["not", "an", "object"]')
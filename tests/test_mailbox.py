@@ -0,0 +1,162 @@
+import asyncio
+
+import pytest
+
+from cogs.utils.mailbox import Mailbox, MailboxFull
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+async def blocked_mailbox(maxsize=32):
+    # A mailbox whose worker is held up by a running command until the returned event is set.
+    mailbox = Mailbox(maxsize=maxsize)
+    gate = asyncio.Event()
+
+    async def block():
+        await gate.wait()
+
+    blocker = asyncio.ensure_future(mailbox.call(block))
+    while mailbox.running is None:
+        await asyncio.sleep(0)
+    return mailbox, gate, blocker
+
+
+def test_fifo_order():
+    async def main():
+        mailbox, gate, blocker = await blocked_mailbox()
+        order = []
+
+        async def record(item):
+            order.append(item)
+            return item
+
+        calls = [asyncio.ensure_future(mailbox.call(record, f"command {i}")) for i in range(3)]
+        await asyncio.sleep(0)
+        mailbox.post(record, "event")
+        calls.append(asyncio.ensure_future(mailbox.call(record, "last")))
+        await asyncio.sleep(0)
+
+        gate.set()
+        results = await asyncio.gather(blocker, *calls)
+        await asyncio.sleep(0)
+        assert results[1:] == ["command 0", "command 1", "command 2", "last"]
+        assert order == ["command 0", "command 1", "command 2", "event", "last"]
+        assert mailbox.worker is None
+
+    run(main())
+
+
+def test_events_coalesce_by_kind():
+    async def main():
+        mailbox, gate, blocker = await blocked_mailbox()
+        order = []
+
+        async def track_end(n):
+            order.append(("end", n))
+
+        async def track_start(n):
+            order.append(("start", n))
+
+        for n in range(3):
+            mailbox.post(track_end, n)
+            mailbox.post(track_start, n)
+        assert len(mailbox) == 2
+        assert mailbox.dropped == 4
+
+        gate.set()
+        await blocker
+        await asyncio.sleep(0)
+        assert order == [("end", 2), ("start", 2)]
+
+    run(main())
+
+
+def test_full_mailbox_refuses_commands_but_takes_events():
+    async def main():
+        mailbox, gate, blocker = await blocked_mailbox(maxsize=2)
+        ran = []
+
+        async def record(item):
+            ran.append(item)
+
+        calls = [asyncio.ensure_future(mailbox.call(record, i)) for i in range(2)]
+        await asyncio.sleep(0)
+        with pytest.raises(MailboxFull):
+            await mailbox.call(record, "refused")
+
+        mailbox.post(record, "event")
+        assert len(mailbox) == 3
+
+        gate.set()
+        await asyncio.gather(blocker, *calls)
+        await asyncio.sleep(0)
+        assert ran == [0, 1, "event"]
+
+    run(main())
+
+
+def test_close_cancels_running_and_pending_calls():
+    async def main():
+        mailbox, gate, blocker = await blocked_mailbox()
+
+        async def never():
+            raise AssertionError("ran after close")
+
+        pending = asyncio.ensure_future(mailbox.call(never))
+        await asyncio.sleep(0)
+        mailbox.post(never)
+        mailbox.close()
+
+        for future in (blocker, pending):
+            with pytest.raises(asyncio.CancelledError):
+                await asyncio.wait_for(future, 1)
+        assert len(mailbox) == 0
+        assert mailbox.worker is None
+
+    run(main())
+
+
+def test_close_from_the_worker_finishes_the_current_item():
+    async def main():
+        mailbox = Mailbox()
+
+        async def teardown():
+            mailbox.close()
+            return "done"
+
+        assert await mailbox.call(teardown) == "done"
+
+    run(main())
+
+
+def test_reentrant_call_runs_inline():
+    async def main():
+        mailbox = Mailbox()
+
+        async def inner():
+            return "inner"
+
+        async def outer():
+            # Waiting on the mailbox from its own worker would deadlock, so this runs directly.
+            return await mailbox.call(inner), len(mailbox)
+
+        assert await asyncio.wait_for(mailbox.call(outer), 1) == ("inner", 0)
+
+    run(main())
+
+
+def test_event_errors_are_logged_and_command_errors_raised(caplog):
+    async def main():
+        mailbox = Mailbox()
+
+        async def fail():
+            raise ValueError("boom")
+
+        mailbox.post(fail)
+        with pytest.raises(ValueError):
+            await mailbox.call(fail)
+
+    run(main())
+    assert "Error in player event fail" in caplog.text
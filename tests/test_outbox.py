@@ -0,0 +1,154 @@
+import asyncio
+
+import discord
+import pytest
+
+from cogs.utils import outbox as outbox_module
+from cogs.utils.outbox import MAX_DESCRIPTION, MAX_PENDING, Outbox, TokenBucket
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class FakeChannel:
+    def __init__(self, channel_id=1):
+        self.id = channel_id
+        self.sent = []
+
+    async def send(self, content=None, *, embed=None):
+        self.sent.append((content, embed.description if embed is not None else None))
+        return len(self.sent)
+
+
+class FakeMessage:
+    def __init__(self, channel):
+        self.channel = channel
+        self.reactions = []
+
+    async def add_reaction(self, emoji):
+        self.reactions.append(emoji)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(outbox_module.time, "monotonic", clock)
+    return clock
+
+
+def notice(text):
+    return discord.Embed(description=text, color=0xff0000)
+
+
+def test_bucket_starts_full_and_refills(clock):
+    bucket = TokenBucket(5, 5.0)
+    assert [bucket.take() for _ in range(6)] == [True] * 5 + [False]
+    assert bucket.delay() == pytest.approx(1.0)
+
+    clock.now += 0.5
+    assert not bucket.take()
+    clock.now += 0.5
+    assert bucket.take()
+
+    # Refilling stops at the bucket's size.
+    clock.now += 60
+    assert [bucket.take() for _ in range(6)] == [True] * 5 + [False]
+
+
+def test_bucket_exhaust(clock):
+    bucket = TokenBucket(4, 1.0)
+    bucket.exhaust(retry_after=2.0)
+    assert not bucket.take()
+    # Discord's retry_after is how long until the next request may go out.
+    assert bucket.delay() == pytest.approx(2.0)
+    clock.now += 2.0
+    assert bucket.take()
+
+
+def test_queued_notices_are_merged():
+    async def main():
+        outbox = Outbox()
+        channel = FakeChannel()
+        try:
+            for i in range(5):
+                assert await outbox.send(channel, embed=notice(f"sent {i}")) == i + 1
+            for i in range(3):
+                assert await outbox.send(channel, embed=notice(f"queued {i}")) is None
+            await outbox.send(channel, "plain text")
+            await outbox.send(channel, embed=notice("after text"))
+            queued = [(content, embed.description if embed else None) for content, embed in outbox.pending[channel.id]]
+        finally:
+            outbox.close()
+        return channel, queued
+
+    channel, queued = asyncio.run(main())
+    assert [description for _, description in channel.sent] == [f"sent {i}" for i in range(5)]
+    assert queued == [(None, "queued 0\nqueued 1\nqueued 2"), ("plain text", None), (None, "after text")]
+
+
+def test_merged_queue_contents():
+    queue = outbox_module._Pending([(None, notice("a"))])
+    assert Outbox._merge(queue, None, notice("b"))
+    assert queue[-1][1].description == "a\nb"
+
+    # Text, embeds with more than a description and overlong notices are kept apart.
+    assert not Outbox._merge(queue, "text", None)
+    assert not Outbox._merge(queue, None, notice("c").set_footer(text="footer"))
+    assert not Outbox._merge(queue, None, notice("x" * MAX_DESCRIPTION))
+    assert len(queue) == 1
+
+
+def test_queue_is_flushed_when_budget_returns(monkeypatch):
+    monkeypatch.setattr(outbox_module, "MESSAGE_RATE", (2, 0.05))
+
+    async def main():
+        outbox = Outbox()
+        channel = FakeChannel()
+        try:
+            for i in range(2):
+                await outbox.send(channel, embed=notice(f"now {i}"))
+            await outbox.send(channel, embed=notice("later 0"))
+            await outbox.send(channel, embed=notice("later 1"))
+            await outbox.send(channel, "text")
+            await asyncio.wait_for(outbox.pending[channel.id].task, 1)
+        finally:
+            outbox.close()
+        return channel
+
+    channel = asyncio.run(main())
+    assert channel.sent == [(None, "now 0"), (None, "now 1"), (None, "later 0\nlater 1"), ("text", None)]
+
+
+def test_full_queue_drops_messages():
+    async def main():
+        outbox = Outbox()
+        channel = FakeChannel()
+        try:
+            for i in range(5):
+                await outbox.send(channel, embed=notice(f"sent {i}"))
+            for i in range(MAX_PENDING + 3):
+                await outbox.send(channel, f"text {i}")
+            return len(outbox.pending[channel.id])
+        finally:
+            outbox.close()
+
+    assert asyncio.run(main()) == MAX_PENDING
+
+
+def test_reactions_are_dropped_without_budget():
+    async def main():
+        outbox = Outbox()
+        message = FakeMessage(FakeChannel())
+        try:
+            for _ in range(6):
+                await outbox.react(message, "👌")
+        finally:
+            outbox.close()
+        return message.reactions
+
+    assert asyncio.run(main()) == ["👌"] * 4
@@ -0,0 +1,34 @@
+import pytest
+
+from cogs.utils.query import QueryKind, classify
+from tools.fuzz_query import ADVERSARIAL, check, check_bounds, fuzz
+
+# Fewer and shorter runs than the script's defaults to keep the suite quick.
+SIZES = (1_000, 30_000)
+BUDGET = 500e-9
+
+
+@pytest.mark.parametrize("query, kind", [
+    ("never gonna give you up", QueryKind.TEXT),
+    ("ytsearch:rick astley", QueryKind.SEARCH),
+    ("https://www.youtube.com/watch?v=dQw4w9WgXcQ", QueryKind.YOUTUBE),
+    ("<https://www.youtube.com/watch?v=dQw4w9WgXcQ&list=PL123>", QueryKind.YOUTUBE_PLAYLIST),
+    ("youtu.be/dQw4w9WgXcQ", QueryKind.YOUTUBE),
+    ("https://soundcloud.com/artist/sets/album", QueryKind.SOUNDCLOUD_PLAYLIST),
+    ("www.example.com", QueryKind.URL),
+    ("example.com/track.mp3", QueryKind.URL),
+    ("a.b", QueryKind.TEXT),
+    ("", QueryKind.TEXT),
+])
+def test_classify(query, kind):
+    assert classify(query).kind is kind
+    check(query)
+
+
+def test_fuzz():
+    assert fuzz(20_000, seed=0) is None
+
+
+@pytest.mark.parametrize("name", ADVERSARIAL)
+def test_crafted_queries_take_linear_time(name):
+    assert check_bounds(name, SIZES, BUDGET, repeat=1) == []
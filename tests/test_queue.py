@@ -0,0 +1,124 @@
+import pytest
+
+from cogs.music import CurrentTrackRemoval, Queue, QueueIsEmpty, RepeatMode
+
+
+def make_queue(tracks="ABCDE", position=0):
+    queue = Queue()
+    queue.add(*tracks)
+    queue.position = position
+    return queue
+
+
+def test_current_track():
+    assert make_queue(position=2).current_track == "C"
+    assert make_queue(position=5).current_track is None
+    assert make_queue(position=-1).current_track is None
+
+
+def test_current_track_of_empty_queue():
+    with pytest.raises(QueueIsEmpty):
+        Queue().current_track
+
+
+def test_remove_before_current():
+    queue = make_queue(position=2)
+    assert queue.remove(0) == "A"
+    assert list(queue._queue) == list("BCDE")
+    assert queue.position == 1
+    assert queue.current_track == "C"
+
+
+def test_remove_after_current():
+    queue = make_queue(position=2)
+    assert queue.remove(4) == "E"
+    assert queue.position == 2
+    assert queue.current_track == "C"
+
+
+@pytest.mark.parametrize("position", [0, 2, 4])
+def test_remove_current(position):
+    queue = make_queue(position=position)
+    with pytest.raises(CurrentTrackRemoval):
+        queue.remove(position)
+    assert list(queue._queue) == list("ABCDE")
+    assert queue.position == position
+
+
+def test_remove_after_queue_ended():
+    queue = make_queue(position=5)
+    queue.remove(0)
+    assert queue.position == 4
+    assert queue.current_track is None
+
+
+def test_remove_range_before_current():
+    queue = make_queue(position=3)
+    assert queue.remove_range(0, 2) == 2
+    assert queue.position == 1
+    assert queue.current_track == "D"
+
+
+def test_remove_range_after_current():
+    queue = make_queue(position=1)
+    assert queue.remove_range(2, 10) == 3
+    assert list(queue._queue) == list("AB")
+    assert queue.current_track == "B"
+
+
+@pytest.mark.parametrize("start, stop", [(0, 3), (2, 3), (1, 5)])
+def test_remove_range_with_current(start, stop):
+    queue = make_queue(position=2)
+    with pytest.raises(CurrentTrackRemoval):
+        queue.remove_range(start, stop)
+    assert list(queue._queue) == list("ABCDE")
+    assert queue.position == 2
+
+
+@pytest.mark.parametrize("src, dst, current", [(2, 0, "C"), (0, 4, "C"), (4, 0, "C"), (3, 4, "C"), (2, 4, "C")])
+def test_move_keeps_current_track(src, dst, current):
+    queue = make_queue(position=2)
+    queue.move(src, dst)
+    assert sorted(queue._queue) == list("ABCDE")
+    assert queue.current_track == current
+
+
+def test_move_current_track():
+    queue = make_queue(position=2)
+    queue.move(2, 0)
+    assert list(queue._queue) == list("CABDE")
+    assert queue.position == 0
+
+
+def test_insert_before_current():
+    queue = make_queue(position=2)
+    queue.insert(0, "X", "Y")
+    assert list(queue._queue) == list("XYABCDE")
+    assert queue.current_track == "C"
+
+
+def test_insert_at_current():
+    queue = make_queue(position=2)
+    queue.insert(2, "X")
+    assert queue.current_track == "C"
+    assert queue.peek_next() == "D"
+
+
+def test_insert_after_current():
+    queue = make_queue(position=2)
+    queue.insert(3, "X")
+    assert queue.current_track == "C"
+    assert queue.peek_next() == "X"
+
+
+def test_insert_after_queue_ended():
+    queue = make_queue(position=5)
+    queue.insert(5, "X")
+    assert queue.current_track == "X"
+
+
+def test_get_next_track_repeats_all():
+    queue = make_queue(position=4)
+    queue.repeat_mode = RepeatMode.ALL
+    assert queue.get_next_track() == "A"
+    assert queue.position == 0
@@ -0,0 +1,107 @@
+import asyncio
+
+from cogs.utils.scheduler import DeadlineScheduler
+
+
+def run_scheduler(script, wait=0.25):
+    # Runs ``script(scheduler)`` and returns the keys in the order their callbacks fired.
+    async def main():
+        fired = []
+
+        async def callback(key):
+            fired.append(key)
+
+        scheduler = DeadlineScheduler(callback)
+        scheduler.start()
+        try:
+            await script(scheduler)
+            await asyncio.sleep(wait)
+        finally:
+            scheduler.stop()
+        return fired, scheduler
+
+    return asyncio.run(main())
+
+
+def test_fires_in_deadline_order():
+    async def script(scheduler):
+        scheduler.arm("c", 0.09)
+        scheduler.arm("a", 0.03)
+        scheduler.arm("b", 0.06)
+
+    fired, scheduler = run_scheduler(script)
+    assert fired == ["a", "b", "c"]
+    assert len(scheduler) == 0
+
+
+def test_earlier_deadline_wakes_the_sleeping_task():
+    async def script(scheduler):
+        scheduler.arm("late", 10)
+        await asyncio.sleep(0.01)
+        scheduler.arm("early", 0.02)
+
+    fired, scheduler = run_scheduler(script, wait=0.1)
+    assert fired == ["early"]
+    assert "late" in scheduler
+
+
+def test_rearming_replaces_the_deadline():
+    async def script(scheduler):
+        scheduler.arm("a", 0.02)
+        scheduler.arm("b", 0.05)
+        scheduler.arm("a", 0.1)
+
+    fired, _ = run_scheduler(script)
+    assert fired == ["b", "a"]
+
+
+def test_rearming_earlier():
+    async def script(scheduler):
+        scheduler.arm("a", 10)
+        scheduler.arm("b", 0.05)
+        scheduler.arm("a", 0.02)
+
+    fired, _ = run_scheduler(script)
+    assert fired == ["a", "b"]
+
+
+def test_cancel():
+    async def script(scheduler):
+        scheduler.arm("a", 0.02)
+        scheduler.arm("b", 0.04)
+        scheduler.cancel("a")
+        scheduler.cancel("missing")
+
+    fired, scheduler = run_scheduler(script)
+    assert fired == ["b"]
+    assert scheduler.remaining("a") is None
+
+
+def test_cancel_then_rearm():
+    async def script(scheduler):
+        scheduler.arm("a", 0.02)
+        scheduler.cancel("a")
+        scheduler.arm("a", 0.05)
+        await asyncio.sleep(0.035)
+        assert "a" in scheduler
+
+    fired, _ = run_scheduler(script)
+    assert fired == ["a"]
+
+
+def test_remaining():
+    async def script(scheduler):
+        scheduler.arm("a", 5)
+        assert 4.9 < scheduler.remaining("a") <= 5
+
+    run_scheduler(script, wait=0)
+
+
+def test_heap_is_compacted_when_rearmed_often():
+    async def script(scheduler):
+        for _ in range(1000):
+            scheduler.arm("a", 10)
+        assert len(scheduler._heap) < 100
+        assert len(scheduler) == 1
+
+    run_scheduler(script, wait=0)
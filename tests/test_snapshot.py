@@ -0,0 +1,83 @@
+import types
+
+import wavelink
+
+from cogs.music import Queue, RepeatMode
+from cogs.utils.snapshot import SNAPSHOT_VERSION, dump_players, load_tracks, read_snapshot, write_snapshot
+
+
+def make_track(n, stream=False):
+    return wavelink.Track(id_=f"encoded{n}", info={
+        "title": f"Track {n}",
+        "author": f"Artist {n % 3}",
+        "length": 0 if stream else 1000 * n,
+        "identifier": f"yt{n}",
+        "uri": f"https://www.youtube.com/watch?v=yt{n}",
+        "isStream": stream,
+        "isSeekable": not stream,
+    })
+
+
+def make_player(guild_id, tracks, *, connected=True, position=0):
+    queue = Queue()
+    queue.add(*tracks)
+    queue.position = position
+    queue.repeat_mode = RepeatMode.ALL
+    return types.SimpleNamespace(
+        guild_id=guild_id,
+        channel_id=guild_id * 10,
+        is_connected=connected,
+        node=types.SimpleNamespace(identifier="MAIN"),
+        queue=queue,
+        position=1234.5,
+        is_paused=True,
+        volume=80,
+        eq_levels=[0.1] * 15,
+        equalizer=wavelink.eqs.Equalizer.boost(),
+    )
+
+
+def test_round_trip(tmp_path):
+    tracks = [make_track(n) for n in range(5)] + [make_track(5, stream=True)]
+    players = [
+        make_player(1, tracks, position=2),
+        make_player(2, tracks[3:] + tracks[:1]),
+        make_player(3, tracks, connected=False),
+        make_player(4, []),
+    ]
+
+    path = str(tmp_path / "snapshot.json.gz")
+    write_snapshot(path, dump_players(players))
+    data = read_snapshot(path)
+
+    assert [saved["guild"] for saved in data["players"]] == [1, 2]
+    # Tracks queued in several guilds are stored once.
+    assert len(data["tracks"]) == len(tracks)
+
+    table = load_tracks(data["tracks"])
+    for saved, player in zip(data["players"], players):
+        restored = [table[ref] for ref in saved["tracks"]]
+        assert [track.id for track in restored] == [track.id for track in player.queue._queue]
+        for track, original in zip(restored, player.queue._queue):
+            assert (track.title, track.author, track.length, track.identifier, track.uri, track.is_stream) == (
+                original.title, original.author, original.length, original.identifier, original.uri, original.is_stream
+            )
+
+        assert saved["position"] == player.queue.position
+        assert RepeatMode(saved["repeat"]) is RepeatMode.ALL
+        assert saved["time"] == 1234
+        assert saved["paused"] is True
+        assert saved["volume"] == 80
+        assert saved["eq_levels"] == player.eq_levels
+        name, levels = saved["equalizer"]
+        equalizer = wavelink.eqs.Equalizer(levels=[tuple(level) for level in levels], name=name)
+        assert (equalizer.name, equalizer.eq) == (player.equalizer.name, player.equalizer.eq)
+
+    assert list(tmp_path.iterdir()) == [tmp_path / "snapshot.json.gz"]
+
+
+def test_other_versions_are_ignored(tmp_path):
+    path = str(tmp_path / "snapshot.json.gz")
+    write_snapshot(path, {"version": SNAPSHOT_VERSION + 1, "tracks": [], "players": []})
+    assert read_snapshot(path) is None
+    assert read_snapshot(str(tmp_path / "missing.json.gz")) is None
@@ -0,0 +1,40 @@
+import random
+
+import pytest
+
+from cogs.utils.tracklist import TrackList
+
+
+def check(tracks, expected):
+    assert list(tracks) == expected
+    assert len(tracks) == len(expected)
+    assert [tracks[i] for i in range(len(expected))] == expected
+    assert all(tracks._chunks)
+
+
+@pytest.mark.parametrize("start, stop", [(0, 5), (3, 37), (14, 50), (30, 64), (0, 64), (15, 16)])
+def test_remove_range(start, stop):
+    tracks, expected = TrackList(range(64), load=16), list(range(64))
+    assert tracks.remove_range(start, stop) == stop - start
+    del expected[start:stop]
+    check(tracks, expected)
+
+
+def test_remove_range_merges_short_chunks():
+    tracks = TrackList(range(64), load=16)
+    # Leaves one track of the first chunk and one of the third, each folded into its neighbour.
+    tracks.remove_range(1, 47)
+    check(tracks, [0] + list(range(47, 64)))
+    assert [len(chunk) for chunk in tracks._chunks] == [18]
+
+
+def test_repeated_small_removals_do_not_leave_slivers():
+    tracks, expected = TrackList(range(1000), load=16), list(range(1000))
+    rng = random.Random(0)
+    while len(expected) > 50:
+        start = rng.randrange(len(expected))
+        stop = start + rng.randrange(1, 40)
+        tracks.remove_range(start, stop)
+        del expected[start:stop]
+        check(tracks, expected)
+    assert len(tracks._chunks) <= len(expected) // (16 // 4) + 1
@@ -0,0 +1,186 @@
+"""Microbenchmarks for the queue, the embeds built from it and the query classifier.
+
+Every benchmark runs against a queue of synthetic ``wavelink.Track`` objects at
+each size (the query length for ``classify``, five results for ``track_choices``) and reports operations per second and the peak memory allocated while
+building the queue (not the tracks themselves) and running the operation once.
+
+    python -m tools.bench --save bench_baseline.json
+    python -m tools.bench --compare bench_baseline.json
+
+A comparison run exits with status 1 when a benchmark got slower or allocates
+more than ``--tolerance`` (a fraction) compared to the baseline. Baselines are
+only meaningful on the machine they were recorded on.
+"""
+import argparse
+import itertools
+import json
+import sys
+import timeit
+import tracemalloc
+
+import wavelink
+
+from cogs.music import Queue, RepeatMode, queue_description, track_choices
+from cogs.utils.query import classify
+from tools.fake_lavalink import make_track
+
+SIZES = (10, 100, 1000, 10_000, 100_000)
+# The most timed calls on one queue for benchmarks that grow it, so the size
+# being measured stays within 10% of the nominal one.
+MAX_CALLS = {"add": lambda n: max(1, n // 10)}
+# track_choices only formats the first five results, whatever the list size.
+FIXED_SIZES = {"track_choices": (5,)}
+MAX_RUNS = 1000
+
+
+_tracks = []
+
+
+def make_tracks(n, offset=0):
+    # Tracks are built once and shared, so peak memory covers the queue and the operation only.
+    for i in range(len(_tracks), offset + n):
+        data = make_track(f"bench {i}")
+        _tracks.append(wavelink.Track(id_=data["track"], info=data["info"]))
+    return _tracks[offset:offset + n]
+
+
+def make_queue(n, position=0, repeat_mode=RepeatMode.NONE):
+    queue = Queue()
+    queue.add(*make_tracks(n))
+    queue.position = position
+    queue.repeat_mode = repeat_mode
+    return queue
+
+
+def bench_add(n):
+    queue, track = make_queue(n), make_tracks(1, n)[0]
+    return lambda: queue.add(track)
+
+
+def bench_get_next_track(n):
+    queue = make_queue(n, repeat_mode=RepeatMode.ALL)
+    return queue.get_next_track
+
+
+def bench_shuffle(n):
+    return make_queue(n).shuffle
+
+
+def bench_upcoming(n):
+    queue = make_queue(n, position=n // 2)
+    return lambda: queue.upcoming[:10]
+
+
+def bench_history(n):
+    queue = make_queue(n, position=n // 2)
+    return lambda: queue.history[-10:]
+
+
+def bench_set_repeat_mode(n):
+    queue, modes = make_queue(n), itertools.cycle(("none", "single", "all"))
+    return lambda: queue.set_repeat_mode(next(modes))
+
+
+def bench_queue_description(n):
+    queue = make_queue(n, position=n // 2)
+    pages = max(1, queue.upcoming_length // 10)
+    return lambda: queue_description(queue, pages // 2)
+
+
+def bench_track_choices(n):
+    tracks = make_tracks(n)
+    return lambda: track_choices(tracks)
+
+
+def bench_classify(n):
+    # The shape of input that made the old URL regex backtrack exponentially.
+    query = "http://x(" + "a" * n + "!"
+    return lambda: classify(query)
+
+
+BENCHMARKS = {
+    "add": bench_add,
+    "get_next_track": bench_get_next_track,
+    "shuffle": bench_shuffle,
+    "upcoming": bench_upcoming,
+    "history": bench_history,
+    "set_repeat_mode": bench_set_repeat_mode,
+    "queue_description": bench_queue_description,
+    "track_choices": bench_track_choices,
+    "classify": bench_classify,
+}
+
+
+def measure(setup, n, repeat, max_calls=None):
+    tracemalloc.start()
+    setup(n)()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    number, _ = timeit.Timer(setup(n)).autorange()
+    if max_calls is not None and number > (cap := max_calls(n)):
+        # Spread the calls over more runs instead of letting one queue grow.
+        repeat, number = min(MAX_RUNS, repeat * -(-number // cap)), cap
+    # Every timed run gets a freshly built queue, so runs don't see each other's changes.
+    best = min(timeit.Timer(setup(n)).timeit(number) for _ in range(repeat))
+    return {"ops": number / best, "peak": peak}
+
+
+def run(names, sizes, repeat):
+    make_tracks(max(sizes) + 1)
+    results = {}
+    for name in names:
+        for n in FIXED_SIZES.get(name, sizes):
+            result = results.setdefault(name, {})[str(n)] = measure(BENCHMARKS[name], n, repeat, MAX_CALLS.get(name))
+            print(f"{name:<20} {n:>8,} {result['ops']:>16,.0f} ops/s {result['peak'] / 1024:>12,.1f} KB")
+    return results
+
+
+def compare(results, baseline, tolerance):
+    failures = []
+    for name, sizes in results.items():
+        for n, result in sizes.items():
+            if (base := baseline.get(name, {}).get(n)) is None:
+                continue
+
+            if result["ops"] < base["ops"] * (1 - tolerance):
+                failures.append(f"{name} at {n}: {result['ops']:,.0f} ops/s, baseline {base['ops']:,.0f} ops/s")
+            if result["peak"] > base["peak"] * (1 + tolerance):
+                failures.append(f"{name} at {n}: {result['peak'] / 1024:,.1f} KB, baseline {base['peak'] / 1024:,.1f} KB")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the queue microbenchmarks")
+    parser.add_argument("names", nargs="*", metavar="NAME", help=f"benchmarks to run ({', '.join(BENCHMARKS)}), all by default")
+    parser.add_argument("--sizes", type=lambda s: [int(n) for n in s.split(",")], default=SIZES, help="comma separated queue sizes")
+    parser.add_argument("--repeat", type=int, default=3, help="timing runs per benchmark, the best one counts")
+    parser.add_argument("--save", metavar="PATH", help="write the results as a baseline")
+    parser.add_argument("--compare", metavar="PATH", help="compare the results against a baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed regression as a fraction of the baseline")
+    args = parser.parse_args()
+
+    if unknown := set(args.names) - set(BENCHMARKS):
+        parser.error(f"unknown benchmarks: {', '.join(sorted(unknown))}")
+
+    print(f"{'benchmark':<20} {'size':>8} {'speed':>22} {'peak memory':>15}")
+    results = run(args.names or list(BENCHMARKS), args.sizes, args.repeat)
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Saved baseline to {args.save}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            failures = compare(results, json.load(f), args.tolerance)
+
+        if failures:
+            print(f"\n{len(failures)} regressions:")
+            print("\n".join(failures))
+            sys.exit(1)
+        print("\nNo regressions")
+
+
+if __name__ == "__main__":
+    main()
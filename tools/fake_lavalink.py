@@ -0,0 +1,387 @@
+"""A stand-in Lavalink (v3 protocol) server for local testing.
+
+It answers ``/loadtracks`` and ``/decodetrack`` with synthetic tracks and plays
+them on a timer, sending the same websocket events a real node sends. It does
+not produce any audio. ``--speed`` makes every track that many times shorter,
+``--load-delay`` and ``--event-latency`` add the time a real node needs to
+start a track and to deliver its events.
+
+    python -m tools.fake_lavalink --nodes 3 --write-config nodes.json
+
+Every node also exposes a few ``/_admin`` endpoints to script failures:
+``/_admin/degrade?cpu=0.99&deficit=2500``, ``/_admin/kill``, ``/_admin/revive``
+and ``/_admin/stuck?guild=<id>``.
+"""
+import argparse
+import asyncio
+import base64
+import hashlib
+import json
+import random
+import time
+
+from aiohttp import WSMsgType, web
+
+
+def encode_track(info):
+    return base64.urlsafe_b64encode(json.dumps(info, separators=(",", ":")).encode()).decode()
+
+
+def decode_track(track):
+    return json.loads(base64.urlsafe_b64decode(track.encode()))
+
+
+def make_track(seed, *, length=None, title=None, speed=1.0):
+    identifier = hashlib.sha1(seed.encode()).hexdigest()[:11]
+    rng = random.Random(identifier)
+    info = {
+        "identifier": identifier,
+        "isSeekable": True,
+        "author": f"Artist {rng.randint(1, 500)}",
+        "length": length if length is not None else int(rng.randint(120, 360) * 1000 / speed),
+        "isStream": False,
+        "position": 0,
+        "title": title or f"Track {identifier}",
+        "uri": f"https://www.youtube.com/watch?v={identifier}",
+    }
+    return {"track": encode_track(info), "info": info}
+
+
+class FakePlayer:
+    def __init__(self, guild_id):
+        self.guild_id = guild_id
+        self.track = None
+        self.length = 0
+        self.offset = 0
+        self.started = 0
+        self.paused = False
+        self.volume = 100
+        self.bands = []
+        self.timer = None
+        self.loading = None
+
+    @property
+    def position(self):
+        if self.track is None:
+            return 0
+        if self.paused:
+            return self.offset
+        return min(self.length, self.offset + (time.monotonic() - self.started) * 1000)
+
+
+class FakeNode:
+    def __init__(self, host="127.0.0.1", port=2333, *, password="youshallnotpass", identifier=None,
+                 speed=1.0, search_results=5, playlist_size=100, rest_latency=0.0,
+                 load_delay=0.0, event_latency=0.0, update_interval=5.0, stats_interval=60.0):
+        self.host = host
+        self.port = port
+        self.password = password
+        self.identifier = identifier or f"FAKE-{port}"
+        self.speed = speed
+        self.search_results = search_results
+        self.playlist_size = playlist_size
+        self.rest_latency = rest_latency
+        self.load_delay = load_delay
+        self.event_latency = event_latency
+        self.update_interval = update_interval
+        self.stats_interval = stats_interval
+
+        self.cpu = 0.05
+        self.deficit = 0
+        self.nulled = 0
+        self.alive = True
+        self.players = {}
+        self.sockets = set()
+        self.requests = 0
+        self.ops = 0
+        self.started = time.monotonic()
+
+        self.app = web.Application()
+        self.app.router.add_get("/", self.websocket)
+        self.app.router.add_get("/loadtracks", self.loadtracks)
+        self.app.router.add_get("/decodetrack", self.decodetrack)
+        self.app.router.add_post("/_admin/degrade", self.admin_degrade)
+        self.app.router.add_post("/_admin/kill", self.admin_kill)
+        self.app.router.add_post("/_admin/revive", self.admin_revive)
+        self.app.router.add_post("/_admin/stuck", self.admin_stuck)
+        self._runner = None
+        self._tasks = []
+
+    @property
+    def config(self):
+        return {
+            "identifier": self.identifier,
+            "host": self.host,
+            "port": self.port,
+            "rest_uri": f"http://{self.host}:{self.port}",
+            "password": self.password,
+            "region": "europe",
+        }
+
+    async def start(self):
+        self._runner = web.AppRunner(self.app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host, self.port).start()
+        self._tasks = [
+            asyncio.ensure_future(self._every(self.update_interval, self.send_player_updates)),
+            asyncio.ensure_future(self._every(self.stats_interval, self.send_stats)),
+        ]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        for player in self.players.values():
+            self._cancel(player)
+            self._cancel_loading(player)
+        for ws in list(self.sockets):
+            await ws.close()
+        await self._runner.cleanup()
+
+    async def _every(self, interval, func):
+        while True:
+            await asyncio.sleep(interval)
+            await func()
+
+    def authorized(self, request):
+        return request.headers.get("Authorization") == self.password
+
+    async def loadtracks(self, request):
+        if not self.alive:
+            raise web.HTTPServiceUnavailable
+        if not self.authorized(request):
+            raise web.HTTPUnauthorized
+
+        self.requests += 1
+        if self.rest_latency:
+            await asyncio.sleep(self.rest_latency)
+
+        identifier = request.query.get("identifier", "")
+        if identifier.startswith(("ytsearch:", "scsearch:", "ytmsearch:")):
+            terms = identifier.split(":", 1)[1].strip()
+            tracks = [make_track(f"{terms}#{i}", title=f"{terms} ({i + 1})", speed=self.speed) for i in range(self.search_results)]
+            data = {"loadType": "SEARCH_RESULT", "playlistInfo": {}, "tracks": tracks}
+        elif "list=" in identifier or "/sets/" in identifier:
+            size = int(request.query.get("size", self.playlist_size))
+            tracks = [make_track(f"{identifier}#{i}", speed=self.speed) for i in range(size)]
+            data = {"loadType": "PLAYLIST_LOADED", "playlistInfo": {"name": identifier, "selectedTrack": -1}, "tracks": tracks}
+        elif identifier.startswith("empty:"):
+            data = {"loadType": "NO_MATCHES", "playlistInfo": {}, "tracks": []}
+        else:
+            data = {"loadType": "TRACK_LOADED", "playlistInfo": {}, "tracks": [make_track(identifier, speed=self.speed)]}
+
+        return web.json_response(data)
+
+    async def decodetrack(self, request):
+        if not self.authorized(request):
+            raise web.HTTPUnauthorized
+
+        try:
+            return web.json_response(decode_track(request.query["track"]))
+        except (KeyError, ValueError):
+            return web.json_response({"status": 500, "error": "Invalid track"}, status=500)
+
+    async def websocket(self, request):
+        if not self.alive:
+            raise web.HTTPServiceUnavailable
+        if not self.authorized(request):
+            raise web.HTTPUnauthorized
+
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        self.sockets.add(ws)
+        await self.send_stats()
+
+        try:
+            async for msg in ws:
+                if msg.type == WSMsgType.TEXT:
+                    await self.handle(ws, json.loads(msg.data))
+        finally:
+            self.sockets.discard(ws)
+
+        return ws
+
+    async def send(self, data):
+        if self.event_latency:
+            # call_later keeps callbacks with the same delay in order, so events stay ordered.
+            asyncio.get_event_loop().call_later(self.event_latency, lambda: asyncio.ensure_future(self._send(data)))
+        else:
+            await self._send(data)
+
+    async def _send(self, data):
+        for ws in list(self.sockets):
+            if not ws.closed:
+                await ws.send_str(json.dumps(data))
+
+    async def event(self, player, type_, **data):
+        await self.send({"op": "event", "type": type_, "guildId": str(player.guild_id), **data})
+
+    async def handle(self, ws, data):
+        self.ops += 1
+        op = data.get("op")
+        guild_id = int(data.get("guildId", 0))
+        player = self.players.get(guild_id)
+
+        if op == "voiceUpdate":
+            self.players.setdefault(guild_id, FakePlayer(guild_id))
+        elif op == "play":
+            player = self.players.setdefault(guild_id, FakePlayer(guild_id))
+            if player.track is not None:
+                if data.get("noReplace"):
+                    return
+                await self.end(player, "REPLACED")
+            self._cancel_loading(player)
+            if self.load_delay:
+                player.loading = asyncio.get_event_loop().call_later(self.load_delay, lambda: asyncio.ensure_future(
+                    self.start_track(player, data["track"], int(data.get("startTime") or 0))
+                ))
+            else:
+                await self.start_track(player, data["track"], int(data.get("startTime") or 0))
+        elif player is None:
+            return
+        elif op == "stop":
+            self._cancel_loading(player)
+            if player.track is not None:
+                await self.end(player, "STOPPED")
+        elif op == "pause":
+            if data["pause"] and not player.paused:
+                player.offset, player.paused = player.position, True
+                self._cancel(player)
+            elif not data["pause"] and player.paused:
+                player.paused, player.started = False, time.monotonic()
+                self._schedule(player)
+        elif op == "seek":
+            player.offset, player.started = int(data["position"]), time.monotonic()
+            self._schedule(player)
+        elif op == "volume":
+            player.volume = data["volume"]
+        elif op == "equalizer":
+            player.bands = data["bands"]
+        elif op == "destroy":
+            self._cancel(player)
+            self._cancel_loading(player)
+            del self.players[guild_id]
+
+    async def start_track(self, player, track, start=0):
+        player.loading = None
+        player.track = track
+        player.length = decode_track(track)["length"]
+        player.offset, player.started, player.paused = start, time.monotonic(), False
+        self._schedule(player)
+        await self.event(player, "TrackStartEvent", track=track)
+
+    async def end(self, player, reason):
+        track = player.track
+        player.track = None
+        self._cancel(player)
+        await self.event(player, "TrackEndEvent", track=track, reason=reason)
+
+    def _schedule(self, player):
+        self._cancel(player)
+        if player.track is not None and not player.paused:
+            remaining = max(0, player.length - player.position) / 1000
+            player.timer = asyncio.get_event_loop().call_later(
+                remaining, lambda: asyncio.ensure_future(self.end(player, "FINISHED"))
+            )
+
+    def _cancel(self, player):
+        if player.timer is not None:
+            player.timer.cancel()
+            player.timer = None
+
+    def _cancel_loading(self, player):
+        if player.loading is not None:
+            player.loading.cancel()
+            player.loading = None
+
+    async def send_player_updates(self):
+        now = int(time.time() * 1000)
+        for player in list(self.players.values()):
+            if player.track is not None:
+                await self.send({
+                    "op": "playerUpdate",
+                    "guildId": str(player.guild_id),
+                    "state": {"time": now, "position": int(player.position)},
+                })
+
+    async def send_stats(self):
+        playing = sum(1 for p in self.players.values() if p.track is not None and not p.paused)
+        await self.send({
+            "op": "stats",
+            "players": len(self.players),
+            "playingPlayers": playing,
+            "uptime": int((time.monotonic() - self.started) * 1000),
+            "memory": {"free": 0, "used": 0, "allocated": 0, "reservable": 0},
+            "cpu": {"cores": 4, "systemLoad": self.cpu, "lavalinkLoad": self.cpu / 2},
+            "frameStats": {"sent": playing * 3000, "nulled": self.nulled, "deficit": self.deficit},
+        })
+
+    async def admin_degrade(self, request):
+        self.cpu = float(request.query.get("cpu", self.cpu))
+        self.deficit = int(request.query.get("deficit", self.deficit))
+        self.nulled = int(request.query.get("nulled", self.nulled))
+        await self.send_stats()
+        return web.json_response({"cpu": self.cpu, "deficit": self.deficit, "nulled": self.nulled})
+
+    async def admin_kill(self, request):
+        self.alive = False
+        for ws in list(self.sockets):
+            await ws.close()
+        return web.json_response({"alive": self.alive})
+
+    async def admin_revive(self, request):
+        self.alive = True
+        return web.json_response({"alive": self.alive})
+
+    async def admin_stuck(self, request):
+        if (player := self.players.get(int(request.query["guild"]))) is None or player.track is None:
+            raise web.HTTPNotFound
+        await self.event(player, "TrackStuckEvent", track=player.track, thresholdMs=10000)
+        return web.json_response({"guild": player.guild_id})
+
+
+async def run(args):
+    nodes = [
+        FakeNode(args.host, args.port + i, password=args.password, speed=args.speed,
+                 search_results=args.search_results, playlist_size=args.playlist_size,
+                 rest_latency=args.rest_latency / 1000, load_delay=args.load_delay / 1000,
+                 event_latency=args.event_latency / 1000)
+        for i in range(args.nodes)
+    ]
+    for node in nodes:
+        await node.start()
+        print(f"Fake Lavalink node `{node.identifier}` listening on {node.host}:{node.port}")
+
+    if args.write_config:
+        with open(args.write_config, "w") as f:
+            json.dump([node.config for node in nodes], f, indent=4)
+
+    try:
+        await asyncio.Event().wait()
+    finally:
+        for node in nodes:
+            await node.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run stand-in Lavalink nodes")
+    parser.add_argument("--nodes", type=int, default=1)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=2333, help="port of the first node, the rest count up")
+    parser.add_argument("--password", default="youshallnotpass")
+    parser.add_argument("--speed", type=float, default=1.0, help="how many times shorter than real tracks the tracks are")
+    parser.add_argument("--search-results", type=int, default=5)
+    parser.add_argument("--playlist-size", type=int, default=100)
+    parser.add_argument("--rest-latency", type=float, default=0.0, help="added REST latency in ms")
+    parser.add_argument("--load-delay", type=float, default=0.0, help="ms from a play op to its TrackStartEvent")
+    parser.add_argument("--event-latency", type=float, default=0.0, help="added websocket event latency in ms")
+    parser.add_argument("--write-config", metavar="PATH", help="write a LAVALINK_NODES file for the started nodes")
+    args = parser.parse_args()
+
+    try:
+        asyncio.run(run(args))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""Fuzz the play query classifier and bound its worst-case cost.
+
+Random queries check that ``classify`` never raises and that its result is
+consistent; crafted inputs of growing length (including the ones that made the
+old URL regex backtrack exponentially) check that the time per character stays
+flat and under ``--budget``.
+
+    python -m tools.fuzz_query --iterations 100000
+"""
+import argparse
+import random
+import string
+import sys
+import timeit
+
+from cogs.utils.query import DEFAULT_PREFIX, QueryKind, classify
+
+SIZES = (1_000, 10_000, 100_000)
+ALPHABET = string.ascii_letters + string.digits + "./:?&=#%-_()[]<>!@ \t\n«»“”" + "ąéß日本"
+FRAGMENTS = ("http://", "https://", "www.", "youtube.com/", "youtu.be/", "soundcloud.com/", "/sets/", "?list=", "ytsearch:", "<", ">", "(", ")", ".", "/")
+
+ADVERSARIAL = {
+    "nested_parens": lambda n: "http://x(" + "a" * n + "!",
+    "open_parens": lambda n: "www." + "(a" * (n // 2),
+    "dotted_host": lambda n: "a." * (n // 2),
+    "long_host": lambda n: "a" * n + ".com/",
+    "long_path": lambda n: "https://youtube.com/" + "a/" * (n // 2),
+    "query_params": lambda n: "https://www.youtube.com/watch?" + "list=a&" * (n // 7),
+    "brackets": lambda n: "<" * n + "http://x" + ">" * n,
+    "long_words": lambda n: ("x" * 50 + " ") * (n // 51),
+}
+
+
+def random_query(rng):
+    parts = []
+    for _ in range(rng.randint(1, 8)):
+        if rng.random() < 0.5:
+            parts.append(rng.choice(FRAGMENTS))
+        else:
+            parts.append("".join(rng.choices(ALPHABET, k=rng.randint(1, 12))))
+    return "".join(parts)
+
+
+def check(query):
+    result = classify(query)
+    text = query.strip().strip("<>")
+
+    if result.kind is QueryKind.TEXT:
+        assert result.identifier == DEFAULT_PREFIX + text, result
+    else:
+        assert result.identifier == text, result
+    if result.is_url:
+        assert text and not any(c.isspace() for c in text), result
+    if result.is_playlist:
+        assert result.is_url, result
+
+
+def fuzz(iterations, seed):
+    rng = random.Random(seed)
+    for _ in range(iterations):
+        query = random_query(rng)
+        try:
+            check(query)
+        except Exception as exc:
+            return f"{query!r}: {exc!r}"
+
+
+def check_bounds(name, sizes, budget, repeat=3):
+    """Time one crafted query at every size and describe what is over budget or grows faster than linear."""
+    build = ADVERSARIAL[name]
+    failures, costs = [], []
+    for n in sizes:
+        query = build(n)
+        timer = timeit.Timer(lambda: classify(query))
+        number, _ = timer.autorange()
+        cost = min(timer.repeat(repeat=repeat, number=number)) / number / len(query)
+        costs.append(cost)
+        print(f"{name:<16} {len(query):>8,} chars {cost * 1e9:>10,.1f} ns/char")
+
+    if max(costs) > budget:
+        failures.append(f"{name}: {max(costs) * 1e9:,.1f} ns/char, budget {budget * 1e9:,.1f}")
+    # Linear time means a flat cost per character; allow for noise and cache effects.
+    if costs[-1] > costs[0] * 4:
+        failures.append(f"{name}: cost per character grew {costs[-1] / costs[0]:.1f}x from {sizes[0]:,} to {sizes[-1]:,} chars")
+    return failures
+
+
+def worst_case(sizes, budget):
+    return [failure for name in ADVERSARIAL for failure in check_bounds(name, sizes, budget)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fuzz the play query classifier")
+    parser.add_argument("--iterations", type=int, default=20_000, help="random queries to check")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--sizes", type=lambda s: [int(n) for n in s.split(",")], default=SIZES, help="comma separated lengths of the crafted queries")
+    parser.add_argument("--budget", type=float, default=500, help="allowed nanoseconds per character of a crafted query")
+    args = parser.parse_args()
+
+    if (failure := fuzz(args.iterations, args.seed)) is not None:
+        print(f"Inconsistent result for {failure}")
+        sys.exit(1)
+    print(f"{args.iterations:,} random queries classified consistently\n")
+
+    if failures := worst_case(args.sizes, args.budget / 1e9):
+        print(f"\n{len(failures)} failures:")
+        print("\n".join(failures))
+        sys.exit(1)
+    print("\nAll crafted queries within budget")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,512 @@
+"""Offline load simulator for the Music cog.
+
+Runs the real cog against in-process stand-in Lavalink nodes (see
+``tools.fake_lavalink``) and a scripted Discord: guilds, members and messages are
+built locally, command messages are fed straight into ``process_commands``, voice
+handshakes are answered by a fake gateway and REST calls by a fake HTTP client
+with configurable latency. Nothing connects to Discord.
+
+    python -m tools.loadsim --guilds 2000 --duration 120 --record trace.jsonl
+    python -m tools.loadsim --replay trace.jsonl --speed 2
+
+Traffic is a list of timed events, one JSON object per line in a trace:
+
+    {"t": 1.25, "guild": 17, "kind": "voice", "joined": true}
+    {"t": 1.40, "guild": 17, "kind": "message", "content": "-play https://youtu.be/abc"}
+    {"t": 9.00, "guild": 17, "kind": "stuck"}
+
+At the end it prints throughput, command latency percentiles, event loop lag,
+the silence between tracks and errors.
+"""
+import argparse
+import asyncio
+import collections
+import datetime as dt
+import itertools
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from urllib.parse import unquote
+
+import discord
+from discord.ext import commands
+
+from cogs.utils import metrics
+from tools.fake_lavalink import FakeNode
+
+BOT_ID = 1000
+GUILD_BASE = 10 ** 15
+
+# (weight, command) pairs for the generated traffic; {n} is filled with a random number.
+COMMANDS = [
+    (30, "-play https://www.youtube.com/watch?v=sim{n}"),
+    (8, "-play song {n}"),
+    (4, "-play https://www.youtube.com/playlist?list=sim{n}"),
+    (14, "-queue"),
+    (10, "-skip"),
+    (5, "-pause"),
+    (5, "-play"),
+    (3, "-volume up"),
+    (2, "-volume down"),
+    (6, "-playing"),
+    (4, "-shuffle"),
+    (3, "-loop all"),
+    (3, "-loop none"),
+    (3, "-remove 2"),
+    (2, "-adveq 1 4 2 3 250 -2"),
+    (1, "-eq boost"),
+    (2, "-autoplay on"),
+    (1, "-autoplay off"),
+]
+
+
+def guild_id(index):
+    return GUILD_BASE + index * 10
+
+
+def percentile(values, q):
+    if not values:
+        return 0.
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def generate_trace(guilds, duration, *, rate=6.0, stuck_rate=0.2, seed=0, reload_at=None):
+    """Build a random trace where every guild joins voice, sends about ``rate``
+    commands a minute and leaves again before ``duration`` seconds are up.
+    With ``reload_at`` the music cog is reloaded that many seconds in."""
+    rng = random.Random(seed)
+    weights, templates = zip(*COMMANDS)
+    events = []
+
+    for guild in range(guilds):
+        t = rng.uniform(0, duration * 0.2)
+        leave = rng.uniform(duration * 0.8, duration)
+        events.append({"t": t, "guild": guild, "kind": "voice", "joined": True})
+
+        t += rng.uniform(0.1, 1.0)
+        events.append({"t": t, "guild": guild, "kind": "message", "content": f"-play https://www.youtube.com/watch?v=sim{guild}"})
+
+        while (t := t + rng.expovariate(rate / 60)) < leave:
+            if rng.random() < stuck_rate / rate:
+                events.append({"t": t, "guild": guild, "kind": "stuck"})
+            else:
+                content = rng.choices(templates, weights)[0].format(n=rng.randrange(10 ** 6))
+                events.append({"t": t, "guild": guild, "kind": "message", "content": content})
+
+        events.append({"t": leave, "guild": guild, "kind": "voice", "joined": False})
+
+    if reload_at is not None:
+        events.append({"t": reload_at, "guild": 0, "kind": "reload"})
+
+    events.sort(key=lambda event: event["t"])
+    return events
+
+
+def read_trace(path):
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def write_trace(path, events):
+    with open(path, "w") as f:
+        for event in events:
+            f.write(json.dumps(event, separators=(",", ":")) + "\n")
+
+
+class FakeGateway:
+    """Answers voice state changes the way Discord does, with a voice state and a voice server update."""
+
+    def __init__(self, sim):
+        self.sim = sim
+        self.latency = sim.latency
+
+    async def voice_state(self, guild_id, channel_id, self_mute=False, self_deaf=False):
+        asyncio.ensure_future(self.sim.voice_handshake(guild_id, channel_id))
+
+
+class Simulator:
+    def __init__(self, *, nodes=1, latency=0.05, think=1.0, speed=60.0, load_delay=0.0, node_latency=0.0, lag_interval=0.05):
+        self.node_count = nodes
+        self.latency = latency
+        self.think = think
+        self.playback_speed = speed
+        self.load_delay = load_delay
+        self.node_latency = node_latency
+        self.lag_interval = lag_interval
+
+        self.nodes = []
+        self.bot = None
+        self.user = None
+        self.ids = itertools.count(10 ** 16)
+        self.members = {}
+        self.pending = {}
+        self.waiting = collections.defaultdict(collections.deque)
+        self.latencies = []
+        self.lags = []
+        self.gaps = []
+        self.errors = collections.Counter()
+        self.first_option = None
+        self.reloads = []
+        self.sent = 0
+        self.stuck = 0
+
+    # Setup
+
+    async def start(self, guilds):
+        for i in range(self.node_count):
+            node = FakeNode(port=0, identifier=f"SIM-{i}", speed=self.playback_speed, load_delay=self.load_delay,
+                            event_latency=self.node_latency, update_interval=5, stats_interval=5)
+            await node.start()
+            node.port = node._runner.addresses[0][1]
+            self.nodes.append(node)
+
+        fd, path = tempfile.mkstemp(suffix=".json")
+        with os.fdopen(fd, "w") as f:
+            json.dump([node.config for node in self.nodes], f)
+
+        # The cog reads these when it is imported, so set them before loading it.
+        os.environ.update(
+            LAVALINK_NODES=path,
+            SNAPSHOT_PATH="",
+            SEARCH_CACHE_PATH="",
+            GUILD_SETTINGS_PATH=os.path.join(tempfile.gettempdir(), f"loadsim-settings-{os.getpid()}.json"),
+        )
+
+        intents = discord.Intents.none()
+        intents.guilds = intents.voice_states = intents.guild_messages = intents.guild_reactions = True
+        member_cache_flags = discord.MemberCacheFlags.none()
+        member_cache_flags.voice = True
+        self.bot = bot = commands.Bot(command_prefix="-", intents=intents, member_cache_flags=member_cache_flags,
+                                      help_command=None, case_insensitive=True)
+
+        state = bot._connection
+        self.user = {"id": str(BOT_ID), "username": "Boggy", "discriminator": "0001", "avatar": None, "bot": True}
+        state.user = discord.ClientUser(state=state, data=self.user)
+        bot.ws = FakeGateway(self)
+        bot.http.request = self.request
+
+        for index in range(guilds):
+            self.add_guild(index)
+
+        bot.add_listener(self.on_command_done, "on_command_completion")
+        bot.add_listener(self.on_command_error, "on_command_error")
+        bot.ipc = None
+        bot.cluster_id = 0
+        bot.load_extension("cogs.music")
+        bot.load_extension("cogs.cluster")
+        self.patch_module()
+
+        observe = metrics.TRACK_START_GAP.observe
+        metrics.TRACK_START_GAP.observe = lambda value: (self.gaps.append(value), observe(value))
+
+        bot._ready.set()
+        music = bot.get_cog("Music")
+        while len(music.wavelink.nodes) < len(self.nodes):
+            await asyncio.sleep(0.05)
+
+    def patch_module(self):
+        module = sys.modules["cogs.music"]
+        # Lyrics are prefetched on every track start; point them at the node so they 404 locally.
+        module.LYRICS_URL = f"http://127.0.0.1:{self.nodes[0].port}/lyrics?title="
+        self.first_option = next(iter(module.OPTIONS))
+
+    async def reload(self):
+        self.reloads.append(await self.bot.get_cog("Cluster").reload_extension({"extension": "cogs.music"}))
+        self.patch_module()
+
+    def add_guild(self, index):
+        gid = guild_id(index)
+        user = {"id": str(gid + 3), "username": f"user{index}", "discriminator": "0001", "avatar": None}
+        member = {"user": user, "roles": [], "joined_at": "2021-01-01T00:00:00+00:00", "deaf": False, "mute": False}
+        self.members[gid] = member
+
+        guild = discord.Guild(state=self.bot._connection, data={
+            "id": str(gid),
+            "name": f"Guild {index}",
+            "owner_id": str(gid + 3),
+            "member_count": 2,
+            "roles": [{"id": str(gid), "name": "@everyone", "permissions": "104324673", "position": 0}],
+            "channels": [
+                {"id": str(gid + 1), "type": 0, "name": "music", "position": 0, "permission_overwrites": []},
+                {"id": str(gid + 2), "type": 2, "name": "Voice", "position": 1, "permission_overwrites": [],
+                 "bitrate": 64000, "user_limit": 0},
+            ],
+            "members": [member],
+            "voice_states": [],
+        })
+        self.bot._connection._add_guild(guild)
+
+    async def stop(self):
+        # Let listeners for the last voice updates run before the node goes away.
+        await asyncio.sleep(self.latency * 4)
+        music = self.bot.get_cog("Music")
+        for player in list(music.players):
+            await player.teardown()
+
+        for node in list(music.wavelink.nodes.values()):
+            await node.destroy()
+        self.bot.remove_cog("Music")
+        del metrics.TRACK_START_GAP.observe
+        await asyncio.sleep(0.1)
+
+        for node in self.nodes:
+            await node.stop()
+        os.unlink(os.environ["LAVALINK_NODES"])
+        if os.path.exists(path := os.environ["GUILD_SETTINGS_PATH"]):
+            os.unlink(path)
+
+    # Fake Discord
+
+    async def voice_handshake(self, guild_id, channel_id):
+        await asyncio.sleep(self.latency)
+        self.bot.dispatch("socket_response", {"t": "VOICE_STATE_UPDATE", "d": {
+            "guild_id": str(guild_id), "channel_id": channel_id, "user_id": str(BOT_ID), "session_id": "loadsim",
+        }})
+        if channel_id is not None:
+            self.bot.dispatch("socket_response", {"t": "VOICE_SERVER_UPDATE", "d": {
+                "guild_id": str(guild_id), "token": "loadsim", "endpoint": "loadsim.discord.media",
+            }})
+
+    async def request(self, route, *, files=None, form=None, **kwargs):
+        await asyncio.sleep(self.latency * random.uniform(0.5, 1.5))
+
+        if route.method == "POST" and route.path == "/channels/{channel_id}/messages":
+            self.sent += 1
+            self.responded(int(route.channel_id))
+            payload = kwargs.get("json") or {}
+            return self.message_data(route.channel_id, self.user, payload.get("content") or "",
+                                     embeds=[payload["embed"]] if payload.get("embed") else [])
+
+        if route.method == "PATCH" and route.path == "/channels/{channel_id}/messages/{message_id}":
+            payload = kwargs.get("json") or {}
+            data = self.message_data(route.channel_id, self.user, payload.get("content") or "",
+                                     embeds=[payload["embed"]] if payload.get("embed") else [])
+            data["id"] = str(route.url.rsplit("/", 1)[1])
+            return data
+
+        if route.method == "PUT" and "/reactions/" in route.path:
+            # The first option is added first; pick it once the rest had time to go out.
+            message_id, emoji = route.url.split("/messages/")[1].split("/reactions/")
+            self.responded(int(route.channel_id), int(message_id))
+            if (emoji := unquote(emoji.split("/")[0])) == self.first_option:
+                asyncio.ensure_future(self.react(int(route.channel_id), int(message_id), emoji))
+
+        return None
+
+    async def react(self, channel_id, message_id, emoji):
+        await asyncio.sleep(self.think)
+        gid = channel_id - 1
+        self.bot.dispatch("raw_reaction_add", discord.RawReactionActionEvent({
+            "message_id": message_id, "channel_id": channel_id, "guild_id": gid, "user_id": gid + 3,
+        }, discord.PartialEmoji(name=emoji), "REACTION_ADD"))
+
+    def message_data(self, channel_id, author, content, *, embeds=(), member=None):
+        data = {
+            "id": str(next(self.ids)),
+            "channel_id": str(channel_id),
+            "guild_id": str(int(channel_id) - 1),
+            "author": author,
+            "content": content,
+            "timestamp": dt.datetime.now(dt.timezone.utc).isoformat(),
+            "edited_timestamp": None,
+            "tts": False,
+            "mention_everyone": False,
+            "mentions": [],
+            "mention_roles": [],
+            "attachments": [],
+            "embeds": list(embeds),
+            "pinned": False,
+            "type": 0,
+        }
+        if member is not None:
+            data["member"] = {k: v for k, v in member.items() if k != "user"}
+        return data
+
+    # Traffic
+
+    async def send_message(self, gid, content):
+        channel = self.bot.get_channel(gid + 1)
+        member = self.members[gid]
+        message = discord.Message(state=self.bot._connection, channel=channel,
+                                  data=self.message_data(gid + 1, member["user"], content, member=member))
+        self.pending[message.id] = time.perf_counter()
+        self.waiting[channel.id].append(message.id)
+        await self.bot.process_commands(message)
+
+    def responded(self, channel_id, message_id=None):
+        # Latency runs to the first reply in the channel (or reaction on the command), so
+        # commands that keep waiting for reactions afterwards are not counted as slow.
+        waiting = self.waiting[channel_id]
+        if message_id is None:
+            if not waiting:
+                return
+            message_id = waiting[0]
+        elif message_id not in self.pending:
+            return
+
+        self.latencies.append(time.perf_counter() - self.pending.pop(message_id))
+        waiting.remove(message_id)
+
+    def voice_update(self, gid, joined):
+        member = self.members[gid]
+        self.bot._connection.parse_voice_state_update({
+            "guild_id": str(gid),
+            "channel_id": str(gid + 2) if joined else None,
+            "user_id": member["user"]["id"],
+            "session_id": f"user{gid}",
+            "member": member,
+            "deaf": False, "mute": False, "self_deaf": False, "self_mute": False, "suppress": False,
+        })
+
+    async def track_stuck(self, gid):
+        for node in self.nodes:
+            if (player := node.players.get(gid)) is not None and player.track is not None:
+                self.stuck += 1
+                await node.event(player, "TrackStuckEvent", track=player.track, thresholdMs=10000)
+
+    async def on_command_done(self, ctx):
+        if ctx.message.id in self.pending:
+            self.responded(ctx.channel.id, ctx.message.id)
+
+    async def on_command_error(self, ctx, exc):
+        self.errors[type(getattr(exc, "original", exc)).__name__] += 1
+        await self.on_command_done(ctx)
+
+    async def measure_lag(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.lag_interval
+            await asyncio.sleep(self.lag_interval)
+            self.lags.append(max(0., loop.time() - expected))
+
+    async def replay(self, events, *, speed=1.0, drain=5.0):
+        loop = asyncio.get_running_loop()
+        start, tasks = loop.time(), set()
+
+        for event in events:
+            if (delay := start + event["t"] / speed - loop.time()) > 0:
+                await asyncio.sleep(delay)
+
+            gid = guild_id(event["guild"])
+            if event["kind"] == "message":
+                task = asyncio.ensure_future(self.send_message(gid, event["content"]))
+            elif event["kind"] == "voice":
+                self.voice_update(gid, event["joined"])
+                continue
+            elif event["kind"] == "stuck":
+                task = asyncio.ensure_future(self.track_stuck(gid))
+            elif event["kind"] == "reload":
+                await self.reload()
+                continue
+            else:
+                continue
+
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+
+        # Commands like -queue keep waiting for reactions, so only give replies a moment to arrive.
+        deadline = loop.time() + drain
+        while self.pending and loop.time() < deadline:
+            await asyncio.sleep(0.05)
+
+        for task in tasks:
+            task.cancel()
+
+    async def run(self, events, *, speed=1.0):
+        guilds = max(event["guild"] for event in events) + 1
+        await self.start(guilds)
+
+        lag = asyncio.ensure_future(self.measure_lag())
+        started = time.perf_counter()
+        try:
+            await self.replay(events, speed=speed)
+        finally:
+            elapsed = time.perf_counter() - started
+            lag.cancel()
+            await self.stop()
+
+        return self.report(guilds, len(events), elapsed)
+
+    def report(self, guilds, events, elapsed):
+        return {
+            "guilds": guilds,
+            "events": events,
+            "elapsed": elapsed,
+            "commands": len(self.latencies),
+            "throughput": len(self.latencies) / elapsed if elapsed else 0.,
+            "unfinished": len(self.pending),
+            "latency": {q: percentile(self.latencies, p) for q, p in (("p50", .5), ("p90", .9), ("p99", .99), ("max", 1))},
+            "loop_lag": {q: percentile(self.lags, p) for q, p in (("p50", .5), ("p99", .99), ("max", 1))},
+            "track_gaps": len(self.gaps),
+            "track_gap": {q: percentile(self.gaps, p) for q, p in (("p50", .5), ("p90", .9), ("p99", .99), ("max", 1))},
+            "messages_sent": self.sent,
+            "node_ops": sum(node.ops for node in self.nodes),
+            "node_requests": sum(node.requests for node in self.nodes),
+            "stuck_events": self.stuck,
+            "reloads": self.reloads,
+            "errors": dict(self.errors),
+        }
+
+
+def print_report(report):
+    ms = lambda value: f"{value * 1000:,.1f} ms"
+    print(f"{report['guilds']:,} guilds, {report['events']:,} events in {report['elapsed']:,.1f}s")
+    print(f"Commands:      {report['commands']:,} ({report['throughput']:,.1f}/s, {report['unfinished']:,} unfinished)")
+    print("Latency:       " + ", ".join(f"{q} {ms(v)}" for q, v in report["latency"].items()))
+    print("Event loop lag: " + ", ".join(f"{q} {ms(v)}" for q, v in report["loop_lag"].items()))
+    print("Track gaps:    " + ", ".join(f"{q} {ms(v)}" for q, v in report["track_gap"].items()) + f" ({report['track_gaps']:,} transitions)")
+    print(f"Discord:       {report['messages_sent']:,} messages sent")
+    print(f"Lavalink:      {report['node_requests']:,} REST requests, {report['node_ops']:,} websocket ops, "
+          f"{report['stuck_events']:,} stuck tracks")
+    for result in report["reloads"]:
+        print(f"Reload:        {result}")
+    if report["errors"]:
+        print("Errors:        " + ", ".join(f"{name} x{count:,}" for name, count in sorted(report["errors"].items())))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the Music cog without Discord or Lavalink")
+    parser.add_argument("--guilds", type=int, default=500)
+    parser.add_argument("--duration", type=float, default=60, help="seconds of generated traffic")
+    parser.add_argument("--rate", type=float, default=6, help="commands per guild per minute")
+    parser.add_argument("--stuck-rate", type=float, default=0.2, help="stuck tracks per guild per minute")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--replay", metavar="PATH", help="replay a recorded trace instead of generating one")
+    parser.add_argument("--record", metavar="PATH", help="write the traffic to a trace file")
+    parser.add_argument("--speed", type=float, default=1.0, help="replay speed multiplier")
+    parser.add_argument("--nodes", type=int, default=1)
+    parser.add_argument("--latency", type=float, default=50, help="simulated Discord latency in ms")
+    parser.add_argument("--think", type=float, default=1.0, help="seconds a user takes to pick a search result")
+    parser.add_argument("--playback-speed", type=float, default=60, help="how many times shorter than real tracks the tracks are")
+    parser.add_argument("--load-delay", type=float, default=0, help="ms a node takes to start a track")
+    parser.add_argument("--node-latency", type=float, default=0, help="ms a node's websocket events take to arrive")
+    parser.add_argument("--reload-at", type=float, help="reload the music cog this many seconds into the traffic")
+    parser.add_argument("--json", metavar="PATH", help="also write the report as JSON")
+    args = parser.parse_args()
+
+    if args.replay:
+        events = read_trace(args.replay)
+    else:
+        events = generate_trace(args.guilds, args.duration, rate=args.rate, stuck_rate=args.stuck_rate, seed=args.seed,
+                                reload_at=args.reload_at)
+    if args.record:
+        write_trace(args.record, events)
+    if not events:
+        sys.exit("No traffic to replay")
+
+    sim = Simulator(nodes=args.nodes, latency=args.latency / 1000, think=args.think, speed=args.playback_speed,
+                    load_delay=args.load_delay / 1000, node_latency=args.node_latency / 1000)
+    report = asyncio.run(sim.run(events, speed=args.speed))
+    print_report(report)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()